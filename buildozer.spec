@@ -22,7 +22,7 @@ source.include_exts = py,png,jpg,kv,atlas,json,ttf
 #source.exclude_exts = spec
 
 # (list) List of directory to exclude (let empty to not exclude anything)
-#source.exclude_dirs = tests, bin
+source.exclude_dirs = tests, bin
 
 # (list) List of exclusions using pattern matching
 #source.exclude_patterns = license,images/*/*.jpg
@@ -36,7 +36,7 @@ version = 1.4.0
 
 # (list) Application requirements
 # comma separated e.g. requirements = sqlite3,kivy
-requirements = python3==3.7.7, hostpython3==3.7.7,kivy==2.0.0rc3,akivymd, https://github.com/kivymd/KivyMD/archive/f0c64aeeb467f1057809d408879c6d314a4cddfb.zip, sdl2_ttf==2.0.15
+requirements = python3==3.7.7, hostpython3==3.7.7, sqlite3,kivy==2.0.0rc3,akivymd, https://github.com/kivymd/KivyMD/archive/f0c64aeeb467f1057809d408879c6d314a4cddfb.zip, sdl2_ttf==2.0.15
 
 # (str) Custom source folders for requirements
 # Sets custom source for any requirements with recipes
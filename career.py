@@ -0,0 +1,135 @@
+"""
+Career
+
+Statistics of a player over all their saved matches : the total and the average per set of every
+counter of Player.stats, the matches and sets won and lost.
+The aggregates are stored in the 'careers' table of the database. Each save of a match takes its
+previous save out of the aggregates and adds the new one, and a deletion takes it out, so a career
+is read without reading the matches again.
+
+Usage : python career.py [--rebuild]   (checks the stored careers against the saved matches)
+"""
+
+import argparse
+import time
+
+from player import STATS_KEYS, COUNTERS, played_set_indexes
+
+RESULT_COLUMNS = ('matches', 'wins', 'losses', 'sets_played', 'sets_won', 'sets_lost')
+"""Columns of a career which count matches and sets (the other columns are the counters)."""
+
+CAREER_COLUMNS = RESULT_COLUMNS + COUNTERS
+
+CAREER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS careers (
+    name TEXT PRIMARY KEY,
+    {}
+);
+""".format(',\n    '.join('{} INTEGER NOT NULL DEFAULT 0'.format(column)
+                          for column in CAREER_COLUMNS))
+# One row per player name. A player is the same player in every match where they have this name.
+
+UPDATE_CAREER = 'UPDATE careers SET {} WHERE name = ?'.format(
+    ', '.join('{0} = {0} + ?'.format(column) for column in CAREER_COLUMNS))
+
+
+def career_values(match_data, slot):
+    """Returns what a match adds to the career of one of its players (slot 1 or 2), in the order
+    of CAREER_COLUMNS"""
+    name = match_data['player{}_name'.format(slot)]
+    stats = match_data['player{}_stats'.format(slot)]
+    opponent_stats = match_data['player{}_stats'.format(3 - slot)]
+    if 'totals' in stats:
+        totals = [stats['totals'][key] for key in COUNTERS]
+    else:  # Stats of the saves older than the totals
+        totals = [sum(stats[key] if key in STATS_KEYS else stats['service_stats'][key])
+                  for key in COUNTERS]
+    sets_played = len(played_set_indexes(stats, opponent_stats))
+    sets_won = sum(1 for winner in match_data['sets_winners'] if winner == name)
+    sets_lost = sum(1 for winner in match_data['sets_winners'] if winner not in (None, name))
+    ended = match_data['match_ended']
+    won = ended and stats['sets'] > opponent_stats['sets']
+    lost = ended and stats['sets'] < opponent_stats['sets']
+    return [1, int(won), int(lost), sets_played, sets_won, sets_lost] + totals
+
+
+def update_careers(connection, match_data, sign=1):
+    """Adds a match to the careers of its players (sign=1), or takes it out (sign=-1).
+    A career is created by the first match of a player and removed with their last one."""
+    for slot in (1, 2):
+        name = match_data['player{}_name'.format(slot)]
+        values = [sign * value for value in career_values(match_data, slot)]
+        connection.execute('INSERT OR IGNORE INTO careers (name) VALUES (?)', (name,))
+        connection.execute(UPDATE_CAREER, values + [name])
+        if sign < 0:
+            connection.execute('DELETE FROM careers WHERE name = ? AND matches = 0', (name,))
+
+
+def compute_careers(matches):
+    """Returns the careers of every player of some matches (read once), computed from scratch :
+    {name: values in the order of CAREER_COLUMNS}"""
+    careers = {}
+    for match_data in matches:
+        for slot in (1, 2):
+            name = match_data['player{}_name'.format(slot)]
+            values = careers.setdefault(name, [0] * len(CAREER_COLUMNS))
+            for index, value in enumerate(career_values(match_data, slot)):
+                values[index] += value
+    return careers
+
+
+def rebuild_careers(connection, matches):
+    """Replaces the stored careers with the careers computed from some matches (read once)"""
+    connection.execute('DELETE FROM careers')
+    connection.executemany(
+        'INSERT INTO careers (name, {}) VALUES (?, {})'.format(
+            ', '.join(CAREER_COLUMNS), ', '.join('?' * len(CAREER_COLUMNS))),
+        [[name] + values for name, values in compute_careers(matches).items()])
+
+
+def read_careers(connection):
+    """Returns the stored careers : {name: values in the order of CAREER_COLUMNS}"""
+    return {row['name']: [row[column] for column in CAREER_COLUMNS]
+            for row in connection.execute('SELECT * FROM careers')}
+
+
+def career_stats(row):
+    """Returns the career of a row of the 'careers' table as a dict : the results, the 'totals'
+    of every counter and their 'averages' per set played"""
+    career = {column: row[column] for column in RESULT_COLUMNS}
+    career['name'] = row['name']
+    career['totals'] = {key: row[key] for key in COUNTERS}
+    career['averages'] = {key: row[key] / row['sets_played'] if row['sets_played'] else 0.0
+                          for key in COUNTERS}
+    return career
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        description='Checks the stored careers against the careers computed from the saved matches.')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='replaces the stored careers with the computed ones')
+    arguments = parser.parse_args()
+    from match_repository import MatchRepository
+    repository = MatchRepository()
+    try:
+        start = time.perf_counter()
+        computed = compute_careers(repository.iter_matches())
+        stored = read_careers(repository.connection)
+        print('{} careers computed from the saved matches in {:.2f} s'.format(
+            len(computed), time.perf_counter() - start))
+        different = sorted(name for name in set(computed) | set(stored)
+                           if computed.get(name) != stored.get(name))
+        for name in different:
+            print('  {} : stored {}, computed {}'.format(name, stored.get(name), computed.get(name)))
+        print('{} careers differ'.format(len(different)))
+        if arguments.rebuild:
+            repository.rebuild_careers()
+            print('Careers rebuilt')
+    finally:
+        repository.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,7 @@ import json
 from kivy.properties import StringProperty
 from kivy.metrics import dp
 from kivy.uix.widget import Widget
+from kivy.uix.recycleview import RecycleView
 from kivy.clock import Clock
 
 from kivymd.app import MDApp
@@ -18,48 +19,11 @@ from kivymd.uix.gridlayout import MDGridLayout
 from kivymd.uix.behaviors import RectangularElevationBehavior
 from kivymd.uix.button import MDRaisedButton, MDFlatButton, MDFillRoundFlatButton
 from kivymd.uix.dialog import MDDialog
+from kivymd.uix.bottomnavigation import MDBottomNavigationItem
 
-from stats_display import StatsDisplay
-
-
-def safe_div(num1, num2):
-    """Returns an integer division.
-    Avoids error if division by zero."""
-    if num2 <= 0:
-        return 0
-    return num1 / num2
-
-
-def number_comparison(col1, col3, highlight='max'):
-    """Highlights the right statistic depending on number values"""
-    result = None, None
-    if highlight == 'ratio':  # Highlights the greatest number ratio
-        ratio1 = col1.ids.label.text
-        col1.ids.label.font_size = '14sp'
-        col3.ids.label.font_size = '14sp'
-        div_numbers1 = list(map(int, ratio1.split('/')))
-        quotient1 = safe_div(div_numbers1[0], div_numbers1[1])
-        ratio2 = col3.ids.label.text
-        div_numbers2 = list(map(int, ratio2.split('/')))
-        quotient2 = safe_div(div_numbers2[0], div_numbers2[1])
-        if quotient1 > quotient2:
-            result = col1, col3
-        elif quotient2 > quotient1:
-            result = col3, col1
-    elif highlight in ('max', 'min'):
-        final_num1 = int(col1.ids.label.text.split(' ')[0])
-        final_num2 = int(col3.ids.label.text.split(' ')[0])
-        if highlight == 'max':  # Highlights the greatest number
-            if final_num1 > final_num2:
-                result = col1, col3
-            elif final_num2 > final_num1:
-                result = col3, col1
-        else:  # Highlights the lowest number
-            if final_num1 > final_num2:
-                result = col3, col1
-            elif final_num2 > final_num1:
-                result = col1, col3
-    return result
+from gamescreen import show_set_squares
+from scoring import match_format_of
+from stats_display import StatsDisplay, played_sets
 
 
 class Rows(MDBoxLayout):
@@ -77,6 +41,10 @@ class DataLine(MDBoxLayout, RectangularElevationBehavior):
     """Line that contains the result of a match"""
 
 
+class StatsScroll(RecycleView):
+    """Scrolling white page of a tab, contains a LeaderBoard"""
+
+
 class LeaderBoard(MDGridLayout):
     """
     Table which contains DataLines
@@ -87,7 +55,7 @@ class LeaderBoard(MDGridLayout):
         Adds the rows that will include all the stats.
     """
 
-    def add_rows(self, rows_number=19):
+    def add_rows(self, rows_number=20):
         """Add the rows that will include all the stats"""
         self.rows = rows_number
         rows_liste = []
@@ -107,7 +75,22 @@ class DataScreen(MDScreen):
         Instance of the class StatsPointApp.
 
     stats_widgets : list
-        Contains the four widgets which display the stats.
+        Contains the widgets which display the stats : one per set played, then the whole match.
+
+    total_widget : object
+        Instance of LeaderBoard. Displays the stats of the whole match.
+
+    set_tabs : list
+        Tabs of the sets (MDBottomNavigationItem), created the first time a match needs them.
+
+    set_widgets : list
+        Instances of LeaderBoard, the stats of the set of each tab.
+
+    shown_sets : int
+        Number of set tabs in the bottom navigation.
+
+    match_id : int
+        Id of the match picked by the user.
 
     data : dict
         Contains the data of the whole match.
@@ -135,18 +118,30 @@ class DataScreen(MDScreen):
     start():
         Is called only once, at the start of the application to initialize widgets.
 
+    show_set_tabs(sets_number):
+        Shows one tab per set played, then the tab of the whole match.
+
+    create_set_tab():
+        Creates the tab of the next set.
+
     show_scoreboard():
         Shows a scoreboard displaying the result of the tennis match.
 
-    change_square_design(player_name, line_score, data):
-        Changes the square design if a player wins a set.
-
     show_stats():
         Shows all statistics of a tennis match.
 
+    leverage_loaded(match_format):
+        Called by the loading thread once a LeverageTable is loaded.
+
+    show_pressure_points(match_format):
+        Shows the stats again once the pressure points can be computed.
+
     check_stat_winner():
         Highlights the best statistic between both players.
 
+    stats_winners():
+        Returns the winners of every row of each widget of stats_widgets.
+
     reset_square_design(square):
         Resets the design of a square.
 
@@ -161,9 +156,13 @@ class DataScreen(MDScreen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.app = MDApp.get_running_app()
-        self.stats_widgets = [LeaderBoard(), LeaderBoard(), LeaderBoard(), LeaderBoard()]
-        for widget in self.stats_widgets:
-            widget.add_rows()
+        self.total_widget = LeaderBoard()
+        self.total_widget.add_rows()
+        self.stats_widgets = [self.total_widget]
+        self.set_tabs = []
+        self.set_widgets = []
+        self.shown_sets = 0
+        self.match_id = None
         self.data = None
         self.stats_display = None
         self.confirmation_dialog = None
@@ -174,8 +173,10 @@ class DataScreen(MDScreen):
             ["plus", lambda x: self.show_confirmation_dialog()]]
         self.confirmation_dialog = None
         self.app.root.ids.my_toolbar.title = 'Statistics'
-        for i in range(4):  # To avoid duplicated widgets with the last row
-            self.stats_widgets[i].children[0].clear_widgets()
+        self.data = self.app.repository.load_match(self.match_id)
+        for widget in self.stats_widgets:  # To avoid duplicated widgets with the last row
+            widget.children[0].clear_widgets()
+        self.show_set_tabs(played_sets(self.data))
         self.show_scoreboard()
         self.show_stats()
         self.check_stat_winner()
@@ -197,8 +198,8 @@ class DataScreen(MDScreen):
 
     def change_last_row(self):
         """Changes the last row of the stats_widget with the special row which contains a button"""
-        for i in range(4):
-            self.stats_widgets[i].children[0].add_widget(self.create_special_row())
+        for widget in self.stats_widgets:
+            widget.children[0].add_widget(self.create_special_row())
 
     def scroll_animation(self):
         """Scrolls the screen from the top to the bottom, to make the user aware of the last row"""
@@ -206,11 +207,12 @@ class DataScreen(MDScreen):
         with open('json_files/settings.json', 'r') as r_json:
             content = json.load(r_json)
         if content['show_tutorial']:  # Make it happen only once
-            self.ids.set1_scroll.scroll_to(
+            scroll = self.stats_widgets[0].parent
+            scroll.scroll_to(
                 self.stats_widgets[0].children[0], animate={'d': 0.5, 't': 'out_quad'})
 
             Clock.schedule_once(
-                lambda x: self.ids.set1_scroll.scroll_to(
+                lambda x: scroll.scroll_to(
                     self.stats_widgets[0].children[-1], animate={'d': 0.5, 't': 'out_quad'}), 3)
             content['show_tutorial'] = False
             with open('json_files/settings.json', 'w') as w_json:
@@ -218,61 +220,85 @@ class DataScreen(MDScreen):
 
     def start(self):
         """Is called only once, at the start of the application to initialize widgets"""
-        self.ids.set1_scroll.add_widget(self.stats_widgets[0])
-        self.ids.set2_scroll.add_widget(self.stats_widgets[1])
-        self.ids.set3_scroll.add_widget(self.stats_widgets[2])
-        self.ids.total_scroll.add_widget(self.stats_widgets[3])
+        self.ids.total_scroll.add_widget(self.total_widget)
+
+    def show_set_tabs(self, sets_number):
+        """Shows one tab per set played, then the tab of the whole match"""
+        navigation = self.ids.bottom_navigation
+        if sets_number != self.shown_sets:
+            while len(self.set_tabs) < sets_number:
+                self.create_set_tab()
+            for tab in self.set_tabs[:self.shown_sets] + [self.ids.total_tab]:
+                navigation.remove_widget(tab)
+            for tab in self.set_tabs[:sets_number] + [self.ids.total_tab]:
+                navigation.add_widget(tab)  # The tabs are shown in the order they are added
+            self.shown_sets = sets_number
+        self.stats_widgets = self.set_widgets[:sets_number] + [self.total_widget]
+        navigation.switch_tab('set1')
+
+    def create_set_tab(self):
+        """Creates the tab of the next set"""
+        number = len(self.set_tabs) + 1
+        tab = MDBottomNavigationItem(name='set{}'.format(number), text='Set {}'.format(number),
+                                     icon='tennis')
+        scroll = StatsScroll()
+        widget = LeaderBoard()
+        widget.add_rows()
+        scroll.add_widget(widget)
+        tab.add_widget(scroll)
+        tab.bind(on_pre_enter=lambda *args: setattr(scroll, 'scroll_y', 1))
+        self.set_tabs.append(tab)
+        self.set_widgets.append(widget)
 
     def show_scoreboard(self):
         """Shows a scoreboard with the result of the tennis match"""
-        players = [self.ids.player1, self.ids.player2]
-        stats = [self.data['player1_stats'], self.data['player2_stats']]
-        for player, name, stat in zip(
-                players, [self.data['player1_name'], self.data['player2_name']], stats):
-            player.ids.player_name.text = name
-            player.ids.set1.ids.label.text = str(stat['total_games'][0])
-            player.ids.set2.ids.label.text = str(stat['total_games'][1])
-            player.ids.set3.ids.label.text = str(stat['total_games'][2])
-            self.change_square_design(name, player, self.data)
-
-    def change_square_design(self, player_name, line_score, data):
-        """Changes the square design if a player wins a set"""
-        squares = [line_score.ids.set1, line_score.ids.set2, line_score.ids.set3]
-        for (index, square) in zip(range(3), squares):
-            if player_name == data['sets_winners'][index]:
-                square.md_bg_color = (0.91, 0.46, 0.07, 1)
-                square.ids.label.text_color = (1, 1, 1, 1)
-                square.elevation = 5
-            else:
-                square.md_bg_color = (self.app.get_rgba_from_hex('#f1f1f1'))
-                square.ids.label.text_color = (0, 0, 0, 1)
-                square.elevation = 0
+        sets_number = len(self.stats_widgets) - 1
+        winners = self.data['sets_winners'] + [None] * sets_number
+        for line_score, slot in ((self.ids.player1, 'player1'), (self.ids.player2, 'player2')):
+            name = self.data['{}_name'.format(slot)]
+            line_score.ids.player_name.text = name
+            show_set_squares(line_score.ids.sets,
+                             self.data['{}_stats'.format(slot)]['total_games'][:sets_number],
+                             [winner == name for winner in winners], self.app)
 
     def show_stats(self):
         """Shows all statistics of a tennis match"""
         players = ['player1', 'player2']
-        leaderboard = self.stats_widgets.copy()
-        leaderboard.pop(-1)
-        self.stats_display = StatsDisplay(self.data)
-        for manche in range(3):
-            self.stats_display.write_captions(leaderboard[manche])
+        self.stats_display = StatsDisplay(self.data, on_leverage_ready=self.leverage_loaded)
+        for manche, leaderboard in enumerate(self.stats_widgets[:-1]):
+            self.stats_display.write_captions(leaderboard)
             for player in players:
                 stats = self.stats_display.get_stats_sets(manche, player)
-                self.stats_display.display_stats(stats, leaderboard[manche], player)
-        self.stats_display.write_captions(self.stats_widgets[3])
+                self.stats_display.display_stats(stats, leaderboard, player)
+        self.stats_display.write_captions(self.total_widget)
         for player in players:
             stats = self.stats_display.get_match_stats(player)
-            self.stats_display.display_stats(stats, self.stats_widgets[3], player)
+            self.stats_display.display_stats(stats, self.total_widget, player)
+
+    def leverage_loaded(self, match_format):
+        """Called by the loading thread once a LeverageTable is loaded (see StatsDisplay)"""
+        Clock.schedule_once(lambda dt: self.show_pressure_points(match_format))
+
+    def show_pressure_points(self, match_format):
+        """Shows the stats again, with the pressure points, if they were waiting for this table"""
+        if self.stats_display is None or not self.stats_display.pressure_pending \
+                or match_format_of(self.data) != match_format:
+            return
+        for widget in self.stats_widgets:  # Same steps as on_pre_enter
+            widget.children[0].clear_widgets()
+        self.show_stats()
+        self.check_stat_winner()
+        self.change_last_row()
 
     def check_stat_winner(self):
         """Highlights the best statistic between both players"""
 
-        for manche in self.stats_widgets:
-            for row in manche.children:
+        for leaderboard, winners in zip(self.stats_widgets, self.stats_winners()):
+            for row, winner in zip(leaderboard.children, winners):
                 if len(row.children) > 0:
                     cols = [row.ids.col1, row.ids.col3]
-                    winner_col, looser_col = number_comparison(cols[0], cols[1], row.highlight)
-                    if winner_col is not None and looser_col is not None:
+                    if winner:
+                        winner_col, looser_col = cols[winner - 1], cols[2 - winner]
                         winner_col.md_bg_color = (0.91, 0.46, 0.07, 1)
                         winner_col.ids.label.text_color = (1, 1, 1, 1)
                         winner_col.elevation = 5
@@ -281,11 +307,19 @@ class DataScreen(MDScreen):
                         self.reset_square_design(cols[0])
                         self.reset_square_design(cols[1])
 
+                    if row.highlight == 'ratio':
+                        for i in range(2):
+                            cols[i].ids.label.font_size = '14sp'
                     if row.highlight == 'name':
                         for i in range(2):
                             cols[i].size_hint_x = 1
                             cols[i].md_bg_color = (1, 1, 1, 1)
 
+    def stats_winners(self):
+        """Returns the winners of every row (see StatsDisplay) of each widget of stats_widgets"""
+        winners = self.stats_display.winners
+        return winners[:len(self.stats_widgets) - 1] + [winners[-1]]
+
     def reset_square_design(self, square):
         """Resets the design of the Square"""
         square.md_bg_color = (self.app.get_rgba_from_hex('#f1f1f1'))
@@ -12,6 +12,16 @@ from kivymd.uix.screen import MDScreen
 from kivy.metrics import dp
 from kivy.utils import platform
 from akivymd.uix.piechart import AKPieChart
+from akivymd.uix.charts import AKLineChart
+
+from drill_manager import FORM_WINDOW
+
+TREND_WINDOW = FORM_WINDOW
+"""Number of matches of the form shown in the trend chart (see FormTracker), the same as the
+number of matches averaged for the drills."""
+
+TREND_POINTS = 10
+"""Number of matches shown in the trend chart."""
 
 
 def safe_div(num1, num2):
@@ -37,6 +47,9 @@ class DiagramScreen(MDScreen):
     piecharts : list
         Contains all the piechart widgets (UI).
 
+    trend_chart : object
+        Instance of AKLineChart. Recent form of the player (UI).
+
     Methods
     -------
     on_pre_enter():
@@ -47,12 +60,16 @@ class DiagramScreen(MDScreen):
 
     make_piechart():
         Creates the piechart.
+
+    show_trend():
+        Shows the trend of the recent form of the player.
     """
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.app = MDApp.get_running_app()
         self.player_info = None
         self.piecharts = [0, 0, 0]
+        self.trend_chart = None
 
     def on_pre_enter(self, *args):
         """Is called just before the user sees the screen."""
@@ -75,21 +92,22 @@ class DiagramScreen(MDScreen):
         self.ids.charts1.add_widget(self.piecharts[0], 1)
         self.ids.charts2.add_widget(self.piecharts[1], 1)
         self.ids.charts3.add_widget(self.piecharts[2], 1)
+        self.show_trend()
 
     def get_piechart_stats(self):
         """"Get all the stats necessary for the 3 piecharts"""
-        player_stats = self.player_info
-        backhand_winners = sum(player_stats['backhand_winners'])
-        forehand_winners = sum(player_stats['forehand_winners'])
-        net_winners = sum(player_stats['net_winners'])
+        totals = self.player_info['totals']
+        backhand_winners = totals['backhand_winners']
+        forehand_winners = totals['forehand_winners']
+        net_winners = totals['net_winners']
         total_winners = backhand_winners + forehand_winners + net_winners
         backhand_winners_ratio = ceil(safe_div(backhand_winners, total_winners) * 100)
         forehand_winners_ratio = ceil(safe_div(forehand_winners, total_winners) * 100)
         net_winners_ratio = ceil(safe_div(net_winners, total_winners) * 100)
 
-        backhand_unforced_errors = sum(player_stats['backhand_unforced_errors'])
-        forehand_unforced_errors = sum(player_stats['forehand_unforced_errors'])
-        net_unforced_errors = sum(player_stats['net_unforced_errors'])
+        backhand_unforced_errors = totals['backhand_unforced_errors']
+        forehand_unforced_errors = totals['forehand_unforced_errors']
+        net_unforced_errors = totals['net_unforced_errors']
         total_unforced_errors = backhand_unforced_errors + forehand_unforced_errors + net_unforced_errors
         backhand_unforced_errors_ratio = ceil(safe_div(backhand_unforced_errors, total_unforced_errors) * 100)
         forehand_unforced_errors_ratio = ceil(safe_div(forehand_unforced_errors, total_unforced_errors) * 100)
@@ -110,6 +128,34 @@ class DiagramScreen(MDScreen):
                 item[str(i)] -= 1
         return [item1, item2, item3]
 
+    def show_trend(self):
+        """Shows the 1st serve in (%) of the form of the player after each of their matches,
+        up to the analysed match (the same matches as the drills, see DrillManager)"""
+        form_screen = self.app.root.ids.form_screen
+        name = form_screen.match_stats['{}_name'.format(form_screen.analysis_info['player'])]
+        slot = int(form_screen.analysis_info['player'][-1])  # 'player1' -> 1
+        trend = self.app.repository.get_form_trend(
+            name, self.app.root.ids.data_screen.match_id, slot, TREND_WINDOW, TREND_POINTS)
+        if self.trend_chart is not None:
+            self.ids.charts4.remove_widget(self.trend_chart)
+            self.trend_chart = None
+        if not trend:
+            self.ids.trend_label.text = '[u]Form[/u]'  # Not the text of the last player shown
+            return
+        self.trend_chart = AKLineChart(
+            x_values=list(range(1, len(trend) + 1)),
+            y_values=[round(metrics['first_serve_in']) for metrics in trend],
+            size_hint=[None, None],
+            size=(dp(150), dp(150))
+        )
+        self.ids.charts4.add_widget(self.trend_chart, 1)
+        form = trend[-1]
+        self.ids.trend_label.text = (
+            '[u]Form[/u] ({} last matches)\n\n1st serve in: {:.0f}%\nReturn points won: {:.0f}%'
+            '\nUnforced errors/set: {:.1f}'.format(
+                TREND_WINDOW, form['first_serve_in'], form['return_points_won'],
+                form['unforced_errors_per_set']))
+
     def make_piechart(self, items):
         """Creates the piechart"""
         piechart = AKPieChart(
@@ -12,6 +12,9 @@ import random
 
 from kivymd.app import MDApp
 
+FORM_WINDOW = 5
+"""Number of matches averaged : the analysed match and the matches of the player saved before."""
+
 
 class DrillManager:
     """
@@ -35,8 +38,12 @@ class DrillManager:
     player_info: dict
         All the stats of the player.
 
+    match_id: int
+        Id of the analysed match.
+
     avg_stats: dict
-        The average of a player's stats for all completed sets.
+        The average of a player's stats for the completed sets of the analysed match and of
+        their matches saved before it (FORM_WINDOW matches in all). None if no set is completed.
 
     sorted_drills: list
         The list of all drills that corresponds to a player's level.
@@ -70,6 +77,7 @@ class DrillManager:
         self.app = MDApp.get_running_app()
         self.player_info = self.app.root.ids.form_screen.player_info
         self.analysis_info = self.app.root.ids.form_screen.analysis_info
+        self.match_id = self.app.root.ids.data_screen.match_id
         self.avg_stats = self.get_average_stats()
         self.sorted_drills = []
         self.drill_schedule = {}
@@ -82,27 +90,13 @@ class DrillManager:
 
     def get_average_stats(self):
         """Get the value of the avg_stats attribute"""
-        sorting_stats = {}
-        for key, value in self.player_info.items():
-            result = 0
-            if type(value).__name__ == 'list' and key not in ['total_games', 'total_points']:
-                for i in range(self.player_info['ended_sets']):
-                    result += value[i]
-                result /= self.player_info['ended_sets']
-                result = round(result)
-                sorting_stats[key] = result
-            elif type(value).__name__ == 'dict':
-                for service_key, service_value in value.items():
-                    for i in range(self.player_info['ended_sets']):
-                        result += service_value[i]
-                    result /= self.player_info['ended_sets']
-                    result = round(result)
-                    sorting_stats[service_key] = result
-
-        return sorting_stats
+        slot = int(self.analysis_info['player'][-1])  # 'player1' -> 1
+        return self.app.repository.average_set_stats(self.match_id, slot, FORM_WINDOW)
 
     def make_drill_schedule(self):
         """Get the value of the drill_schedule attribute using the conditions attribute"""
+        if self.avg_stats is None:  # No completed set : no weakness, the drills are picked randomly
+            return
         parameters = {}
         for condition in self.conditions:
             if condition['style'] == self.analysis_info['style']:
@@ -0,0 +1,162 @@
+"""
+FormTracker
+
+Recent form of a player : the aggregates of their last 5, 10 and 20 saved matches (see Career)
+and the metrics shown in the trend chart of the DiagramScreen.
+The sums of each window are stored in the database and slid with each save or deletion of a
+match : the match is added to the windows it enters and the match pushed out of a window is
+subtracted, so a save costs the same whatever the size of the history.
+"""
+
+from career import CAREER_COLUMNS, career_stats, career_values
+
+WINDOWS = (5, 10, 20)
+"""Number of matches of each window (the most recent matches, in the order of their ids)."""
+
+FORM_SCHEMA = """
+CREATE TABLE IF NOT EXISTS form_matches (
+    name TEXT NOT NULL,
+    match_id INTEGER NOT NULL,
+    slot INTEGER NOT NULL,
+    {0},
+    PRIMARY KEY (name, match_id, slot)
+);
+CREATE TABLE IF NOT EXISTS forms (
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    {0},
+    PRIMARY KEY (name, size)
+);
+""".format(',\n    '.join('{} INTEGER NOT NULL DEFAULT 0'.format(column)
+                          for column in CAREER_COLUMNS))
+# 'form_matches' holds what each saved match adds to the career of each of its players,
+# 'forms' holds the sums of the last 'size' rows of 'form_matches' of a player.
+
+UPDATE_FORM = 'UPDATE forms SET {} WHERE name = ? AND size = ?'.format(
+    ', '.join('{0} = {0} + ?'.format(column) for column in CAREER_COLUMNS))
+
+# The 'match_id >= ?' / 'match_id <= ?' bounds let SQLite search the primary key from the match
+# (with the OR alone, it reads every row of the player).
+NEWER_ROWS = ('SELECT COUNT(*) FROM (SELECT 1 FROM form_matches WHERE name = ? '
+              'AND match_id >= ? AND (match_id > ? OR slot > ?) LIMIT {})'.format(max(WINDOWS)))
+
+RANKED_ROW = ('SELECT * FROM form_matches WHERE name = ? '
+              'ORDER BY match_id DESC, slot DESC LIMIT 1 OFFSET ?')
+
+
+def row_values(row):
+    """Returns the values of a row of 'form_matches' in the order of CAREER_COLUMNS"""
+    return [row[column] for column in CAREER_COLUMNS]
+
+
+def add_to_form(connection, name, size, values, sign=1):
+    """Adds the values of a match to a window of a player (sign=1), or subtracts them (sign=-1)"""
+    connection.execute('INSERT OR IGNORE INTO forms (name, size) VALUES (?, ?)', (name, size))
+    connection.execute(UPDATE_FORM, [sign * value for value in values] + [name, size])
+
+
+def update_form(connection, match_id, match_data, sign=1):
+    """Slides the windows of the players of a match when it's saved (sign=1) or deleted (sign=-1) :
+    the match enters or leaves each window it belongs to, and the oldest match of the window
+    leaves it (or the match right after the window enters it)."""
+    for slot in (1, 2):
+        name = match_data['player{}_name'.format(slot)]
+        key = (name, match_id, slot)
+        if sign > 0:
+            values = career_values(match_data, slot)
+            connection.execute('INSERT INTO form_matches (name, match_id, slot, {}) VALUES '
+                               '(?, ?, ?, {})'.format(', '.join(CAREER_COLUMNS),
+                                                      ', '.join('?' * len(CAREER_COLUMNS))),
+                               list(key) + values)
+        else:
+            row = connection.execute('SELECT * FROM form_matches WHERE name = ? AND match_id = ? '
+                                     'AND slot = ?', key).fetchone()
+            if row is None:
+                continue
+            values = row_values(row)
+        rank = connection.execute(NEWER_ROWS, (name, match_id, match_id, slot)).fetchone()[0]
+        for size in WINDOWS:
+            if rank >= size:  # The match is older than the window
+                continue
+            add_to_form(connection, name, size, values, sign)
+            # Saved : the match at the rank 'size' leaves the window.
+            # Deleted : the match at the rank 'size' enters it (it moves to the rank size - 1).
+            moved = connection.execute(RANKED_ROW, (name, size)).fetchone()
+            if moved is not None:
+                add_to_form(connection, name, size, row_values(moved), -sign)
+        if sign < 0:
+            connection.execute('DELETE FROM form_matches WHERE name = ? AND match_id = ? '
+                               'AND slot = ?', key)
+            connection.execute('DELETE FROM forms WHERE name = ? AND matches = 0', (name,))
+
+
+def rebuild_forms(connection, matches):
+    """Replaces the forms with the ones of a list of matches (with their 'match_id')"""
+    connection.execute('DELETE FROM form_matches')
+    connection.execute('DELETE FROM forms')
+    for match_data in sorted(matches, key=lambda match_data: match_data['match_id']):
+        update_form(connection, match_data['match_id'], match_data)
+
+
+def read_form_window(connection, name, match_id, slot, size):
+    """Returns the (match_id, slot) of the last 'size' matches of a player up to one of their
+    matches (included), the most recent first"""
+    return [(row['match_id'], row['slot']) for row in connection.execute(
+        'SELECT match_id, slot FROM form_matches WHERE name = ? '
+        'AND match_id <= ? AND (match_id < ? OR slot <= ?) '
+        'ORDER BY match_id DESC, slot DESC LIMIT ?', (name, match_id, match_id, slot, size))]
+
+
+def form_metrics(form):
+    """Returns the metrics of a form (or a career) : percentages and numbers per set"""
+    totals = form['totals']
+    first_service_in = totals['service_points_played'] - totals['second_service']
+    return {
+        'first_serve_in': safe_percent(first_service_in, totals['service_points_played']),
+        'first_serve_won': safe_percent(totals['first_service_won'], first_service_in),
+        'return_points_won': safe_percent(totals['return_points_won'],
+                                          totals['return_points_played']),
+        'unforced_errors_per_set': form['averages']['unforced_errors'],
+        'winners_per_set': form['averages']['winners'],
+    }
+
+
+def safe_percent(part, whole):
+    """Returns the percentage of part in whole, 0 if whole is 0"""
+    return 100 * part / whole if whole > 0 else 0.0
+
+
+def read_form(connection, name, size):
+    """Returns the form of a player over their last 'size' matches (same format as a career,
+    with its 'metrics'), None if they have no saved match"""
+    row = connection.execute(
+        'SELECT * FROM forms WHERE name = ? AND size = ?', (name, size)).fetchone()
+    if row is None:
+        return None
+    form = career_stats(row)
+    form['metrics'] = form_metrics(form)
+    return form
+
+
+def read_form_trend(connection, name, match_id, slot, size, points):
+    """
+    Returns the metrics of the form of a player after each of their last 'points' matches up to
+    one of their matches (included), from the oldest to the most recent (for the trend chart).
+    Only the last points + size - 1 matches of the player are read.
+    """
+    rows = connection.execute(
+        'SELECT * FROM form_matches WHERE name = ? '
+        'AND match_id <= ? AND (match_id < ? OR slot <= ?) '
+        'ORDER BY match_id DESC, slot DESC LIMIT ?',
+        (name, match_id, match_id, slot, points + size - 1)).fetchall()[::-1]
+    sums = [0] * len(CAREER_COLUMNS)
+    trend = []
+    for index, row in enumerate(rows):
+        for column, value in enumerate(row_values(row)):
+            sums[column] += value
+        if index >= size:  # The match leaving the window
+            for column, value in enumerate(row_values(rows[index - size])):
+                sums[column] -= value
+        if index >= len(rows) - points:
+            trend.append(form_metrics(career_stats(dict(zip(CAREER_COLUMNS, sums), name=name))))
+    return trend
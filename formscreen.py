@@ -116,13 +116,14 @@ class FormScreen(MDScreen):
                 compteur += 1
         pl_stats['ended_sets'] = compteur
         self.player_info = pl_stats
+        totals = pl_stats['totals']
         critical_stats = [
-            pl_stats['backhand_unforced_errors'], pl_stats['forehand_unforced_errors'],
-            pl_stats['backhand_winners'], pl_stats['forehand_winners'], pl_stats['net_winners'],
-            pl_stats['net_unforced_errors']]
+            totals['backhand_unforced_errors'], totals['forehand_unforced_errors'],
+            totals['backhand_winners'], totals['forehand_winners'], totals['net_winners'],
+            totals['net_unforced_errors']]
         enough_data = True
         for stat in critical_stats:
-            if sum(stat) == 0:
+            if stat == 0:
                 enough_data = False
         if self.player_info['ended_sets'] == 0:
             Snackbar(text='You need to finish at least 1 set!').show()
@@ -7,7 +7,6 @@ Module that manages the scoreboard system and the input of the information for e
 
 
 import logging as log
-import json
 from kivymd.uix.screen import MDScreen
 from kivymd.app import MDApp
 from kivymd.uix.dialog import MDDialog
@@ -16,6 +15,13 @@ from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.uix.behaviors import RectangularElevationBehavior
 from kivy.properties import StringProperty
 
+from win_probability import match_win_probability
+from point_log import (encode_event, ACE, DOUBLE_FAULT, WINNER, UNFORCED_ERROR, FORCED_ERROR,
+                       NO_SHOT, FOREHAND, BACKHAND, VOLLEY)
+
+OUTCOMES = {'unforced_error': UNFORCED_ERROR, 'forced_error': FORCED_ERROR, 'winner': WINNER}
+"""Outcome of the point for each detail_context."""
+
 
 class ScoreLine(MDBoxLayout, RectangularElevationBehavior):
     """Box containing the score with a shadow effect"""
@@ -29,6 +35,27 @@ class Box(MDBoxLayout, RectangularElevationBehavior):
     """White box with shadow effect"""
 
 
+def show_set_squares(layout, games, sets_won, app):
+    """
+    Shows one Square per set in a layout, with the games of a player.
+    The squares of the sets won by the player (sets_won[index] is True) are highlighted.
+    """
+    while len(layout.children) < len(games):
+        layout.add_widget(Square())
+    while len(layout.children) > len(games):
+        layout.remove_widget(layout.children[0])
+    for index, square in enumerate(reversed(layout.children)):  # Kivy keeps the last child first
+        square.ids.label.text = str(games[index])
+        if sets_won[index]:
+            square.md_bg_color = (0.91, 0.46, 0.07, 1)
+            square.ids.label.text_color = (1, 1, 1, 1)
+            square.elevation = 5
+        else:
+            square.md_bg_color = (app.get_rgba_from_hex('#f1f1f1'))
+            square.ids.label.text_color = (0, 0, 0, 1)
+            square.elevation = 0
+
+
 class GameScreen(MDScreen):
     """
     Contains all the buttons that are used by the user during a match
@@ -44,6 +71,9 @@ class GameScreen(MDScreen):
     looser : object
         Instance of the class Player. The player who lost the point.
 
+    serve : int
+        Serve number of the current point (1 or 2).
+
     dialog : object
         Instance of MDDialog class. It is a UI widget.
 
@@ -58,11 +88,17 @@ class GameScreen(MDScreen):
     on_pre_leave():
         Is called just before leaving the screen.
 
-    update_scoreboard(winner, opponent, match, score_change=True):
+    play_point(winner, outcome, shot=NO_SHOT):
+        Sends the event of the point to the match, then updates the scoreboard.
+
+    update_scoreboard(match):
         Updates the scoreboard each time a player wins a point.
 
-    square_design(player, line_score):
-        Change the design of the square object when a player wins a set.
+    show_win_probability(match):
+        Shows the probability that each player wins the match.
+
+    show_sets(match):
+        Shows the games of every set started, the sets won are highlighted.
 
     check_server(match):
         Hide or show the tennis-ball icon depending on which player serves.
@@ -85,9 +121,6 @@ class GameScreen(MDScreen):
     leave_match(match_end=False):
         Leaves and saves the match.
 
-    check_service_degree():
-        Checks if it's a first or second serve.
-
     press_ace():
         Called at each ace.
 
@@ -100,6 +133,12 @@ class GameScreen(MDScreen):
     press_save():
         Called each time the user wants to save the match.
 
+    press_undo():
+        Called when the user wants to cancel the last point.
+
+    press_redo():
+        Called when the user wants to play again the last point cancelled.
+
     press_player(winner_pl, looser_pl):
         Called when the user chose the winner of the point.
 
@@ -135,6 +174,7 @@ class GameScreen(MDScreen):
         super().__init__(**kwargs)
         self.winner = None
         self.looser = None
+        self.serve = 1
         self.dialog = None
         self.match = None
         self.confirmation_save_match = None
@@ -146,41 +186,44 @@ class GameScreen(MDScreen):
         self.ids.score_line2.ids.player_name.text = self.match.player2.get_name()
         self.ids.pl1_btn.text = self.match.player1.get_name()
         self.ids.pl2_btn.text = self.match.player2.get_name()
-        self.update_scoreboard(self.winner, self.looser, self.match, False)
+        self.update_scoreboard(self.match)
         self.app.root.ids.my_toolbar.title = 'Game'
 
     def on_pre_leave(self, *args):
         """Called just before leaving the screen"""
         self.ids.game_manager.current = 'service'
 
-    def update_scoreboard(self, winner, opponent, match, score_change=True):
+    def play_point(self, winner, outcome, shot=NO_SHOT):
+        """Sends the event of the point to the match, then updates the scoreboard"""
+        server_slot = 1 if self.match.server is self.match.player1 else 2
+        winner_slot = 1 if winner is self.match.player1 else 2
+        self.match.play_point(encode_event(server_slot, winner_slot, self.serve, outcome, shot))
+        self.update_scoreboard(self.match)
+
+    def update_scoreboard(self, match):
         """Updates the scoreboard each time a player wins a point"""
-        if score_change:
-            match.points_win(winner, opponent)
-        players = [match.player1, match.player2]
-        line_scores = [self.ids.score_line1, self.ids.score_line2]
-
-        for (player, line_score) in zip(players, line_scores):
-            line_score.ids.points_label.ids.label.text = player.get_points_amount()
-            line_score.ids.set1.ids.label.text = str(player.total_games[0])
-            line_score.ids.set2.ids.label.text = str(player.total_games[1])
-            line_score.ids.set3.ids.label.text = str(player.total_games[2])
-            self.square_design(player, line_score)
+        self.ids.score_line1.ids.points_label.ids.label.text = match.player1.get_points_amount()
+        self.ids.score_line2.ids.points_label.ids.label.text = match.player2.get_points_amount()
+        self.show_sets(match)
+        self.serve = 1
         self.ids.fault.text = 'Fault'  # Fixes problem with Fault / DoubleFault button
         self.check_server(match)
-
-    def square_design(self, player, line_score):
-        """Changes the square design when a player wins a set"""
-        squares = [line_score.ids.set1, line_score.ids.set2, line_score.ids.set3]
-        for (index, square) in zip(range(3), squares):
-            if player.name == self.match.sets_winners[index]:
-                square.md_bg_color = (0.91, 0.46, 0.07, 1)
-                square.ids.label.text_color = (1, 1, 1, 1)
-                square.elevation = 5
-            else:
-                square.md_bg_color = (self.app.get_rgba_from_hex('#f1f1f1'))
-                square.ids.label.text_color = (0, 0, 0, 1)
-                square.elevation = 0
+        self.show_win_probability(match)
+
+    def show_win_probability(self, match):
+        """Shows the probability that each player wins the match (see WinProbability)"""
+        player1_probability = match_win_probability(match)
+        self.ids.score_line1.ids.win_probability.text = '{:.0%}'.format(player1_probability)
+        self.ids.score_line2.ids.win_probability.text = '{:.0%}'.format(1 - player1_probability)
+
+    def show_sets(self, match):
+        """Shows the games of every set started, the sets won are highlighted"""
+        sets_number = match.set_index + (not match.is_over())
+        winners = match.sets_winners + [None] * sets_number
+        for player, line_score in ((match.player1, self.ids.score_line1),
+                                   (match.player2, self.ids.score_line2)):
+            show_set_squares(line_score.ids.sets, player.total_games[:sets_number],
+                             [winner == player.name for winner in winners], self.app)
 
     def check_server(self, match):
         """Hide or show the tennis-ball icon depending on which player serves"""
@@ -245,39 +288,14 @@ class GameScreen(MDScreen):
     def leave_match(self, match_end=False):
         """Leaves and saves the match"""
         if self.confirmation_save_match is not None or match_end:
-            full_list = self.app.root.ids.save_screen.full_list  # Full json file (list format)
-            to_remove_dict = self.app.root.ids.save_screen.picked_game_data
-            # Lines that we want to remove, to avoid duplication of saves
-            if full_list is not None and to_remove_dict is not None:
-                # Check to avoid errors, if the file is empty
-                for i in full_list:
-                    if to_remove_dict == i:
-                        full_list.remove(self.app.root.ids.save_screen.picked_game_data)
-                        with open('../statspoint_data.json', 'w') as file:
-                            json.dump(full_list, file, indent=4, sort_keys=True)
-                            # Rewrite the json file, without the duplication
             self.app.change_screen('home_screen')
             self.cancel()
             self.match.save_match(match_end)
 
-    def check_service_degree(self):
-        """Checks if it's a first or second serve"""
-        if self.winner.name == self.match.server.name:
-            if self.ids.fault.text == 'Fault':
-                self.match.server.service_stats['first_service_won'][self.match.set_index] += 1
-            elif self.ids.fault.text == 'Double Fault':
-                self.match.server.service_stats['second_service_won'][self.match.set_index] += 1
-        log.info('First Service Won {}'.format(
-            self.match.server.service_stats['first_service_won']))
-
     def press_ace(self):
         """Called at each ace"""
         self.set_winner(self.match.server, self.match.receiver)
-        self.check_service_degree()
-        self.match.receiver.stats['return_points_played'][self.match.set_index] -= 1
-        self.match.ace_played()
-        self.update_scoreboard(self.match.server, self.match.receiver, self.match)
-        log.info('yes' + str(self.match.server.total_points))
+        self.play_point(self.winner, ACE)
 
     def press_rally(self):
         """Called each time there is a rally"""
@@ -285,29 +303,30 @@ class GameScreen(MDScreen):
 
     def press_fault(self):
         """Called each time there is a fault in the service"""
-        if self.ids.fault.text == "Fault":
+        if self.serve == 1:
+            self.serve = 2
             self.ids.fault.text = 'Double Fault'
-            self.match.server.service_stats['second_service'][self.match.set_index] += 1
-            self.match.server.service_stats['second_service_in'][self.match.set_index] += 1
-
-        elif self.ids.fault.text == 'Double Fault':
-            self.match.server.service_stats['second_service_in'][self.match.set_index] -= 1
-            self.match.server.service_stats['double_faults'][self.match.set_index] += 1
-            self.match.receiver.stats['return_points_played'][self.match.set_index] -= 1
-            log.info(self.match.server.service_stats['double_faults'])
-            self.ids.fault.text = 'Fault'
-            self.update_scoreboard(self.match.receiver, self.match.server, self.match)
+        else:
+            self.set_winner(self.match.receiver, self.match.server)
+            self.play_point(self.winner, DOUBLE_FAULT)
 
     def press_save(self):
         """Called when the user wants to save the match"""
         self.show_dialog_save_match_confirmation()
 
+    def press_undo(self):
+        """Called when the user wants to cancel the last point"""
+        self.match.undo_point()
+        self.update_scoreboard(self.match)
+
+    def press_redo(self):
+        """Called when the user wants to play again the last point cancelled"""
+        self.match.redo_point()
+        self.update_scoreboard(self.match)
+
     def press_player(self, winner_pl, looser_pl):
         """Called when the user chose the winner of the point"""
         self.set_winner(winner_pl, looser_pl)
-        self.check_service_degree()
-        if self.match.receiver.name == self.winner.name:
-            self.match.receiver.stats['return_points_won'][self.match.set_index] += 1
         self.ids.detail1_box.ids.caption.text = 'Why did {} win the point?'.format(
             self.winner.get_name())
         self.ids.game_manager.current = 'game_details1'
@@ -317,13 +336,12 @@ class GameScreen(MDScreen):
         self.detail_context = 'unforced_error'
         self.ids.detail2_box.ids.caption.text = "{}'s unforced error was a ...".format(
             self.looser.get_name())
-        self.looser.stats['unforced_errors'][self.match.set_index] += 1
         self.ids.game_manager.current = 'game_details2'
 
     def press_forced_error(self):
         """Called when there is a forced error"""
         self.detail_context = 'forced_error'
-        self.update_scoreboard(self.winner, self.looser, self.match)
+        self.play_point(self.winner, FORCED_ERROR)
         self.ids.game_manager.current = 'service'
 
     def press_winner(self):
@@ -332,34 +350,18 @@ class GameScreen(MDScreen):
         self.ids.detail2_box.ids.caption.text = "{}'s winner was a ...".format(
             self.winner.get_name())
         self.ids.game_manager.current = 'game_details2'
-        self.winner.stats['winners'][self.match.set_index] += 1
 
     def press_volley(self):
         """Called if the last shot was a volley"""
-        if self.detail_context == 'forced_error':
-            self.winner.stats['net_points'][self.match.set_index] += 1
-        elif self.detail_context == 'winner':
-            self.winner.stats['net_points'][self.match.set_index] += 1
-            self.winner.stats['net_winners'][self.match.set_index] += 1
-        elif self.detail_context == 'unforced_error':
-            self.looser.stats['net_unforced_errors'][self.match.set_index] += 1
-        self.update_scoreboard(self.winner, self.looser, self.match)
+        self.play_point(self.winner, OUTCOMES[self.detail_context], VOLLEY)
         self.ids.game_manager.current = 'service'
 
     def press_backhand(self):
         """Called if the last shot was a backhand"""
-        self.update_scoreboard(self.winner, self.looser, self.match)
+        self.play_point(self.winner, OUTCOMES[self.detail_context], BACKHAND)
         self.ids.game_manager.current = 'service'
-        if self.detail_context == 'unforced_error':
-            self.looser.stats['backhand_unforced_errors'][self.match.set_index] += 1
-        elif self.detail_context == 'winner':
-            self.winner.stats['backhand_winners'][self.match.set_index] += 1
 
     def press_forehand(self):
         """Called if the last shot was a forehand"""
-        self.update_scoreboard(self.winner, self.looser, self.match)
+        self.play_point(self.winner, OUTCOMES[self.detail_context], FOREHAND)
         self.ids.game_manager.current = 'service'
-        if self.detail_context == 'unforced_error':
-            self.looser.stats['forehand_unforced_errors'][self.match.set_index] += 1
-        elif self.detail_context == 'winner':
-            self.winner.stats['forehand_winners'][self.match.set_index] += 1
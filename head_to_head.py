@@ -0,0 +1,146 @@
+"""
+HeadToHead
+
+Index of the saved matches by pair of players : the matches between two players, their set
+scores and the aggregates of both players over these matches (see Career).
+The index is stored in the database and updated with each save or deletion of a match, so the
+head-to-head of two players is read with one lookup of their pair.
+
+Usage : python head_to_head.py NAME1 NAME2
+"""
+
+import argparse
+import json
+
+from career import RESULT_COLUMNS, career_values
+from player import COUNTERS, played_set_indexes
+
+SIDE_COLUMNS = RESULT_COLUMNS[1:] + COUNTERS
+"""Columns of each player of a pair ('matches' is shared by both players)."""
+
+PAIR_COLUMNS = ('matches',) + tuple(
+    '{}_{}'.format(side, column) for side in ('first', 'second') for column in SIDE_COLUMNS)
+
+HEAD_TO_HEAD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS head_to_heads (
+    first TEXT NOT NULL,
+    second TEXT NOT NULL,
+    {},
+    PRIMARY KEY (first, second)
+);
+CREATE TABLE IF NOT EXISTS head_to_head_matches (
+    match_id INTEGER PRIMARY KEY,
+    first TEXT NOT NULL,
+    second TEXT NOT NULL,
+    set_scores TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS head_to_head_pair ON head_to_head_matches (first, second);
+""".format(',\n    '.join('{} INTEGER NOT NULL DEFAULT 0'.format(column)
+                          for column in PAIR_COLUMNS))
+# A pair is stored once, with the names in alphabetical order ('first' <= 'second').
+# 'set_scores' holds the games of both players (first, second) and the winner of every set
+# played in JSON : [[6, 4, "first name"], [2, 3, null], ...].
+
+UPDATE_PAIR = 'UPDATE head_to_heads SET {} WHERE first = ? AND second = ?'.format(
+    ', '.join('{0} = {0} + ?'.format(column) for column in PAIR_COLUMNS))
+
+
+def pair_slots(match_data):
+    """Returns the slots of the players of a match in the order of their pair (first, second)"""
+    if match_data['player2_name'] < match_data['player1_name']:
+        return 2, 1
+    return 1, 2
+
+
+def set_scores(match_data):
+    """Returns the games of both players (in the order of their pair) and the winner of every set
+    played in a match"""
+    first, second = (match_data['player{}_stats'.format(slot)]
+                     for slot in pair_slots(match_data))
+    winners = list(match_data['sets_winners']) + [None] * len(first['total_games'])
+    return [[first['total_games'][index], second['total_games'][index], winners[index]]
+            for index in played_set_indexes(first, second)]
+
+
+def update_head_to_head(connection, match_id, match_data, sign=1):
+    """Adds a match to the index (sign=1), or takes it out (sign=-1) : the sums of its pair,
+    and its set scores. A pair without any match left is removed."""
+    first_slot, second_slot = pair_slots(match_data)
+    pair = [match_data['player{}_name'.format(slot)] for slot in (first_slot, second_slot)]
+    values = [sign] + [sign * value for slot in (first_slot, second_slot)
+                       for value in career_values(match_data, slot)[1:]]
+    connection.execute('INSERT OR IGNORE INTO head_to_heads (first, second) VALUES (?, ?)', pair)
+    connection.execute(UPDATE_PAIR, values + pair)
+    if sign > 0:
+        connection.execute(
+            'INSERT INTO head_to_head_matches (match_id, first, second, set_scores) '
+            'VALUES (?, ?, ?, ?)', [match_id] + pair + [json.dumps(set_scores(match_data))])
+    else:
+        connection.execute('DELETE FROM head_to_head_matches WHERE match_id = ?', (match_id,))
+        connection.execute(
+            'DELETE FROM head_to_heads WHERE first = ? AND second = ? AND matches = 0', pair)
+
+
+def rebuild_head_to_heads(connection, matches):
+    """Replaces the index with the one of a list of matches (with their 'match_id')"""
+    connection.execute('DELETE FROM head_to_heads')
+    connection.execute('DELETE FROM head_to_head_matches')
+    for match_data in matches:
+        update_head_to_head(connection, match_data['match_id'], match_data)
+
+
+def read_head_to_head(connection, name1, name2):
+    """
+    Returns the head-to-head of two players, None if they never played each other :
+    the ids and set scores of their matches (games of name1, games of name2, winner) and
+    the results and 'totals' of each player over these matches ('player1' is name1).
+    """
+    swapped = name2 < name1
+    pair = (name2, name1) if swapped else (name1, name2)
+    row = connection.execute(
+        'SELECT * FROM head_to_heads WHERE first = ? AND second = ?', pair).fetchone()
+    if row is None:
+        return None
+    head_to_head = {'player1_name': name1, 'player2_name': name2, 'matches': row['matches']}
+    sides = ('second', 'first') if swapped else ('first', 'second')
+    for slot, side in zip((1, 2), sides):
+        player = {column: row['{}_{}'.format(side, column)] for column in RESULT_COLUMNS[1:]}
+        player['totals'] = {key: row['{}_{}'.format(side, key)] for key in COUNTERS}
+        head_to_head['player{}'.format(slot)] = player
+    head_to_head['match_list'] = []
+    for match_row in connection.execute(
+            'SELECT match_id, set_scores FROM head_to_head_matches WHERE first = ? AND second = ? '
+            'ORDER BY match_id', pair):
+        scores = json.loads(match_row['set_scores'])
+        if swapped:
+            scores = [[second, first, winner] for first, second, winner in scores]
+        head_to_head['match_list'].append({'match_id': match_row['match_id'],
+                                           'set_scores': scores})
+    return head_to_head
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Shows the head-to-head of two players.')
+    parser.add_argument('name1')
+    parser.add_argument('name2')
+    arguments = parser.parse_args()
+    from match_repository import MatchRepository
+    repository = MatchRepository()
+    try:
+        head_to_head = repository.get_head_to_head(arguments.name1, arguments.name2)
+    finally:
+        repository.close()
+    if head_to_head is None:
+        print('{} and {} never played each other'.format(arguments.name1, arguments.name2))
+        return
+    player1, player2 = head_to_head['player1'], head_to_head['player2']
+    print('{} {} - {} {} ({} matches)'.format(arguments.name1, player1['wins'], player2['wins'],
+                                             arguments.name2, head_to_head['matches']))
+    for match in head_to_head['match_list']:
+        print('  match {} : {}'.format(match['match_id'], ' '.join(
+            '{}-{}'.format(games1, games2) for games1, games2, _ in match['set_scores'])))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,7 @@ from kivymd.app import MDApp
 from kivymd.uix.screen import MDScreen
 from player import Player
 from match import Match
+from scoring import BEST_OF_3, BEST_OF_5
 
 
 class InputScreen(MDScreen):
@@ -44,7 +45,9 @@ class InputScreen(MDScreen):
         """Creates a match when button pressed"""
         player1 = Player(self.ids.entry1.text)
         player2 = Player(self.ids.entry2.text)
-        self.app.root.ids.game_screen.match = Match(player1, player2, self.ids.entry3.text)
+        match_format = BEST_OF_5 if self.ids.best_of_5.active else BEST_OF_3
+        self.app.root.ids.game_screen.match = Match(player1, player2, self.ids.entry3.text,
+                                                    match_format=match_format)
         self.app.root.ids.game_screen.ids.score_line1.ids.server.opacity = 0
         # Fixes small graphic bug
         self.app.root.ids.game_screen.ids.score_line2.ids.server.opacity = 0
@@ -73,7 +76,4 @@ class InputScreen(MDScreen):
         if condition:  # If everything is fine, creates the match
             self.create_match()
             self.app.root.ids.game_screen.show_dialog_server()
-            self.app.root.ids.save_screen.picked_game_data = None
-            # To avoid problems with saved games
-            self.app.root.ids.save_screen.full_list = None
             self.app.change_screen('game_screen')
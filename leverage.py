@@ -0,0 +1,263 @@
+"""
+Leverage
+
+Importance of every point of a match : how much the probability of winning the match changes
+between winning and losing the point (see WinProbability).
+The leverage of every score of the ScoringTable is computed once for a grid of serve
+probabilities and stored in a file of bytes, loaded at startup. The pressure points of a saved
+match are then found with one lookup per point, without running the model again.
+
+Usage : python leverage.py [--format NAME]   (builds the file again)
+"""
+
+import argparse
+import logging as log
+import struct
+import threading
+import time
+from array import array
+from os import path
+
+from point_log import apply_event, replay
+from scoring import (scoring_table, BEST_OF_3, BEST_OF_5, CHANGE_SERVER, FLAG_BITS, FORMATS,
+                     MATCH_OVER)
+from win_probability import live_probability, serve_bucket
+
+LEVERAGE_FILE = '../statspoint_leverage_{}.bin'
+"""Path of the file of a match format (the fields of the MatchFormat are in the name)."""
+
+FILE_HEADER = struct.Struct('<4sHII')
+"""Magic bytes, file version, number of states and number of serve buckets of the grid."""
+
+MAGIC = b'SPLV'
+FILE_VERSION = 1
+
+SERVE_GRID = (50, 55, 60, 65, 70, 75, 80)
+"""Serve buckets (see WinProbability) for which the leverages are computed."""
+
+SCALE = 255
+"""A leverage is stored in one byte : 255 means that the point decides the match."""
+
+HIGH_LEVERAGE = 0.08
+"""
+Leverage of a pressure point. The average point of a best-of-3 match has a leverage of 0.03,
+about one point in ten is above 0.08 (break points, set points, tight tie-breaks...).
+"""
+
+PLAYABLE_FORMATS = (BEST_OF_3, BEST_OF_5)
+"""Formats of the matches played in the app (see InputScreen) : loaded at startup."""
+
+_lock = threading.Lock()
+_tables = {}
+_waiting_lock = threading.Lock()
+_waiting = {}
+"""Functions to call once the table of a match format is loaded, by format being loaded."""
+
+
+class LeverageTable:
+    """
+    Leverage of every score of a match format, for every pair of serve buckets of the grid.
+    ...
+    Attributes
+    ----------
+    match_format : object
+        Instance of MatchFormat.
+
+    states : int
+        Number of scores of the ScoringTable.
+
+    leverages : array
+        One byte per (player 1 bucket, player 2 bucket, state, player 1 serving).
+
+    Methods
+    -------
+    leverage(state, player1_serving, bucket1, bucket2):
+        Returns the leverage of the point played from a state.
+
+    is_pressure_point(state, player1_serving, bucket1, bucket2):
+        Returns True if the point played from a state is a pressure point.
+    """
+
+    def __init__(self, match_format, leverages):
+        self.match_format = match_format
+        self.states = len(scoring_table(match_format).scores)
+        self.leverages = leverages
+
+    def leverage(self, state, player1_serving, bucket1, bucket2):
+        """Returns the leverage of the point played from a state (the buckets are rounded to the grid)"""
+        index = ((grid_index(bucket1) * len(SERVE_GRID) + grid_index(bucket2)) * self.states
+                 + state) * 2 + player1_serving
+        return self.leverages[index] / SCALE
+
+    def is_pressure_point(self, state, player1_serving, bucket1, bucket2):
+        """Returns True if the point played from a state is a pressure point"""
+        return self.leverage(state, player1_serving, bucket1, bucket2) >= HIGH_LEVERAGE
+
+
+def grid_index(bucket):
+    """Returns the index of the nearest serve bucket of the grid"""
+    step = SERVE_GRID[1] - SERVE_GRID[0]
+    return min(len(SERVE_GRID) - 1, max(0, round((bucket - SERVE_GRID[0]) / step)))
+
+
+def leverage_file_path(match_format):
+    """Returns the path of the leverage file of a match format"""
+    return LEVERAGE_FILE.format('-'.join(str(int(field)) for field in match_format))
+
+
+def build_leverages(match_format=BEST_OF_3):
+    """Computes the leverages of a match format (about 2 s for best-of-3)"""
+    table = scoring_table(match_format)
+
+    def probability(state, player1_serving, slot, bucket1, bucket2):
+        """Probability that the player 1 wins the match after the player of the slot wins a point"""
+        transition = table.transitions[2 * state + slot]
+        next_state = transition >> FLAG_BITS
+        if table.transitions[2 * next_state] == MATCH_OVER:
+            return 1.0 if slot == 0 else 0.0
+        next_serving = player1_serving ^ bool(transition & CHANGE_SERVER)
+        return live_probability(table.scores[next_state], next_serving, bucket1, bucket2,
+                                match_format)
+
+    leverages = array('B')
+    for bucket1 in SERVE_GRID:
+        for bucket2 in SERVE_GRID:
+            for state in range(len(table.scores)):
+                for player1_serving in (False, True):
+                    if table.transitions[2 * state] == MATCH_OVER:
+                        leverages.append(0)
+                        continue
+                    swing = (probability(state, player1_serving, 0, bucket1, bucket2)
+                             - probability(state, player1_serving, 1, bucket1, bucket2))
+                    leverages.append(round(swing * SCALE))
+    return leverages
+
+
+def save_leverages(leverages, match_format=BEST_OF_3, file_path=None):
+    """Writes the leverages of a match format in its file"""
+    file_path = file_path or leverage_file_path(match_format)
+    with open(file_path, 'wb') as leverage_file:
+        leverage_file.write(FILE_HEADER.pack(
+            MAGIC, FILE_VERSION, len(scoring_table(match_format).scores), len(SERVE_GRID)))
+        leverages.tofile(leverage_file)
+
+
+def read_leverages(match_format=BEST_OF_3, file_path=None):
+    """Returns the leverages stored in the file of a match format, None if it is missing or outdated"""
+    file_path = file_path or leverage_file_path(match_format)
+    if not path.exists(file_path):
+        return None
+    expected = (MAGIC, FILE_VERSION, len(scoring_table(match_format).scores), len(SERVE_GRID))
+    with open(file_path, 'rb') as leverage_file:
+        if FILE_HEADER.unpack(leverage_file.read(FILE_HEADER.size)) != expected:
+            return None
+        leverages = array('B', leverage_file.read())
+    if len(leverages) != len(SERVE_GRID) ** 2 * expected[2] * 2:
+        return None
+    return leverages
+
+
+def load_leverage_table(match_format=BEST_OF_3):
+    """
+    Returns the LeverageTable of a match format. It is read from its file the first time,
+    the file is built if it is missing (the first launch of the app, a few seconds).
+    Blocks until the table is loaded : the screens use get_leverage_table.
+    """
+    with _lock:
+        if match_format not in _tables:
+            leverages = read_leverages(match_format)
+            if leverages is None:
+                start = time.perf_counter()
+                leverages = build_leverages(match_format)
+                save_leverages(leverages, match_format)
+                log.info('Leverage table built in {:.1f} s'.format(time.perf_counter() - start))
+            _tables[match_format] = LeverageTable(match_format, leverages)
+        return _tables[match_format]
+
+
+def get_leverage_table(match_format, on_ready=None):
+    """
+    Returns the LeverageTable of a match format if it is loaded, without waiting.
+    Otherwise returns None and loads the table in a background thread :
+    on_ready(match_format) is then called from this thread once it is loaded.
+    """
+    with _waiting_lock:
+        leverage_table = _tables.get(match_format)
+        if leverage_table is not None:
+            return leverage_table
+        loading = match_format in _waiting
+        callbacks = _waiting.setdefault(match_format, [])
+        if on_ready is not None:
+            callbacks.append(on_ready)
+    if not loading:
+        threading.Thread(target=_load_in_background, args=(match_format,), daemon=True).start()
+    return None
+
+
+def preload_leverage_tables(match_formats=PLAYABLE_FORMATS):
+    """Loads the LeverageTables of match formats in background threads (called at startup)"""
+    for match_format in match_formats:
+        get_leverage_table(match_format)
+
+
+def _load_in_background(match_format):
+    """Loads the table of a match format, then calls the functions waiting for it"""
+    try:
+        load_leverage_table(match_format)
+    finally:
+        with _waiting_lock:
+            callbacks = _waiting.pop(match_format)
+    for on_ready in callbacks:
+        on_ready(match_format)
+
+
+def has_complete_log(match_data):
+    """Returns True if the event log of a saved match holds every point played.
+    The log of a match saved before the event logs only holds the points played since."""
+    return len(match_data['points_log']) == sum(
+        match_data['player{}_stats'.format(slot)]['totals']['total_points'] for slot in (1, 2))
+
+
+def pressure_points(match_data, leverage_table):
+    """
+    Returns the pressure points of a saved match, set by set, replayed from its event log :
+    (points won by the player 1, points won by the player 2, points played).
+    The serve buckets of the whole match are used for every point.
+    Returns None if the log does not start at the first point of the match (see has_complete_log).
+    """
+    if not has_complete_log(match_data):
+        return None
+    match_format = leverage_table.match_format
+    bucket1 = serve_bucket(match_data['player1_stats']['totals'])
+    bucket2 = serve_bucket(match_data['player2_stats']['totals'])
+    sets_number = 2 * match_format.sets_to_win - 1
+    won = ([0] * sets_number, [0] * sets_number)
+    played = [0] * sets_number
+    engine = replay([], match_format=match_format)
+    for event in match_data['points_log']:
+        set_index = engine.set_index
+        delta = apply_event(engine, event)
+        if delta is None:
+            break
+        player1_serving = not event >> 1 & 1
+        if leverage_table.is_pressure_point(delta >> 8, player1_serving, bucket1, bucket2):
+            played[set_index] += 1
+            won[event & 1][set_index] += 1
+    return won[0], won[1], played
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Builds the leverage file of a match format.')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='best_of_3')
+    arguments = parser.parse_args()
+    match_format = FORMATS[arguments.format]
+    start = time.perf_counter()
+    leverages = build_leverages(match_format)
+    save_leverages(leverages, match_format)
+    print('{} : {} bytes in {:.2f} s'.format(
+        leverage_file_path(match_format), len(leverages), time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -13,8 +13,6 @@ The app also helps the player by giving interesting drills depending on the resu
 Author : Frank Tischhauser
 """
 import logging as log
-import json
-from os import path
 
 from kivymd.app import MDApp
 from kivymd.uix.screen import MDScreen
@@ -24,6 +22,7 @@ from kivymd.uix.dialog import MDDialog
 from kivymd.uix.button import MDFlatButton
 
 from kivy.lang import Builder
+from kivy.clock import Clock
 from kivy.uix.screenmanager import SlideTransition
 from kivy.core.window import Window
 from kivy.utils import platform
@@ -42,6 +41,9 @@ from datascreen import DataScreen
 from formscreen import FormScreen
 from diagramscreen import DiagramScreen
 from trainingscreen import TrainingScreen
+from match_repository import MatchRepository
+from match_shards import SHARDS_DIRECTORY
+from leverage import preload_leverage_tables
 
 
 if platform == 'win':
@@ -131,9 +133,6 @@ class HomeScreen(MDScreen):
 
     on_leave():
         Is called when the user leaves the screen.
-
-    check_json_save():
-        Checks if the save file exists, and if not creates it.
     """
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -149,16 +148,6 @@ class HomeScreen(MDScreen):
     def on_leave(self, *args):
         """Is called when the user leaves the screen"""
         self.condition = True
-        if self.app.root.ids.manager.current != 'save_screen':
-            self.check_json_save()
-
-    def check_json_save(self):
-        """Checks if the save file exists, and if not creates it"""
-        if not path.exists('../statspoint_data.json'):
-            with open('json_files/data_template.json', 'r') as template_file:
-                template = json.load(template_file)
-            with open('../statspoint_data.json', 'w') as save_file:
-                json.dump(template, save_file, indent=4, sort_keys=True)
 
 
 class SettingScreen(MDScreen):
@@ -212,6 +201,11 @@ class StatsPointApp(MDApp):
     This class represents the app.
     It is necessary in order to use the kivy/kivyMD module.
     ...
+    Attributes
+    ----------
+    repository : object
+        Instance of the class MatchRepository. Gives access to all match saves.
+
     Methods
     -------
     build():
@@ -223,6 +217,15 @@ class StatsPointApp(MDApp):
     on_start():
         Called on launch.
 
+    on_pause():
+        Called when the app goes in the background.
+
+    on_stop():
+        Called when the app is closed.
+
+    on_save_written(match_id, operation):
+        Called by the persistence thread once a save is on disk.
+
     get_rgba_from_hex(color):
         Converts the hex color format into rgba color format.
 
@@ -251,12 +254,29 @@ class StatsPointApp(MDApp):
             0.15,
         ]
         log.info(get_color_from_hex(colors[palette[0]]['500']))
+        self.repository = MatchRepository(notify=self.on_save_written,
+                                          shards_directory=SHARDS_DIRECTORY)
 
         return Builder.load_file("kv/main.kv")
 
     def on_start(self):
         """Called on launch"""
         self.root.ids.data_screen.start()
+        # The leverage files are built at the first launch (a few seconds, in the background)
+        preload_leverage_tables()
+
+    def on_pause(self):
+        """Called when the app goes in the background (the phone may kill it)"""
+        self.repository.flush()
+        return True
+
+    def on_stop(self):
+        """Called when the app is closed, writes the pending saves"""
+        self.repository.close()
+
+    def on_save_written(self, match_id, operation):
+        """Called by the persistence thread once a save is on disk"""
+        Clock.schedule_once(lambda dt: log.info('Match {} : {} done'.format(match_id, operation)))
 
     def change_screen(self, screen_name, direction='left'):
         """
@@ -4,85 +4,64 @@ Match
 Module that manages the scoring and saving of a tennis match.
 """
 
-import json
 import logging as log
 
 from kivymd.app import MDApp
+from kivy.clock import Clock
 
+from scoring import ScoringEngine, BEST_OF_3
+from point_log import UndoHistory
 
-class Match:
+
+class Match(ScoringEngine):
     """
-    A class to represent a Tennis model and its rules.
+    Kivy adapter of the ScoringEngine : connects the end of the match to the GameScreen,
+    and saves the match in the repository.
     ...
     Attributes
     ----------
-    player1 : object
-        Instance of the class Player. It is the player 1 of the match.
-
-    player2 : object
-        Instance of the class Player. It is the player 2 of the match.
-
     match_name : str
         Name of the match.
 
-    server : object
-        Instance of the class Player. It is the player who serves.
-
-    receiver : object
-        Instance of the class Player. It is the player who receives.
-
     app : object
         Instance of the class StatsPointApp.
 
-    set_index : int
-        Number of played sets.
+    match_id : int
+        Id of the match in the repository (None until the match is saved).
 
-    sets_winners : list
-        Winner of each set.
+    points_log : bytearray
+        Event of every point played (see PointLog).
+
+    history : object
+        Instance of the class UndoHistory. The points played since the match was opened,
+        to undo them.
 
     Methods
     -------
-    points_games_counter(winner):
-        Counts the total point number of a player for each set.
-
     get_match_name():
         returns the name of the match.
 
-    points_win(winner, opponent):
-        Is called each time a player wins a point.
-        Returns the appropriate method depending on the scoreboard.
+    play_point(event):
+        Records the event of a point, and updates the stats and the score.
 
-    games_win(winner, opponent):
-        Is called each time a player wins a game.
-        Returns the appropriate method depending on the scoreboard.
+    undo_point():
+        Cancels the last point played.
 
-    sets_win(winner, opponent):
-        Is called each time a player wins a set.
-        Returns the appropriate method depending on the scoreboard.
+    redo_point():
+        Plays again the last point cancelled.
 
-    tie_break(winner, opponent):
-        Is called at the start of a Tie-Break.
-        Resets all the points_amount.
+    match_over(winner):
+        Leaves the game screen at the end of the match.
 
     save_match(match_ended):
         Is called when the game stops.
-        Saves the game in a JSON file.
-
-    ace_played():
-        Called when a player serves an ace.
-
-    check_break_point(winner, opponent):
-        Checks if it's a break point, if yes +1 in the statistics.
+        Saves the game in the match repository.
 
-    change_server():
-        The server becomes the receiver, and the receiver becomes the server.
+    See ScoringEngine for the scoring attributes and methods.
     """
 
-    points = [0, 15, 30, 40]
-    games = [0, 1, 2, 3, 4, 5, 6, 7]
-    sets = [0, 1, 2]
-
-    def __init__(self, player1, player2, match_name, server=None, receiver=None, sets_winners=None):
+    def __init__(self, player1, player2, match_name, server=None, receiver=None, sets_winners=None,
+                 match_id=None, points_log=None, match_format=BEST_OF_3):
         """
         Parameters
         ----------
@@ -97,167 +76,79 @@ class Match:
         receiver : object
             Instance of the class Player. The player who is returning.
         sets_winners : list
-            Winner of each set.
+            Winner of each set won.
+        match_id : int
+            Id of the match in the repository, if it has already been saved.
+        points_log : list
+            Events of the points already played, if the match has already been saved.
+        match_format : object
+            Instance of MatchFormat. The rules of the match (best-of-3 by default).
         """
-        if server is None:
-            server = player1
-        if receiver is None:
-            receiver = player2
-        if sets_winners is None:
-            sets_winners = [None, None, None]
-
-        self.player1 = player1
-        self.player2 = player2
+        super().__init__(player1, player2, server, receiver, sets_winners,
+                         on_match_over=self.match_over, match_format=match_format)
         self.match_name = match_name
-        self.server = server
-        self.receiver = receiver
-        self.set_index = self.player1.sets_amount + self.player2.sets_amount
         self.app = MDApp.get_running_app()
-        self.sets_winners = sets_winners
-
-    def points_games_counter(self, winner):
-        """Counts the total point number of a player for each set."""
-        winner.total_points[self.set_index] += 1
-        winner.total_games[self.set_index] = winner.games_amount
-        log.info('{} a {}pts'.format(winner.get_name(), winner.get_points_amount()))
-        log.info('Résumé des points gagnés dans le match {}'.format(
-            winner.get_total_points_amount()))
-        log.info('Résumé des jeux gagnés dans le match {}'.format(winner.get_total_games_amount()))
+        self.match_id = match_id
+        self.points_log = bytearray(points_log or [])
+        self.history = UndoHistory(self, self.points_log)
 
     def get_match_name(self):
         """Gets the name of the match"""
         return self.match_name
 
-    def points_win(self, winner, opponent):
-        """
-        Is called each time a player wins a point.
-        Returns the appropriate method depending on the scoreboard.
-        """
-        self.server.service_stats['service_points_played'][self.set_index] += 1
-        self.receiver.stats['return_points_played'][self.set_index] += 1
-        if winner.games_amount == 6 and opponent.games_amount == 6:
-            self.tie_break(winner, opponent)
-        elif winner.points_amount == 40 and opponent.points_amount != 40 \
-                and opponent.points_amount != 'AD' \
-                or winner.points_amount == 'AD':
-            winner.points_amount = 0
-            opponent.points_amount = 0
-            return self.games_win(winner, opponent)
-
-        else:
-
-            if opponent.points_amount == 40 and winner.points_amount == 40:
-                winner.points_amount = 'AD'
-            elif opponent.points_amount == 'AD' and winner.points_amount == 40:
-                opponent.points_amount = 40
-            else:
-                index = Match.points.index(winner.points_amount)
-                winner.points_amount = Match.points[index + 1]
-            self.check_break_point(winner, opponent)
-        self.points_games_counter(winner)
-
-    def games_win(self, winner, opponent):
-        """Is called each time a player wins a game.
-        Returns the appropriate method depending on the scoreboard."""
-        if self.server == opponent:  # Counts the number of return games won
-            winner.stats['return_game_won'][self.set_index] += 1
-        if winner.games_amount == 5 and opponent.games_amount < 5:
-            index = Match.games.index(winner.games_amount)
-            winner.games_amount = Match.games[index + 1]
-            return self.sets_win(winner, opponent)
-
-        elif winner.games_amount == 5 and opponent.games_amount == 6:
-            winner.games_amount = 6
-            winner.points_amount = 0
-            opponent.points_amount = 0
-            self.change_server()
-        elif winner.games_amount == 6 and opponent.games_amount == 5:
-            index = Match.games.index(winner.games_amount)
-            winner.games_amount = Match.games[index + 1]
-            return self.sets_win(winner, opponent)
-        else:
-            index = Match.games.index(winner.games_amount)
-            winner.games_amount = Match.games[index + 1]
-            self.change_server()
-        self.points_games_counter(winner)
-
-    def sets_win(self, winner, opponent):
-        """
-        Is called each time a player wins a set.
-        Returns the appropriate method depending on the scoreboard.
-        """
-        self.points_games_counter(winner)
-        self.change_server()
-        index = Match.sets.index(winner.sets_amount)
-        winner.sets_amount = Match.sets[index + 1]
-        winner.points_amount = 0
-        opponent.points_amount = 0
-        winner.games_amount = 0
-        opponent.games_amount = 0
-        self.sets_winners[self.set_index] = winner.name
-        self.set_index = self.player1.sets_amount + self.player2.sets_amount
-        if winner.sets_amount == 2:
-            self.app.root.ids.game_screen.leave_match(True)  # Forces the end of the match
-
-    def tie_break(self, winner, opponent):
-        """Is called at the start of a Tie-Break.
-        Resets all the points_amount."""
-        winner.points_amount += 1
-
-        if winner.points_amount < 7 or abs(winner.points_amount - opponent.points_amount) < 2:
-            if (winner.points_amount + opponent.points_amount) % 2 == 1:
-                self.change_server()
-        else:
-            index = Match.games.index(winner.games_amount)
-            winner.games_amount = Match.games[index + 1]
-            self.sets_win(winner, opponent)
+    def play_point(self, event):
+        """Records the event of a point, and updates the stats and the score"""
+        if self.history.play(event):
+            self._log_point(event)
+
+    def undo_point(self):
+        """Cancels the last point played"""
+        if self.history.undo():
+            log.info('Point annulé, le score est {}-{}'.format(
+                self.player1.get_points_amount(), self.player2.get_points_amount()))
+
+    def redo_point(self):
+        """Plays again the last point cancelled"""
+        if self.history.redo():
+            self._log_point(self.points_log[-1])
+
+    def _log_point(self, event):
+        """Logs the score after a point"""
+        winner = self.player2 if event & 1 else self.player1
+        log.info('{} a {}pts'.format(winner.get_name(), winner.get_points_amount()))
+        log.info('Résumé des points gagnés dans le match {}'.format(
+            winner.get_total_points_amount()))
+        log.info('Résumé des jeux gagnés dans le match {}'.format(winner.get_total_games_amount()))
+        log.info('Le serveur est ' + self.server.get_name())
 
-        self.points_games_counter(winner)
+    def match_over(self, winner):
+        """Leaves the game screen at the end of the match"""
+        log.info('{} wins the match'.format(winner.get_name()))
+        # Forces the end of the match once the last point has been fully scored
+        Clock.schedule_once(lambda dt: self.app.root.ids.game_screen.leave_match(True))
 
     def save_match(self, match_ended):
         """Is called when the game stops.
-        Saves the game in a JSON file."""
+        Saves the game in the match repository."""
         player1_name = self.player1.get_name()
         player2_name = self.player2.get_name()
-        players = [self.player1, self.player2]
-        for player in players:
-            player.stats['points'] = player.points_amount
-            player.stats['games'] = player.games_amount
-            player.stats['sets'] = player.sets_amount
+        for player in (self.player1, self.player2):
+            wrong_totals = player.check_totals()
+            if wrong_totals:
+                log.warning('Wrong totals for {} : {}'.format(player.get_name(), wrong_totals))
         dictionnary = {"match_name": self.get_match_name(),
                        "player1_name": player1_name,
-                       "player1_stats": self.player1.stats,
+                       "player1_stats": self.player1.stats.to_dict(),
                        "player2_name": player2_name,
-                       "player2_stats": self.player2.stats,
+                       "player2_stats": self.player2.stats.to_dict(),
                        "server": self.server.name,
                        "receiver": self.receiver.name,
                        "sets_winners": self.sets_winners,
                        "match_ended": match_ended,
+                       "points_log": list(self.points_log),
+                       "match_format": list(self.match_format),
                        }
-        with open('../statspoint_data.json', 'r') as file:
-            existant_data = json.load(file)
-            existant_data.append(dictionnary)
-        with open('../statspoint_data.json', 'w') as js_file:
-            json.dump(existant_data, js_file, indent=4, sort_keys=True)
-
-    def change_server(self):
-        """The server becomes the receiver, and the receiver becomes the server"""
-        if self.server == self.player1:
-            self.server = self.player2
-            self.receiver = self.player1
-        else:
-            self.server = self.player1
-            self.receiver = self.player2
-        log.info('Le serveur est ' + self.server.get_name())
-
-    def ace_played(self):
-        """Called when a player serves an ace"""
-        log.info(self.server.name)
-        self.server.service_stats['ace'][self.set_index] += 1
-
-    def check_break_point(self, winner, opponent):
-        """Checks if it's a break point, if yes +1 in the statistics"""
-        if winner == self.receiver:
-            if winner.points_amount == 'AD' or \
-                    winner.get_points_amount() == '40' and opponent.get_points_amount() != '40':
-                winner.stats['break_points'][self.set_index] += 1
+        if self.match_id is None:
+            self.match_id = self.app.repository.new_match_id()
+        # A resumed match overwrites its own save
+        self.app.repository.save_match(self.match_id, dictionnary)
@@ -0,0 +1,624 @@
+"""
+MatchRepository
+
+Stores the saved matches in a SQLite database.
+Every screen queries only the rows it needs, instead of loading the whole save file.
+The database is in WAL mode : a write only appends its pages to the journal (the -wal file),
+and the journal is merged into the database by the worker thread, every JOURNAL_CHECKPOINT pages.
+"""
+
+import copy
+import json
+import logging as log
+import sqlite3
+from os import path
+
+from career import CAREER_SCHEMA, career_stats, rebuild_careers, update_careers
+from form_tracker import (FORM_SCHEMA, read_form, read_form_trend, read_form_window,
+                          rebuild_forms, update_form)
+from head_to_head import (HEAD_TO_HEAD_SCHEMA, read_head_to_head, rebuild_head_to_heads,
+                          update_head_to_head)
+from match_shards import MANIFEST_NAME, export_shards, remove_shard, write_shard
+from player import STATS_KEYS, SERVICE_STATS_KEYS
+from stats_codec import COUNTERS, encode_stats, decode_stats
+from stats_file import StatsFile, STATS_FILE, RECORD_SIZE
+from save_cache import SaveCache
+from persistence_worker import PersistenceWorker
+from save_reader import iter_saved_matches
+
+
+DATABASE_FILE = '../statspoint_data.db'
+LEGACY_SAVE_FILE = '../statspoint_data.json'
+LEGACY_JOURNAL_FILE = '../statspoint_data.journal'
+TEMPLATE_FILE = 'json_files/data_template.json'
+
+SCHEMA_VERSION = 8
+
+ITER_CHUNK = 100
+"""Number of rows read at once by MatchRepository.iter_matches."""
+JOURNAL_CHECKPOINT = 256
+"""Number of pages in the journal (-wal file) which starts its merge into the database."""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    match_name TEXT NOT NULL,
+    server TEXT NOT NULL,
+    receiver TEXT NOT NULL,
+    sets_winners TEXT NOT NULL,
+    match_ended INTEGER NOT NULL,
+    stats_slot INTEGER NOT NULL,
+    points_log BLOB NOT NULL DEFAULT x'',
+    match_format TEXT
+);
+CREATE TABLE IF NOT EXISTS players (
+    match_id INTEGER NOT NULL REFERENCES matches (id) ON DELETE CASCADE,
+    slot INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (match_id, slot)
+);
+CREATE INDEX IF NOT EXISTS players_name ON players (name);
+CREATE INDEX IF NOT EXISTS matches_name ON matches (match_name);
+CREATE INDEX IF NOT EXISTS matches_ended ON matches (match_ended);
+""" + CAREER_SCHEMA + HEAD_TO_HEAD_SCHEMA + FORM_SCHEMA
+# The match id is the rowid : looking up a match by id is a direct search in the table b-tree.
+# AUTOINCREMENT makes sure that the id of a deleted match is never given to another match
+# (the tables of the first version of the database are copied in a table with it, see
+# add_autoincrement).
+# 'stats_slot' is the slot of the StatsFile which holds the stats records of both players.
+# 'points_log' holds one byte per point played (see PointLog).
+# 'match_format' holds the fields of the MatchFormat in JSON
+# (NULL for the best-of-3 matches saved before the formats).
+# 'careers' holds the aggregates of every player over their saved matches (see Career).
+# 'head_to_heads' and 'head_to_head_matches' index the matches by pair of players (see HeadToHead).
+# 'forms' and 'form_matches' hold the recent form of every player (see FormTracker).
+
+
+class MatchRepository:
+    """
+    Gives access to the saved matches.
+    Reads are done in the calling thread, writes are done by a PersistenceWorker.
+    ...
+    Attributes
+    ----------
+    database_file : str
+        Path of the SQLite database.
+
+    connection : object
+        Instance of sqlite3.Connection. Used for the reads.
+
+    write_connection : object
+        Instance of sqlite3.Connection. Used by the worker thread for the writes.
+
+    stats_file : object
+        Instance of the class StatsFile. Contains the stats of every match.
+
+    cache : object
+        Instance of the class SaveCache. Avoids reading the same rows again.
+
+    last_id : int
+        Last id given to a match.
+
+    worker : object
+        Instance of the class PersistenceWorker.
+
+    shards_directory : str
+        Directory of the shards of the matches (see match_shards), kept up to date by the worker.
+        None if the repository has no shards.
+
+    Methods
+    -------
+    new_match_id():
+        Returns the id of a new match.
+
+    save_match(match_id, match_data):
+        Saves a match in the background.
+
+    delete_match(match_id):
+        Deletes a saved match in the background.
+
+    flush():
+        Waits until all pending writes are on disk.
+
+    close():
+        Writes the pending saves and closes the database.
+
+    list_headers():
+        Returns the header of all saved matches (without their stats).
+
+    load_match(match_id):
+        Returns the data of one saved match.
+
+    iter_matches():
+        Yields the data of every saved match, in the order of their ids.
+
+    average_set_stats(match_id, slot, window=1):
+        Returns the average of a player's stats for the ended sets of their last matches.
+
+    read_stats_slots():
+        Returns the ids of every saved match and the bytes of their stats slots.
+
+    get_career(name):
+        Returns the career of a player over all their saved matches.
+
+    list_careers():
+        Returns the career of every player.
+
+    rebuild_careers():
+        Computes the careers again from all the saved matches.
+
+    get_head_to_head(name1, name2):
+        Returns the matches and the aggregates of two players against each other.
+
+    get_form(name, size):
+        Returns the form of a player over their last matches.
+
+    get_form_trend(name, match_id, slot, size, points):
+        Returns the metrics of the form of a player after each of their matches up to one.
+
+    migrate_legacy_saves(save_file, journal_file):
+        Imports the matches of the old JSON save file.
+    """
+
+    def __init__(self, database_file=DATABASE_FILE, stats_file=STATS_FILE, notify=None,
+                 shards_directory=None):
+        self.database_file = database_file
+        new_database = not path.exists(database_file)
+        self.connection = connect(database_file)
+        self.stats_file = StatsFile(stats_file)
+        upgrade_schema(self.connection, self.stats_file)
+        self.stats_file.load_free_slots(
+            row[0] for row in self.connection.execute('SELECT stats_slot FROM matches'))
+        self.cache = SaveCache((database_file, database_file + '-wal', stats_file))
+        if new_database:
+            if path.exists(LEGACY_SAVE_FILE):
+                self.migrate_legacy_saves()
+            else:
+                with open(TEMPLATE_FILE, 'r') as template_file, self.connection:
+                    for match_data in json.load(template_file):
+                        insert_match(self.connection, self.stats_file, match_data)
+            self.stats_file.flush()
+        self.last_id = last_match_id(self.connection)
+        self.shards_directory = shards_directory
+        self.write_connection = None
+        self.worker = PersistenceWorker(self._write, notify, self._close_write_connection)
+        if shards_directory is not None and not path.exists(
+                path.join(shards_directory, MANIFEST_NAME)):
+            export_shards(self.iter_matches(), shards_directory)  # Then one shard per write
+
+    def new_match_id(self):
+        """Returns the id of a new match (ids are never given twice)"""
+        self.last_id += 1
+        return self.last_id
+
+    def save_match(self, match_id, match_data):
+        """Saves a match in the background, over its previous save if there is one"""
+        self.cache.check_file()
+        match_data = copy.deepcopy(dict(match_data, match_id=match_id))  # The game goes on
+        self.cache.put_match(match_id, match_data, match_header(match_data))
+        self.worker.submit(match_id, 'save', match_data)
+
+    def delete_match(self, match_id):
+        """Deletes a saved match in the background"""
+        self.cache.check_file()
+        self.cache.remove_match(match_id)
+        self.worker.submit(match_id, 'delete')
+
+    def flush(self):
+        """Waits until all pending writes are on disk"""
+        self.worker.flush()
+
+    def close(self):
+        """Writes the pending saves and closes the database"""
+        self.worker.stop()
+        self.connection.close()
+        self.stats_file.close()
+
+    def list_headers(self):
+        """Returns the header of all saved matches : id, names, ended flag and set winners"""
+        headers = self.cache.get_headers()
+        if headers is not None:
+            return headers
+        self.flush()
+        rows = self.connection.execute(
+            'SELECT matches.id, match_name, match_ended, sets_winners, '
+            'player1.name AS player1_name, player2.name AS player2_name FROM matches '
+            'JOIN players AS player1 ON player1.match_id = matches.id AND player1.slot = 1 '
+            'JOIN players AS player2 ON player2.match_id = matches.id AND player2.slot = 2 '
+            'ORDER BY matches.id')
+        headers = [{'match_id': row['id'],
+                    'match_name': row['match_name'],
+                    'player1_name': row['player1_name'],
+                    'player2_name': row['player2_name'],
+                    'match_ended': bool(row['match_ended']),
+                    'sets_winners': json.loads(row['sets_winners'])} for row in rows]
+        self.cache.set_headers(headers)
+        return headers
+
+    def load_match(self, match_id):
+        """Returns the data of one saved match"""
+        match_data = self.cache.get_match(match_id)
+        if match_data is not None:
+            return match_data
+        self.flush()
+        match_row = self.connection.execute(
+            'SELECT * FROM matches WHERE id = ?', (match_id,)).fetchone()
+        if match_row is None:
+            return None
+        match_data = self._build_match(match_row)
+        self.cache.put_match(match_id, match_data)
+        return match_data
+
+    def iter_matches(self):
+        """
+        Yields the data of every saved match, in the order of their ids (bypasses the cache).
+        The rows are read ITER_CHUNK at a time : the memory used doesn't depend on the number of
+        matches, and no read stays open between two chunks (the worker thread can write).
+        """
+        self.flush()
+        last_id = -1
+        while True:
+            match_rows = self.connection.execute(
+                'SELECT * FROM matches WHERE id > ? ORDER BY id LIMIT ?',
+                (last_id, ITER_CHUNK)).fetchall()
+            for match_row in match_rows:
+                yield self._build_match(match_row)
+            if len(match_rows) < ITER_CHUNK:
+                return
+            last_id = match_rows[-1]['id']
+
+    def average_set_stats(self, match_id, slot, window=1):
+        """Returns the average of a player's stats for the ended sets of a match and of their
+        window - 1 matches saved before it (see FormTracker), None if none of these sets ended"""
+        self.flush()
+        name = self.connection.execute('SELECT name FROM players WHERE match_id = ? AND slot = ?',
+                                       (match_id, slot)).fetchone()['name']
+        sums = dict.fromkeys(COUNTERS, 0)
+        ended_sets = 0
+        for window_id, window_slot in read_form_window(
+                self.connection, name, match_id, slot, window):
+            row = self.connection.execute('SELECT stats_slot, sets_winners FROM matches '
+                                          'WHERE id = ?', (window_id,)).fetchone()
+            # The ended sets are the first ones (the set being played has no winner yet)
+            ended = sum(1 for winner in json.loads(row['sets_winners']) if winner is not None)
+            with self.stats_file.view(row['stats_slot']) as slot_view:
+                stats = decode_stats(
+                    slot_view[(window_slot - 1) * RECORD_SIZE:window_slot * RECORD_SIZE])
+            counters = dict(stats, **stats['service_stats'])
+            for key in COUNTERS:
+                sums[key] += sum(counters[key][:ended])
+            ended_sets += ended
+        if ended_sets == 0:
+            return None
+        return {key: round(sums[key] / ended_sets)
+                for key in COUNTERS if key not in ('total_games', 'total_points')}
+
+    def read_stats_slots(self):
+        """Returns the ids of every saved match and the bytes of their stats slots, in the same
+        order (see StatsKernel.record_counters)"""
+        self.flush()
+        rows = self.connection.execute('SELECT id, stats_slot FROM matches ORDER BY id').fetchall()
+        return [row['id'] for row in rows], self.stats_file.read(row['stats_slot'] for row in rows)
+
+    def get_career(self, name):
+        """Returns the career of a player over all their saved matches, None if they have none"""
+        self.flush()
+        row = self.connection.execute('SELECT * FROM careers WHERE name = ?', (name,)).fetchone()
+        return None if row is None else career_stats(row)
+
+    def list_careers(self):
+        """Returns the career of every player, in the order of their names"""
+        self.flush()
+        return [career_stats(row)
+                for row in self.connection.execute('SELECT * FROM careers ORDER BY name')]
+
+    def rebuild_careers(self):
+        """Computes the careers again from all the saved matches (see Career)"""
+        with self.connection:
+            rebuild_careers(self.connection, self.iter_matches())
+
+    def get_head_to_head(self, name1, name2):
+        """Returns the matches and the aggregates of two players against each other,
+        None if they never played each other (see HeadToHead)"""
+        self.flush()
+        return read_head_to_head(self.connection, name1, name2)
+
+    def get_form(self, name, size):
+        """Returns the form of a player over their last 'size' matches (see FormTracker),
+        None if they have no saved match"""
+        self.flush()
+        return read_form(self.connection, name, size)
+
+    def get_form_trend(self, name, match_id, slot, size, points):
+        """Returns the metrics of the form of a player after each of their last 'points' matches
+        up to the match 'match_id', where they are the player 'slot' (see FormTracker)"""
+        self.flush()
+        return read_form_trend(self.connection, name, match_id, slot, size, points)
+
+    def migrate_legacy_saves(self, save_file=LEGACY_SAVE_FILE, journal_file=LEGACY_JOURNAL_FILE):
+        """Imports the matches of the old JSON save file (and of its journal, if there is one)"""
+        count = 0
+        with self.connection:
+            for match_data in read_legacy_saves(save_file, journal_file):
+                insert_match(self.connection, self.stats_file, match_data)
+                count += 1
+        self.stats_file.flush()
+        log.info('{} matches imported from {}'.format(count, save_file))
+
+    def _write(self, match_id, operation, match_data):
+        """Executes one write request (in the worker thread, with its own connection)"""
+        if self.write_connection is None:
+            self.write_connection = connect(self.database_file)
+            # The merges of the journal are done by the commits of this connection, off the UI
+            self.write_connection.execute(
+                'PRAGMA wal_autocheckpoint = {}'.format(JOURNAL_CHECKPOINT))
+        old_slot = self.write_connection.execute(
+            'SELECT stats_slot FROM matches WHERE id = ?', (match_id,)).fetchone()
+        if operation == 'save':
+            # The stats go to a new slot : the old save stays complete until the commit.
+            # If the commit fails, the new slot is lost until the free list is rebuilt (next launch).
+            with self.write_connection:
+                write_match(self.write_connection, self.stats_file, match_id, match_data)
+        elif operation == 'delete':
+            with self.write_connection:
+                remove_from_indexes(self.write_connection, self.stats_file, match_id)
+                self.write_connection.execute('DELETE FROM matches WHERE id = ?', (match_id,))
+        if old_slot is not None:
+            self.stats_file.free(old_slot[0])
+        if self.shards_directory is not None:  # Only the shard of this match is written
+            if operation == 'save':
+                write_shard(match_data, self.shards_directory)
+            elif operation == 'delete':
+                remove_shard(match_id, self.shards_directory)
+        self.cache.written()
+
+    def _close_write_connection(self):
+        """Merges the journal into the database and closes the connection of the worker thread
+        (in the worker thread, after the last write)"""
+        if self.write_connection is not None:
+            self.write_connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self.write_connection.close()
+            self.write_connection = None
+
+    def _build_match(self, match_row):
+        """Builds the data of a match (same format as the old JSON save file)"""
+        return build_match(self.connection, self.stats_file, match_row)
+
+
+def connect(database_file):
+    """Opens a connection to the database"""
+    connection = sqlite3.connect(database_file)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA foreign_keys = ON')
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.execute('PRAGMA synchronous = NORMAL')  # The journal is synced at each merge
+    return connection
+
+
+def last_match_id(connection):
+    """Returns the greatest id given to a match, even if this match was deleted since"""
+    last_id = connection.execute('SELECT IFNULL(MAX(id), 0) FROM matches').fetchone()[0]
+    # sqlite_sequence is created by the first insert in a table with AUTOINCREMENT
+    if connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone() is not None:
+        last_id = max(last_id, connection.execute(
+            "SELECT IFNULL(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'matches'").fetchone()[0])
+    return last_id
+
+
+def build_match(connection, stats_file, match_row):
+    """Builds the data of a match (same format as the old JSON save file)"""
+    match_data = {
+        'match_id': match_row['id'],
+        'match_name': match_row['match_name'],
+        'server': match_row['server'],
+        'receiver': match_row['receiver'],
+        'sets_winners': json.loads(match_row['sets_winners']),
+        'match_ended': bool(match_row['match_ended']),
+        'points_log': list(match_row['points_log']),
+        'match_format': json.loads(match_row['match_format'] or 'null'),
+    }
+    for player_row in connection.execute(
+            'SELECT * FROM players WHERE match_id = ?', (match_row['id'],)):
+        match_data['player{}_name'.format(player_row['slot'])] = player_row['name']
+    with stats_file.view(match_row['stats_slot']) as slot_view:
+        for slot in (1, 2):
+            match_data['player{}_stats'.format(slot)] = decode_stats(
+                slot_view[(slot - 1) * RECORD_SIZE:slot * RECORD_SIZE])
+    return match_data
+
+
+def update_indexes(connection, match_id, match_data, sign=1):
+    """Adds a match to the careers, the head-to-heads and the forms (sign=1),
+    or takes it out (sign=-1)"""
+    update_careers(connection, match_data, sign)
+    update_head_to_head(connection, match_id, match_data, sign)
+    update_form(connection, match_id, match_data, sign)
+
+
+def remove_from_indexes(connection, stats_file, match_id):
+    """Takes the save of a match out of the indexes (see update_indexes), if the match is saved"""
+    match_row = connection.execute('SELECT * FROM matches WHERE id = ?', (match_id,)).fetchone()
+    if match_row is not None:
+        update_indexes(connection, match_id, build_match(connection, stats_file, match_row), -1)
+
+
+def write_match(connection, stats_file, match_id, match_data):
+    """Overwrites the rows of a match in place, or inserts them if the match is new"""
+    remove_from_indexes(connection, stats_file, match_id)  # The previous save of the match
+    update_indexes(connection, match_id, match_data)
+    stats_slot = write_stats(stats_file, match_data)
+    cursor = connection.execute(
+        'UPDATE matches SET match_name = ?, server = ?, receiver = ?, sets_winners = ?, '
+        'match_ended = ?, points_log = ?, match_format = ?, stats_slot = ? WHERE id = ?',
+        match_row_values(match_data) + (stats_slot, match_id))
+    if cursor.rowcount == 0:
+        connection.execute(
+            'INSERT INTO matches (id, match_name, server, receiver, sets_winners, match_ended, '
+            'points_log, match_format, stats_slot) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (match_id,) + match_row_values(match_data) + (stats_slot,))
+    else:
+        connection.execute('DELETE FROM players WHERE match_id = ?', (match_id,))
+    insert_players(connection, match_id, match_data)
+
+
+def insert_match(connection, stats_file, match_data):
+    """Inserts all the rows of a new match and returns its id"""
+    cursor = connection.execute(
+        'INSERT INTO matches (match_name, server, receiver, sets_winners, match_ended, points_log, '
+        'match_format, stats_slot) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        match_row_values(match_data) + (write_stats(stats_file, match_data),))
+    insert_players(connection, cursor.lastrowid, match_data)
+    update_indexes(connection, cursor.lastrowid, match_data)
+    return cursor.lastrowid
+
+
+def insert_players(connection, match_id, match_data):
+    """Inserts the rows of both players of a match"""
+    connection.executemany(
+        'INSERT INTO players (match_id, slot, name) VALUES (?, ?, ?)',
+        [(match_id, slot, match_data['player{}_name'.format(slot)]) for slot in (1, 2)])
+
+
+def write_stats(stats_file, match_data):
+    """Writes the stats of both players in a new slot of the stats file and returns the slot"""
+    stats_slot = stats_file.allocate()
+    stats_file.write(stats_slot, [encode_stats(match_data['player{}_stats'.format(slot)])
+                                  for slot in (1, 2)])
+    stats_file.flush(stats_slot)  # The slot is on disk before the row that points to it
+    return stats_slot
+
+
+def upgrade_schema(connection, stats_file):
+    """Creates the tables, or converts the tables of an older version of the app"""
+    version = connection.execute('PRAGMA user_version').fetchone()[0]
+    tables = [row[0] for row in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'")]
+    if 'matches' in tables and version < 2:
+        with connection:
+            connection.execute('BEGIN')  # The tables are converted in one transaction
+            connection.execute('ALTER TABLE players RENAME TO old_players')
+            connection.execute('ALTER TABLE matches ADD COLUMN stats_slot INTEGER NOT NULL DEFAULT -1')
+            for statement in SCHEMA.split(';'):  # executescript would commit the transaction
+                connection.execute(statement)
+            for match_row in connection.execute('SELECT id FROM matches').fetchall():
+                player_rows = connection.execute(
+                    'SELECT * FROM old_players WHERE match_id = ? ORDER BY slot',
+                    (match_row['id'],)).fetchall()
+                if version == 0:  # Counters stored in one column per stat and set
+                    records = [encode_stats(old_set_stats(connection, player_row))
+                               for player_row in player_rows]
+                else:  # Binary stats records stored in the players table
+                    records = [player_row['stats'] for player_row in player_rows]
+                stats_slot = stats_file.allocate()
+                stats_file.write(stats_slot, records)
+                connection.execute('UPDATE matches SET stats_slot = ? WHERE id = ?',
+                                   (stats_slot, match_row['id']))
+                connection.executemany(
+                    'INSERT INTO players (match_id, slot, name) VALUES (?, ?, ?)',
+                    [(player_row['match_id'], player_row['slot'], player_row['name'])
+                     for player_row in player_rows])
+            stats_file.flush()
+            connection.execute('DROP TABLE old_players')
+            if version == 0:
+                connection.execute('DROP TABLE set_stats')
+    if 'matches' in tables and version < 3:
+        connection.execute("ALTER TABLE matches ADD COLUMN points_log BLOB NOT NULL DEFAULT x''")
+    if 'matches' in tables and version < 4:
+        connection.execute('ALTER TABLE matches ADD COLUMN match_format TEXT')
+    if 'matches' in tables and version < 8 and 'AUTOINCREMENT' not in connection.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'matches'").fetchone()[0].upper():
+        add_autoincrement(connection)
+    connection.executescript(SCHEMA)
+    if 'matches' in tables and version < 7:  # The indexes of the matches saved before them
+        matches = [build_match(connection, stats_file, match_row)
+                   for match_row in connection.execute('SELECT * FROM matches').fetchall()]
+        with connection:
+            if version < 5:
+                rebuild_careers(connection, matches)
+            if version < 6:
+                rebuild_head_to_heads(connection, matches)
+            rebuild_forms(connection, matches)
+    connection.execute('PRAGMA user_version = {}'.format(SCHEMA_VERSION))
+
+
+def add_autoincrement(connection):
+    """
+    Copies the matches of the first version of the database in a table with AUTOINCREMENT.
+    The ids above the greatest saved id, given to matches deleted before, may be given again.
+    """
+    columns = ('id, match_name, server, receiver, sets_winners, match_ended, stats_slot, '
+               'points_log, match_format')
+    # The players must not be deleted with the old table, and must still reference 'matches'
+    connection.execute('PRAGMA foreign_keys = OFF')
+    connection.execute('PRAGMA legacy_alter_table = ON')
+    with connection:
+        connection.execute('BEGIN')
+        connection.execute('ALTER TABLE matches RENAME TO old_matches')
+        connection.execute(SCHEMA.split(';')[0])  # The matches table
+        connection.execute('INSERT INTO matches ({0}) SELECT {0} FROM old_matches'.format(columns))
+        connection.execute('DROP TABLE old_matches')
+    connection.execute('PRAGMA legacy_alter_table = OFF')
+    connection.execute('PRAGMA foreign_keys = ON')
+
+
+def old_set_stats(connection, player_row):
+    """Returns the stats dict of a player saved by the first version of the database"""
+    stats = {'points': player_row['points'],
+             'games': player_row['games'],
+             'sets': player_row['sets'],
+             'service_stats': {}}
+    set_rows = connection.execute(
+        'SELECT * FROM set_stats WHERE match_id = ? AND slot = ? ORDER BY set_index',
+        (player_row['match_id'], player_row['slot'])).fetchall()
+    for key in STATS_KEYS:
+        stats[key] = [set_row[key] for set_row in set_rows]
+    for key in SERVICE_STATS_KEYS:
+        stats['service_stats'][key] = [set_row[key] for set_row in set_rows]
+    return stats
+
+
+def match_header(match_data):
+    """Returns the header of a match : id, names, ended flag and set winners"""
+    return {key: match_data[key] for key in (
+        'match_id', 'match_name', 'player1_name', 'player2_name', 'match_ended', 'sets_winners')}
+
+
+def match_row_values(match_data):
+    """Returns the values of the 'matches' row of a match"""
+    match_format = match_data.get('match_format')  # Saves older than the formats have none
+    return (match_data['match_name'], match_data['server'], match_data['receiver'],
+            json.dumps(match_data['sets_winners']), match_data['match_ended'],
+            bytes(match_data.get('points_log', [])),  # Saves older than the point log have none
+            None if match_format is None else json.dumps(list(match_format)))
+
+
+def read_legacy_saves(save_file=LEGACY_SAVE_FILE, journal_file=LEGACY_JOURNAL_FILE):
+    """
+    Yields the matches of the old JSON save file, after replaying its journals.
+    The save file is streamed, only the journals (a few records) are kept in memory.
+    """
+    journal_saves = []
+    save_file_tombstones = []
+    for journal_path in (journal_file + '.compacting', journal_file):
+        if not path.exists(journal_path):
+            continue
+        with open(journal_path, 'r') as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:  # Last line cut by a crash during a write
+                    continue
+                if record['op'] == 'save':
+                    journal_saves.append(record['match'])
+                elif record['op'] == 'delete':
+                    if record['match'] in journal_saves:
+                        journal_saves.remove(record['match'])
+                    else:  # Removes a match of the save file, if it is there
+                        save_file_tombstones.append(record['match'])
+    for match_data in iter_saved_matches(save_file):
+        if match_data in save_file_tombstones:
+            save_file_tombstones.remove(match_data)
+        else:
+            yield match_data
+    yield from journal_saves
@@ -0,0 +1,171 @@
+"""
+MatchShards
+
+Keeps the saved matches as one JSON file per match (a shard) in a directory, with a manifest.
+The MatchRepository rewrites the shard of a match when it writes the match (see write_shard),
+an export only rewrites the shards of the matches that changed since the previous export,
+and the whole history can be loaded back with a pool of threads or processes.
+
+Usage : python match_shards.py export|load [directory] [--workers N] [--processes]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from os import path
+
+
+SHARDS_DIRECTORY = '../statspoint_matches'
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+CHUNK_SIZE = 256
+"""Number of shards read by a pool task (a task per file would cost more than the parsing)."""
+SHARD_PATTERN = re.compile(r'match_\d{8}\.json$')
+"""Names of the shards (not the temporary files of a write, see write_file)."""
+
+
+def shard_name(match_id):
+    """Returns the file name of the shard of a match"""
+    return 'match_{:08d}.json'.format(match_id)
+
+
+def shard_names(directory):
+    """Returns the names of the shards of a directory, in the order of their match ids"""
+    if not path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if SHARD_PATTERN.match(name))
+
+
+def read_manifest(directory):
+    """Returns the manifest of a shards directory (an empty one if there is no export yet)"""
+    manifest_path = path.join(directory, MANIFEST_NAME)
+    if not path.exists(manifest_path):
+        return {'version': MANIFEST_VERSION, 'matches': {}}
+    with open(manifest_path, 'r') as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest['version'] != MANIFEST_VERSION:
+        raise ValueError('Unknown manifest version : {}'.format(manifest['version']))
+    return manifest
+
+
+def write_file(file_path, text):
+    """Replaces a file atomically (a crash leaves the old file or the new one, never half of it)"""
+    with open(file_path + '.tmp', 'w') as temporary_file:
+        temporary_file.write(text)
+    os.replace(file_path + '.tmp', file_path)
+
+
+def write_shard(match_data, directory=SHARDS_DIRECTORY):
+    """Writes the shard of one match (with its 'match_id'), the other shards are not touched"""
+    os.makedirs(directory, exist_ok=True)
+    write_file(path.join(directory, shard_name(match_data['match_id'])),
+               json.dumps(match_data, separators=(',', ':')))
+
+
+def remove_shard(match_id, directory=SHARDS_DIRECTORY):
+    """Removes the shard of a deleted match, if it has one"""
+    shard_path = path.join(directory, shard_name(match_id))
+    if path.exists(shard_path):
+        os.remove(shard_path)
+
+
+def export_shards(matches, directory=SHARDS_DIRECTORY):
+    """
+    Writes the shards of the matches which changed and removes the shards of the deleted ones.
+    Returns the number of shards written and removed.
+    The manifest holds the digest of each exported shard : a shard written since by write_shard
+    is written again by the next export, whether it changed or not.
+
+    Parameters
+    ----------
+    matches : iterable
+        Data of every saved match (with its 'match_id'), see MatchRepository.iter_matches.
+    directory : str
+        Path of the shards directory. It is created if needed.
+    """
+    os.makedirs(directory, exist_ok=True)
+    old_entries = read_manifest(directory)['matches']
+    entries = {}
+    written = 0
+    for match_data in matches:
+        text = json.dumps(match_data, separators=(',', ':'))
+        digest = hashlib.sha1(text.encode()).hexdigest()
+        key = str(match_data['match_id'])
+        entries[key] = {'file': shard_name(match_data['match_id']), 'digest': digest}
+        if old_entries.get(key) != entries[key]:
+            write_file(path.join(directory, entries[key]['file']), text)
+            written += 1
+    removed = 0
+    for name in shard_names(directory):  # Also the shards written since the last export
+        key = str(int(name[len('match_'):-len('.json')]))
+        if key not in entries:
+            os.remove(path.join(directory, name))
+            removed += 1
+    # The manifest is written last : it never lists a shard that is not on disk yet
+    write_file(path.join(directory, MANIFEST_NAME),
+               json.dumps({'version': MANIFEST_VERSION, 'matches': entries}))
+    return written, removed
+
+
+def read_shards(shard_paths):
+    """Returns the data of a list of shards (one pool task)"""
+    matches = []
+    for shard_path in shard_paths:
+        with open(shard_path, 'r') as shard_file:
+            matches.append(json.load(shard_file))
+    return matches
+
+
+def load_shards(directory=SHARDS_DIRECTORY, workers=None, processes=False):
+    """
+    Returns the data of every match of a shards directory, in the order of their ids.
+
+    Parameters
+    ----------
+    directory : str
+        Path of the shards directory.
+    workers : int
+        Size of the pool (1 reads the shards in the calling thread, None lets the pool decide).
+    processes : bool
+        Uses a pool of processes instead of threads (the JSON parsing holds the GIL).
+    """
+    shard_paths = [path.join(directory, name) for name in shard_names(directory)]
+    chunks = [shard_paths[start:start + CHUNK_SIZE]
+              for start in range(0, len(shard_paths), CHUNK_SIZE)]
+    if workers == 1:
+        return read_shards(shard_paths)
+    executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor_class(max_workers=workers) as executor:
+        return [match_data for matches in executor.map(read_shards, chunks)
+                for match_data in matches]
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Exports or loads the sharded match saves.')
+    parser.add_argument('command', choices=('export', 'load'))
+    parser.add_argument('directory', nargs='?', default=SHARDS_DIRECTORY)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--processes', action='store_true')
+    arguments = parser.parse_args()
+    start = time.perf_counter()
+    if arguments.command == 'export':
+        from match_repository import MatchRepository
+        repository = MatchRepository()
+        try:
+            written, removed = export_shards(repository.iter_matches(), arguments.directory)
+        finally:
+            repository.close()
+        print('{} shards written, {} removed'.format(written, removed))
+    else:
+        matches = load_shards(arguments.directory, arguments.workers, arguments.processes)
+        print('{} matches loaded'.format(len(matches)))
+    print('{:.2f} s'.format(time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
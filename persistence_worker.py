@@ -0,0 +1,102 @@
+"""
+PersistenceWorker
+
+Writes the match saves in a background thread, so that the UI never waits for the disk.
+Several writes of the same match that are still waiting in the queue are merged into the last one.
+"""
+
+import logging as log
+import queue
+import threading
+
+
+class PersistenceWorker:
+    """
+    Thread that executes the write requests of the MatchRepository one by one.
+    ...
+    Attributes
+    ----------
+    write_function : function
+        Called in the worker thread with (match_id, operation, match_data) for every write.
+
+    notify : function
+        Called with (match_id, operation) once a write is on disk (None to disable).
+
+    stop_function : function
+        Called in the worker thread after the last write, when the worker stops (None to disable).
+
+    requests : object
+        Instance of queue.Queue. Ids of the matches which have a pending write.
+
+    pending : dict
+        Last pending write (operation, match_data) of each match.
+
+    lock : object
+        Instance of threading.Lock. Protects the pending dict.
+
+    thread : object
+        Instance of threading.Thread. The worker thread.
+
+    Methods
+    -------
+    submit(match_id, operation, match_data=None):
+        Adds a write request, or replaces the pending request of the same match.
+
+    flush():
+        Waits until all pending writes are on disk.
+
+    stop():
+        Flushes the pending writes, calls stop_function and stops the thread.
+    """
+
+    def __init__(self, write_function, notify=None, stop_function=None):
+        self.write_function = write_function
+        self.notify = notify
+        self.stop_function = stop_function
+        self.requests = queue.Queue()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name='persistence', daemon=True)
+        self.thread.start()
+
+    def submit(self, match_id, operation, match_data=None):
+        """Adds a write request, or replaces the pending request of the same match"""
+        with self.lock:
+            merged = match_id in self.pending
+            self.pending[match_id] = (operation, match_data)
+        if not merged:
+            self.requests.put(match_id)
+
+    def flush(self):
+        """Waits until all pending writes are on disk"""
+        self.requests.join()
+
+    def stop(self):
+        """Flushes the pending writes, calls stop_function (in the worker thread) and stops the
+        thread"""
+        if self.thread.is_alive():
+            self.flush()
+            self.requests.put(None)
+            self.thread.join()
+
+    def _run(self):
+        """Loop of the worker thread"""
+        while True:
+            match_id = self.requests.get()
+            try:
+                if match_id is None:
+                    if self.stop_function is not None:
+                        self.stop_function()
+                else:
+                    with self.lock:
+                        operation, match_data = self.pending.pop(match_id)
+                    self.write_function(match_id, operation, match_data)
+                    if self.notify is not None:
+                        self.notify(match_id, operation)
+            except Exception:  # A failed write must not stop the following ones
+                log.exception('Could not write the match {}'.format(match_id)
+                              if match_id is not None else 'Could not stop the worker')
+            finally:
+                self.requests.task_done()
+            if match_id is None:
+                return
@@ -2,8 +2,49 @@
 Player
 
 Manages the information about a player in a match.
+The counters of a player are stored in one flat list of integers, set after set, at offsets
+computed once (see COUNTER_INDEX). Player.stats gives the same dict as before on top of it.
+The list only holds the sets played : the counters of a set are added when the set starts.
+The list starts with the totals of the match, updated with the counters of the sets,
+so a total is read without adding the sets again.
 """
 
+from collections.abc import Mapping, MutableMapping, Sequence
+
+STATS_KEYS = (
+    'total_points', 'return_points_won', 'return_points_played', 'total_games', 'break_points',
+    'return_game_won', 'winners', 'backhand_winners', 'forehand_winners', 'net_winners',
+    'net_points', 'unforced_errors', 'backhand_unforced_errors', 'forehand_unforced_errors',
+    'net_unforced_errors')
+"""Statistics counted set by set (one number per set)."""
+
+SERVICE_STATS_KEYS = (
+    'ace', 'double_faults', 'second_service', 'second_service_in', 'service_points_played',
+    'first_service_won', 'second_service_won')
+"""Service statistics counted set by set, stored in the 'service_stats' dict."""
+
+COUNTERS = STATS_KEYS + SERVICE_STATS_KEYS
+"""Order of the counters of a set in Player.counters (same order as a StatsCodec record)."""
+
+COUNTER_INDEX = {key: index for index, key in enumerate(COUNTERS)}
+"""
+Position of each counter in a block of Player.counters : the total of the match is at index,
+the counter of the set s is at (s + 1) * len(COUNTERS) + index.
+"""
+
+SCORE_KEYS = {'points': 'points_amount', 'games': 'games_amount', 'sets': 'sets_amount'}
+"""Keys of Player.stats holding the score, and the attribute of Player behind them."""
+
+
+def played_set_indexes(stats1, stats2):
+    """
+    Returns the indexes of the sets played in a match, from the stats of both players.
+    The saves older than the growing counters (see Player.add_set) have zeros for the sets
+    not played.
+    """
+    total_points = zip(stats1['total_points'], stats2['total_points'])
+    return [index for index, points in enumerate(total_points) if any(points)]
+
 
 class Player:
     """
@@ -14,8 +55,15 @@ class Player:
     name : str
         name of the player.
 
-    stats : dict
-        Statistics of a player for one match (set by set).
+    counters : list
+        The totals of the match, then every counter of the player for every set
+        (see COUNTER_INDEX).
+
+    sets_number : int
+        Number of sets started (number of values of each counter).
+
+    stats : object
+        Instance of StatsView. Statistics of a player for one match (set by set), as a dict.
 
     points_amount : int
         current points amount of the player (0, 15, 30, 40, AD) in a game.
@@ -26,17 +74,32 @@ class Player:
     sets_amount : int
         current sets amount of the player in a match.
 
-    total_points : list
-        current total points amount of the player for every set.
+    total_points : object
+        Instance of CounterView. current total points amount of the player for every set.
 
-    total_games : list
-        current total games amount of the player for every set.
+    total_games : object
+        Instance of CounterView. current total games amount of the player for every set.
 
-    service_stats : dict
-        Service statistics of a player for one match (set by set).
+    service_stats : object
+        Instance of ServiceStatsView. Service statistics of a player for one match (set by set).
 
     Methods
     -------
+    counter(key):
+        returns the values of a counter for every set.
+
+    total(key):
+        returns the total of a counter in the entire match.
+
+    check_totals():
+        returns the counters whose total is not the sum of the sets.
+
+    add_set():
+        Adds the counters of a new set.
+
+    trim_sets(sets_number):
+        Removes the counters of the sets after the first ones.
+
     get_name():
         returns the name of the player.
 
@@ -56,44 +119,63 @@ class Player:
         returns the total games amount of the player in the entire match.
     """
 
-    def __init__(self, name='', stats=None):
-        if stats is None:
-            stats = {
-                'points': 0,
-                'games': 0,
-                'sets': 0,
-                'total_points': [0, 0, 0],
-                'return_points_won': [0, 0, 0],
-                'return_points_played': [0, 0, 0],
-                'total_games': [0, 0, 0],
-                'break_points': [0, 0, 0],
-                'return_game_won': [0, 0, 0],
-                'winners': [0, 0, 0],
-                'backhand_winners': [0, 0, 0],
-                'forehand_winners': [0, 0, 0],
-                'net_winners': [0, 0, 0],
-                'net_points': [0, 0, 0],
-                'unforced_errors': [0, 0, 0],
-                'backhand_unforced_errors': [0, 0, 0],
-                'forehand_unforced_errors': [0, 0, 0],
-                'net_unforced_errors': [0, 0, 0],
-                'service_stats': {
-                    'ace': [0, 0, 0],
-                    'double_faults': [0, 0, 0],
-                    'second_service': [0, 0, 0],
-                    'second_service_in': [0, 0, 0],
-                    'service_points_played': [0, 0, 0],
-                    'first_service_won': [0, 0, 0],
-                    'second_service_won': [0, 0, 0]}
-                }
+    __slots__ = ('name', 'counters', 'sets_number', 'stats', 'service_stats', 'points_amount',
+                 'games_amount', 'sets_amount')
+
+    def __init__(self, name='', stats=None, sets_number=1):
         self.name = name
-        self.stats = stats
-        self.points_amount = stats['points']
-        self.games_amount = stats['games']
-        self.sets_amount = stats['sets']
-        self.total_points = stats['total_points']
-        self.total_games = stats['total_games']
-        self.service_stats = stats['service_stats']
+        if stats is None:
+            self.sets_number = sets_number
+            self.counters = [0] * ((sets_number + 1) * len(COUNTERS))
+            self.points_amount = self.games_amount = self.sets_amount = 0
+        else:
+            self.sets_number = len(stats['total_points'])
+            values = [stats[key] if key in STATS_KEYS else stats['service_stats'][key]
+                      for key in COUNTERS]
+            self.counters = [sum(counter) for counter in values] + [
+                counter[set_index] for set_index in range(self.sets_number) for counter in values]
+            self.points_amount = stats['points']
+            self.games_amount = stats['games']
+            self.sets_amount = stats['sets']
+        self.stats = StatsView(self)
+        self.service_stats = ServiceStatsView(self)
+
+    def counter(self, key):
+        """returns the values of a counter for every set (a view, writable)"""
+        return CounterView(self, COUNTER_INDEX[key])
+
+    def total(self, key):
+        """returns the total of a counter in the entire match"""
+        return self.counters[COUNTER_INDEX[key]]
+
+    def check_totals(self):
+        """returns the counters whose total is not the sum of the sets (consistency checker)"""
+        return [key for index, key in enumerate(COUNTERS)
+                if self.counters[index] != sum(self.counters[len(COUNTERS) + index::len(COUNTERS)])]
+
+    def add_set(self):
+        """Adds the counters of a new set"""
+        self.counters.extend([0] * len(COUNTERS))
+        self.sets_number += 1
+
+    def trim_sets(self, sets_number):
+        """Removes the counters of the sets after the first sets_number ones"""
+        if sets_number < self.sets_number:
+            start = (sets_number + 1) * len(COUNTERS)
+            for index, value in enumerate(self.counters[start:]):  # Out of the totals
+                self.counters[index % len(COUNTERS)] -= value
+            del self.counters[start:]
+            self.sets_number = sets_number
+
+    @property
+    def total_points(self):
+        """current total points amount of the player for every set"""
+        return self.counter('total_points')
+
+    @property
+    def total_games(self):
+        """current total games amount of the player for every set"""
+        return self.counter('total_games')
 
     def get_name(self):
         """returns the name of the player"""
@@ -113,8 +195,186 @@ class Player:
 
     def get_total_points_amount(self):
         """returns the total points amount of the player in the entire match"""
-        return self.total_points
+        return self.total_points.tolist()
 
     def get_total_games_amount(self):
         """returns the total games amount of the player in the entire match"""
-        return self.total_games
+        return self.total_games.tolist()
+
+
+class CounterView(Sequence):
+    """
+    The values of one counter of a player for every set, as a list (no copy)
+    ...
+    Attributes
+    ----------
+    player : object
+        Instance of the class Player.
+
+    index : int
+        Position of the counter in a set (see COUNTER_INDEX).
+
+    Methods
+    -------
+    tolist():
+        Returns a copy of the values.
+    """
+
+    __slots__ = ('player', 'index')
+
+    def __init__(self, player, index):
+        self.player = player
+        self.index = index
+
+    def __getitem__(self, set_index):
+        if isinstance(set_index, slice):
+            return self.tolist()[set_index]
+        return self.player.counters[self._offset(set_index)]
+
+    def __setitem__(self, set_index, value):
+        counters, offset = self.player.counters, self._offset(set_index)
+        counters[self.index] += value - counters[offset]  # The total of the match follows
+        counters[offset] = value
+
+    def __len__(self):
+        return self.player.sets_number
+
+    def __eq__(self, other):
+        return isinstance(other, Sequence) and self.tolist() == list(other)
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    def _offset(self, set_index):
+        """Returns the position of the value of a set in Player.counters"""
+        if not -self.player.sets_number <= set_index < self.player.sets_number:
+            raise IndexError('set index out of range')
+        return (set_index % self.player.sets_number + 1) * len(COUNTERS) + self.index
+
+    def tolist(self):
+        """Returns a copy of the values"""
+        return self.player.counters[len(COUNTERS) + self.index::len(COUNTERS)]
+
+
+class StatsView(MutableMapping):
+    """
+    The stats of a player in the format of the saves : {'points': ..., 'total_points': [...], ...,
+    'service_stats': {...}, 'totals': {...}}. The values are read from the Player (no copy).
+    ...
+    Attributes
+    ----------
+    player : object
+        Instance of the class Player.
+
+    Methods
+    -------
+    to_dict():
+        Returns a copy of the stats made of dicts and lists (for the saves).
+    """
+
+    __slots__ = ('player',)
+
+    def __init__(self, player):
+        self.player = player
+
+    def __getitem__(self, key):
+        if key in SCORE_KEYS:
+            return getattr(self.player, SCORE_KEYS[key])
+        if key == 'service_stats':
+            return self.player.service_stats
+        if key == 'totals':
+            return TotalsView(self.player)
+        if key in STATS_KEYS:
+            return self.player.counter(key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in SCORE_KEYS:
+            setattr(self.player, SCORE_KEYS[key], value)
+        elif key in STATS_KEYS:
+            counter = self.player.counter(key)
+            for set_index, number in enumerate(value):
+                counter[set_index] = number
+        else:
+            raise KeyError(key)
+
+    def __delitem__(self, key):
+        raise TypeError('The stats of a player can not be removed')
+
+    def __iter__(self):
+        yield from SCORE_KEYS
+        yield from STATS_KEYS
+        yield 'service_stats'
+        yield 'totals'
+
+    def __len__(self):
+        return len(SCORE_KEYS) + len(STATS_KEYS) + 2
+
+    def to_dict(self):
+        """Returns a copy of the stats made of dicts and lists (for the saves)"""
+        stats = {key: getattr(self.player, attribute) for key, attribute in SCORE_KEYS.items()}
+        stats.update({key: self.player.counter(key).tolist() for key in STATS_KEYS})
+        stats['service_stats'] = self.player.service_stats.to_dict()
+        stats['totals'] = dict(TotalsView(self.player))
+        return stats
+
+
+class ServiceStatsView(Mapping):
+    """
+    The service stats of a player, as a dict of views (see StatsView)
+    ...
+    Attributes
+    ----------
+    player : object
+        Instance of the class Player.
+
+    Methods
+    -------
+    to_dict():
+        Returns a copy of the service stats made of lists.
+    """
+
+    __slots__ = ('player',)
+
+    def __init__(self, player):
+        self.player = player
+
+    def __getitem__(self, key):
+        if key not in SERVICE_STATS_KEYS:
+            raise KeyError(key)
+        return self.player.counter(key)
+
+    def __iter__(self):
+        return iter(SERVICE_STATS_KEYS)
+
+    def __len__(self):
+        return len(SERVICE_STATS_KEYS)
+
+    def to_dict(self):
+        """Returns a copy of the service stats made of lists"""
+        return {key: self.player.counter(key).tolist() for key in SERVICE_STATS_KEYS}
+
+
+class TotalsView(Mapping):
+    """
+    The totals of the match of every counter of a player (stats and service stats), as a dict
+    ...
+    Attributes
+    ----------
+    player : object
+        Instance of the class Player.
+    """
+
+    __slots__ = ('player',)
+
+    def __init__(self, player):
+        self.player = player
+
+    def __getitem__(self, key):
+        return self.player.counters[COUNTER_INDEX[key]]
+
+    def __iter__(self):
+        return iter(COUNTERS)
+
+    def __len__(self):
+        return len(COUNTERS)
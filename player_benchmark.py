@@ -0,0 +1,87 @@
+"""
+PlayerBenchmark
+
+Compares the memory and the counter increments of Player (one flat list of counters, __slots__)
+with the layout it replaced : a Player with a __dict__ and a dict of lists of 3 ints per stat.
+Both layouts hold 3 sets.
+
+Usage : python player_benchmark.py [--players N] [--increments N]
+"""
+
+import argparse
+import sys
+import timeit
+import tracemalloc
+
+from player import Player, COUNTER_INDEX, STATS_KEYS, SERVICE_STATS_KEYS
+
+
+class DictPlayer:
+    """Player before the flat counters : every stat is a list of 3 ints in a dict"""
+
+    def __init__(self, name=''):
+        stats = {'points': 0, 'games': 0, 'sets': 0}
+        stats.update((key, [0, 0, 0]) for key in STATS_KEYS)
+        stats['service_stats'] = {key: [0, 0, 0] for key in SERVICE_STATS_KEYS}
+        self.name = name
+        self.stats = stats
+        self.points_amount = stats['points']
+        self.games_amount = stats['games']
+        self.sets_amount = stats['sets']
+        self.total_points = stats['total_points']
+        self.total_games = stats['total_games']
+        self.service_stats = stats['service_stats']
+
+
+def memory_per_player(player_class, players):
+    """Returns the memory allocated by 'players' players of a class, in bytes per player"""
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    instances = [player_class('Player {}'.format(index)) for index in range(players)]
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del instances
+    return size / players
+
+
+def increment_time(statement, setup_globals, increments):
+    """Returns the time of one execution of a statement, in ns (best of 5 runs)"""
+    return min(timeit.repeat(statement, globals=setup_globals, number=increments,
+                             repeat=5)) / increments * 1e9
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        description='Compares the memory and the counter increments of Player with the dict '
+                    'layout it replaced.')
+    parser.add_argument('--players', type=int, default=10000)
+    parser.add_argument('--increments', type=int, default=1000000)
+    arguments = parser.parse_args()
+
+    def three_sets_player(name):
+        """Player with the counters of 3 sets, like DictPlayer"""
+        return Player(name, sets_number=3)
+
+    print('memory per player (tracemalloc, {} players) :'.format(arguments.players))
+    for name, player_class in (('dict layout', DictPlayer), ('flat counters', three_sets_player)):
+        print('  {:<14} {:7.0f} B   (sys.getsizeof of the instance : {} B)'.format(
+            name, memory_per_player(player_class, arguments.players),
+            sys.getsizeof(player_class(''))))
+
+    names = {'old': DictPlayer(), 'new': Player(sets_number=3), 'index': COUNTER_INDEX['winners'],
+             'offset': 2 * len(COUNTER_INDEX) + COUNTER_INDEX['winners'], 'set_index': 1}
+    names['counters'] = names['new'].counters
+    print('one counter increment ({} runs) :'.format(arguments.increments))
+    for name, statement in (
+            ('dict layout', "old.stats['winners'][set_index] += 1"),
+            ('dict layout, service', "old.service_stats['ace'][set_index] += 1"),
+            ('flat counters', 'counters[offset] += 1'),
+            ('flat, set + total', 'counters[offset] += 1; counters[index] += 1'),
+            ('flat, dict view', "new.stats['winners'][set_index] += 1")):
+        print('  {:<22} {:6.1f} ns'.format(
+            name, increment_time(statement, names, arguments.increments)))
+
+
+if __name__ == '__main__':
+    main()
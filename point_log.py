@@ -0,0 +1,256 @@
+"""
+PointLog
+
+Every point of a match is stored as one event : a single byte holding the server, the winner,
+the serve number, the outcome and the last shot of the point.
+The statistics of the players (Player.stats) are rebuilt from the events by a reducer,
+so a new statistic can be computed over the old matches by replaying their log.
+
+A point can be undone from its event and the state of the score before it (a 'delta'):
+everything else is found again in the ScoringTable, so no copy of the match is needed.
+The UndoHistory of a match only keeps these states : 2 bytes per point, the events are in the log.
+"""
+
+from array import array
+
+from player import Player, COUNTER_INDEX
+from scoring import (ScoringEngine, BEST_OF_3, BLOCK_SIZE, DECIDING_POINT, GAME_POINT, GAME_WON,
+                     MATCH_OVER, TIE_BREAK_CAPPED, TIE_BREAK_WON, SET_WON, TOTAL_POINTS,
+                     TOTAL_GAMES, BREAK_POINTS, RETURN_GAME_WON)
+
+# Outcomes of a point
+ACE = 0
+DOUBLE_FAULT = 1
+WINNER = 2
+UNFORCED_ERROR = 3
+FORCED_ERROR = 4
+
+# Last shot of a point (winners and errors)
+NO_SHOT = 0
+FOREHAND = 1
+BACKHAND = 2
+VOLLEY = 3
+
+
+def encode_event(server_slot, winner_slot, serve, outcome, shot=NO_SHOT):
+    """
+    Returns the event of a point (an int between 0 and 255).
+
+    Layout : bit 0 the winner (0 for player 1), bit 1 the server, bit 2 the serve number
+    (0 for a first serve), bits 3-5 the outcome, bits 6-7 the shot.
+    """
+    return (winner_slot - 1) | (server_slot - 1) << 1 | (serve - 1) << 2 | outcome << 3 | shot << 6
+
+
+def decode_event(event):
+    """Returns the server slot, winner slot, serve number, outcome and shot of an event"""
+    return (event >> 1 & 1) + 1, (event & 1) + 1, (event >> 2 & 1) + 1, event >> 3 & 7, event >> 6
+
+
+def event_effects(event):
+    """
+    Returns the counters that a point increments, besides the score (see ScoringEngine).
+    Each counter is (slot, group, key) : slot is 0 or 1, group is 'stats' or 'service_stats'.
+    """
+    server_slot, winner_slot, serve, outcome, shot = decode_event(event)
+    server, receiver = server_slot - 1, 2 - server_slot
+    winner, loser = winner_slot - 1, 2 - winner_slot
+    effects = [(server, 'service_stats', 'service_points_played')]
+    if outcome not in (ACE, DOUBLE_FAULT):
+        effects.append((receiver, 'stats', 'return_points_played'))
+        if winner == receiver:
+            effects.append((receiver, 'stats', 'return_points_won'))
+    if serve == 2:
+        effects.append((server, 'service_stats', 'second_service'))
+        if outcome == DOUBLE_FAULT:
+            effects.append((server, 'service_stats', 'double_faults'))
+        else:
+            effects.append((server, 'service_stats', 'second_service_in'))
+    if winner == server:
+        effects.append((server, 'service_stats',
+                        'first_service_won' if serve == 1 else 'second_service_won'))
+    if outcome == ACE:
+        effects.append((server, 'service_stats', 'ace'))
+    elif outcome == WINNER:
+        effects.append((winner, 'stats', 'winners'))
+        effects.extend((winner, 'stats', key) for key in {
+            FOREHAND: ['forehand_winners'],
+            BACKHAND: ['backhand_winners'],
+            VOLLEY: ['net_points', 'net_winners']}.get(shot, []))
+    elif outcome == UNFORCED_ERROR:
+        effects.append((loser, 'stats', 'unforced_errors'))
+        effects.extend((loser, 'stats', key) for key in {
+            FOREHAND: ['forehand_unforced_errors'],
+            BACKHAND: ['backhand_unforced_errors'],
+            VOLLEY: ['net_unforced_errors']}.get(shot, []))
+    elif outcome == FORCED_ERROR and shot == VOLLEY:
+        effects.append((winner, 'stats', 'net_points'))
+    return tuple(effects)
+
+
+EVENT_EFFECTS = tuple(
+    tuple(tuple(COUNTER_INDEX[key] for slot, group, key in event_effects(event) if slot == player)
+          for player in (0, 1))
+    for event in range(256))
+"""Counters incremented by each event, computed once : the offsets in Player.counters of the
+counters of the player 1, then of the player 2."""
+
+
+def apply_event(engine, event):
+    """
+    Reducer : applies one point to the players of a ScoringEngine (counters and score).
+    Returns the delta needed to undo the point (see revert_event),
+    or None if the match was already over (the event is ignored).
+    """
+    state = engine.state
+    if engine.table.transitions[2 * state] == MATCH_OVER:
+        return None
+    player1, player2 = engine.player1, engine.player2
+    if (engine.server is player2) != event >> 1 & 1:  # The server chosen by the user
+        engine.change_server()
+    offset = (engine.set_index + 1) * BLOCK_SIZE
+    effects1, effects2 = EVENT_EFFECTS[event]
+    counters = player1.counters
+    for index in effects1:
+        counters[index] += 1  # Total of the match
+        counters[offset + index] += 1
+    counters = player2.counters
+    for index in effects2:
+        counters[index] += 1
+        counters[offset + index] += 1
+    if event & 1:
+        engine.points_win(player2, player1)
+    else:
+        engine.points_win(player1, player2)
+    return state << 8 | event
+
+
+def revert_event(engine, delta):
+    """Undoes the last point applied to a ScoringEngine, from the delta returned by apply_event"""
+    event, state = delta & 255, delta >> 8
+    players = (engine.player1, engine.player2)
+    winner, server = players[event & 1], players[event >> 1 & 1]
+    transition = engine.table.transitions[2 * state + (event & 1)]
+    if engine.server is not server:
+        engine.change_server()
+    engine.state = state
+    player1, player2 = players
+    (player1.points_amount, player2.points_amount, player1.games_amount, player2.games_amount,
+     player1.sets_amount, player2.sets_amount) = engine.table.scores[state]
+    if transition & TIE_BREAK_CAPPED:
+        engine.tie_break_offset -= 2
+    elif transition & TIE_BREAK_WON:
+        engine.tie_break_offset = engine.won_tie_break_offsets.pop()
+    if engine.tie_break_offset:  # The real points of a long tie-break (see ScoringEngine)
+        player1.points_amount += engine.tie_break_offset
+        player2.points_amount += engine.tie_break_offset
+    engine.set_index = set_index = player1.sets_amount + player2.sets_amount
+    counters, offset = winner.counters, (set_index + 1) * BLOCK_SIZE
+    counters[TOTAL_POINTS] -= 1
+    counters[offset + TOTAL_POINTS] -= 1
+    if transition & (GAME_WON | TIE_BREAK_WON):
+        counters[TOTAL_GAMES] -= 1
+        counters[offset + TOTAL_GAMES] -= 1
+    if transition & GAME_POINT and winner is engine.receiver or transition & DECIDING_POINT:
+        receiver_counters = engine.receiver.counters
+        receiver_counters[BREAK_POINTS] -= 1
+        receiver_counters[offset + BREAK_POINTS] -= 1
+    if transition & GAME_WON and winner is engine.receiver:
+        counters[RETURN_GAME_WON] -= 1
+        counters[offset + RETURN_GAME_WON] -= 1
+    if transition & SET_WON:
+        del engine.sets_winners[set_index:]
+        for player in players:  # The next set had no point yet
+            player.trim_sets(set_index + 1)
+    for player, effects in zip(players, EVENT_EFFECTS[event]):
+        counters = player.counters
+        for index in effects:
+            counters[index] -= 1
+            counters[offset + index] -= 1
+
+
+class UndoHistory:
+    """
+    Points of a match that can be undone and redone, with no depth limit and no copy of the match.
+    ...
+    Attributes
+    ----------
+    engine : object
+        Instance of the class ScoringEngine. The match.
+
+    points_log : bytearray
+        Event of every point of the match. The undone points are taken out of it.
+
+    states : array
+        State of the score before each point played since the history was created
+        (array('H') : 2 bytes per point. With the last events of points_log, they are the deltas
+        of revert_event).
+
+    redo_events : bytearray
+        Events of the points undone, the last undone point at the end.
+
+    Methods
+    -------
+    play(event):
+        Plays a new point. The points undone can't be redone any more.
+
+    undo():
+        Cancels the last point played.
+
+    redo():
+        Plays again the last point cancelled.
+    """
+
+    def __init__(self, engine, points_log):
+        self.engine = engine
+        self.points_log = points_log
+        self.states = array('H')  # The largest table (best-of-5) has less than 8000 states
+        self.redo_events = bytearray()
+
+    def play(self, event):
+        """Plays a new point. Returns False if the match was already over"""
+        self.redo_events.clear()  # A new point replaces the points undone
+        return self._apply(event)
+
+    def undo(self):
+        """Cancels the last point played. Returns False if there is no point to undo"""
+        if not self.states:
+            return False
+        revert_event(self.engine, self.states.pop() << 8 | self.points_log[-1])
+        self.redo_events.append(self.points_log.pop())
+        return True
+
+    def redo(self):
+        """Plays again the last point cancelled. Returns False if there is no point to redo"""
+        if not self.redo_events:
+            return False
+        return self._apply(self.redo_events.pop())
+
+    def _apply(self, event):
+        """Applies the event of a point and keeps the state needed to undo it"""
+        delta = apply_event(self.engine, event)
+        if delta is None:
+            return False
+        self.states.append(delta >> 8)
+        self.points_log.append(event)
+        return True
+
+
+def replay(events, player1_name='', player2_name='', match_format=BEST_OF_3):
+    """Returns a ScoringEngine (and its players) with all the points of an event log played"""
+    player1 = Player(player1_name)
+    player2 = Player(player2_name)
+    engine = ScoringEngine(player1, player2, match_format=match_format)
+    for event in events:
+        apply_event(engine, event)
+    return engine
+
+
+def rebuild_stats(match_data, match_format=BEST_OF_3):
+    """
+    Returns the stats of both players of a saved match, rebuilt from its event log.
+    The log of a match saved before the event logs existed only holds the points played since.
+    """
+    engine = replay(match_data['points_log'], match_data['player1_name'],
+                    match_data['player2_name'], match_format)
+    return engine.player1.stats.to_dict(), engine.player2.stats.to_dict()
@@ -0,0 +1,117 @@
+"""
+RepositoryBenchmark
+
+Compares the load and query latency of the old JSON save file (json.load of the whole history,
+then a scan of the list) with the queries of the MatchRepository, on a generated history.
+The matches are copies of the template match, between random players.
+
+Usage : python repository_benchmark.py [--matches N] [--queries N] [--seed S]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from os import path
+
+from match_repository import MatchRepository, TEMPLATE_FILE
+
+
+NAMES = ('Federer', 'Nadal', 'Djokovic', 'Murray', 'Wawrinka', 'Del Potro')
+
+
+def generated_matches(count, seed=None):
+    """Yields 'count' copies of the template match, each between two random players"""
+    rng = random.Random(seed)
+    with open(TEMPLATE_FILE, 'r') as template_file:
+        template = json.load(template_file)[0]
+    for index in range(count):
+        player1_name, player2_name = rng.sample(NAMES, 2)
+        names = {template['player1_name']: player1_name, template['player2_name']: player2_name}
+        yield dict(template, match_name='Match {}'.format(index),
+                   player1_name=player1_name, player2_name=player2_name,
+                   server=player1_name, receiver=player2_name,
+                   sets_winners=[names.get(winner) for winner in template['sets_winners']])
+
+
+def write_save_file(file_path, matches):
+    """Writes matches in the format of the old JSON save file (a pretty-printed list)"""
+    with open(file_path, 'w') as save_file:
+        json.dump(list(matches), save_file, indent=4, sort_keys=True)
+
+
+def timings(function, arguments):
+    """Returns the durations, in ms, of function(argument) for each argument"""
+    durations = []
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def report(name, durations):
+    """Prints the median and the worst of some durations in ms"""
+    print('{:<32} median {:9.3f} ms   max {:9.3f} ms   ({} runs)'.format(
+        name, statistics.median(durations), max(durations), len(durations)))
+
+
+def json_queries(save_file, match_index):
+    """The old way to read one match : the whole file is loaded, then the list is scanned"""
+    with open(save_file, 'r') as file:
+        matches = json.load(file)
+    return [match_data for index, match_data in enumerate(matches) if index == match_index][0]
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        description='Compares the load and query latency of the old JSON save file with the '
+                    'MatchRepository, on a generated history.')
+    parser.add_argument('--matches', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=200,
+                        help='number of matches read by each repository query')
+    parser.add_argument('--seed', type=int, default=None)
+    arguments = parser.parse_args()
+    rng = random.Random(arguments.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        save_file = path.join(directory, 'statspoint_data.json')
+        write_save_file(save_file, generated_matches(arguments.matches, arguments.seed))
+        print('{} matches, save file of {:.1f} MB'.format(
+            arguments.matches, path.getsize(save_file) / 1e6))
+
+        # A few runs are enough : every query of the old screens loads the whole file
+        report('json.load + scan', timings(
+            lambda index: json_queries(save_file, index),
+            [rng.randrange(arguments.matches) for _ in range(5)]))
+
+        database_file = path.join(directory, 'statspoint_data.db')
+        stats_file = path.join(directory, 'statspoint_stats.bin')
+        repository = MatchRepository(database_file, stats_file)  # Created with the template
+        start = time.perf_counter()
+        repository.migrate_legacy_saves(save_file, path.join(directory, 'no_journal'))
+        print('one-shot migration : {:.2f} s'.format(time.perf_counter() - start))
+        repository.close()
+
+        start = time.perf_counter()
+        repository = MatchRepository(database_file, stats_file)
+        report('open the repository', [(time.perf_counter() - start) * 1000])
+        try:
+            report('list_headers (SaveScreen)', timings(
+                lambda _: repository.list_headers(), [None]))
+            match_ids = rng.sample([header['match_id'] for header in repository.list_headers()],
+                                   arguments.queries)
+            report('load_match (DataScreen)', timings(repository.load_match, match_ids))
+            report('average_set_stats (DrillManager)', timings(
+                lambda match_id: repository.average_set_stats(match_id, 1), match_ids))
+            report('get_form (FormScreen)', timings(
+                lambda name: repository.get_form(name, 20),
+                [rng.choice(NAMES) for _ in range(arguments.queries)]))
+        finally:
+            repository.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+SaveCache
+
+Keeps the saves which have already been read in memory.
+The cache is emptied when one of the save files changes on disk (modification time or size),
+and it is updated in place after the writes of the app itself.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from os import path, stat
+
+
+class SaveCache:
+    """
+    In-memory cache of the match headers and of the last loaded matches.
+    ...
+    Attributes
+    ----------
+    file_paths : tuple
+        Paths of the save files that are watched (the database, its journal and the stats file).
+
+    max_matches : int
+        Maximum number of full matches kept in memory.
+
+    signature : tuple
+        Modification time and size of each save file when the cache was filled.
+
+    headers : OrderedDict
+        Header of every saved match by id (None if not loaded yet).
+
+    matches : OrderedDict
+        Full data of the last loaded matches by id (least recently used first).
+
+    hits : int
+        Number of reads answered by the cache.
+
+    misses : int
+        Number of reads that had to query the save file.
+
+    lock : object
+        Instance of threading.RLock. The cache is used by the UI thread and, through written(),
+        by the thread of the PersistenceWorker.
+
+    Methods
+    -------
+    get_headers():
+        Returns the cached headers, or None.
+
+    set_headers(headers):
+        Caches the headers of all matches.
+
+    get_match(match_id):
+        Returns a copy of a cached match, or None.
+
+    put_match(match_id, match_data, header):
+        Caches a match that has just been read or written.
+
+    remove_match(match_id):
+        Removes a deleted match from the cache.
+
+    check_file():
+        Empties the cache if a save file has been changed by someone else.
+
+    written():
+        Is called after each write of the app in the save file.
+
+    cache_info():
+        Returns the hit and miss counters.
+    """
+
+    def __init__(self, file_paths, max_matches=32):
+        self.file_paths = tuple(file_paths)
+        self.max_matches = max_matches
+        self.signature = None
+        self.headers = None
+        self.matches = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+    def get_headers(self):
+        """Returns the cached headers, or None"""
+        with self.lock:
+            self.check_file()
+            if self.headers is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return [dict(header) for header in self.headers.values()]
+
+    def set_headers(self, headers):
+        """Caches the headers of all matches"""
+        with self.lock:
+            self.headers = OrderedDict((header['match_id'], dict(header)) for header in headers)
+
+    def get_match(self, match_id):
+        """Returns a copy of a cached match, or None (callers may modify the data they get)"""
+        with self.lock:
+            self.check_file()
+            if match_id not in self.matches:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.matches.move_to_end(match_id)
+            return copy.deepcopy(self.matches[match_id])
+
+    def put_match(self, match_id, match_data, header=None):
+        """Caches a match that has just been read or written"""
+        with self.lock:
+            self.matches[match_id] = copy.deepcopy(match_data)
+            self.matches.move_to_end(match_id)
+            if len(self.matches) > self.max_matches:
+                self.matches.popitem(last=False)
+            if header is not None and self.headers is not None:
+                self.headers[match_id] = dict(header)
+
+    def remove_match(self, match_id):
+        """Removes a deleted match from the cache"""
+        with self.lock:
+            self.matches.pop(match_id, None)
+            if self.headers is not None:
+                self.headers.pop(match_id, None)
+
+    def written(self):
+        """Is called after each write of the app : the new state of the files is already cached"""
+        with self.lock:
+            self.signature = self._file_signature()
+
+    def cache_info(self):
+        """Returns the hit and miss counters"""
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'headers': self.headers is not None, 'matches': len(self.matches)}
+
+    def check_file(self):
+        """Empties the cache if a save file has been changed by someone else"""
+        with self.lock:
+            signature = self._file_signature()
+            if signature != self.signature:
+                self.signature = signature
+                self.headers = None
+                self.matches.clear()
+
+    def _file_signature(self):
+        """Returns the modification time and the size of each save file"""
+        return tuple(file_signature(file_path) for file_path in self.file_paths)
+
+
+def file_signature(file_path):
+    """Returns the modification time and the size of a file (None if it doesn't exist)"""
+    if not path.exists(file_path):
+        return None
+    file_stat = stat(file_path)
+    return file_stat.st_mtime_ns, file_stat.st_size
@@ -0,0 +1,50 @@
+"""
+SaveReader
+
+Reads a JSON save file (a list of matches) one match at a time.
+Only the match being read is kept in memory, whatever the size of the file.
+"""
+
+import json
+
+
+def iter_saved_matches(file_path, chunk_size=65536):
+    """
+    Yields the matches of a JSON save file one by one.
+
+    Parameters
+    ----------
+    file_path : str
+        Path of the save file. It contains a JSON list of match dicts.
+    chunk_size : int
+        Number of characters read from the file at once.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r') as save_file:
+        buffer = ''
+        position = 0
+        started = False
+        end_of_file = False
+        while True:
+            # Skips the separators between two matches
+            while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+                if buffer[position] == '[':
+                    started = True
+                elif buffer[position] == ']' and started:
+                    return
+                position += 1
+            if position < len(buffer):
+                try:
+                    match_data, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if end_of_file:
+                        raise
+                else:
+                    yield match_data
+                    continue
+            elif end_of_file:
+                return
+            chunk = save_file.read(chunk_size)
+            end_of_file = chunk == ''
+            buffer = buffer[position:] + chunk  # The matches already read are dropped
+            position = 0
@@ -0,0 +1,93 @@
+"""
+SaveReaderBenchmark
+
+Compares the peak memory (RSS) and the throughput of json.load with iter_saved_matches, on a
+generated save file : each one reads the whole history and aggregates the careers of the players.
+Each reader runs in a new process, so that the peak RSS of one run doesn't hide the next one.
+The RSS is read with the resource module (Linux and macOS only).
+
+Usage : python save_reader_benchmark.py [--matches N] [--repository] [--seed S]
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from os import path
+
+from career import compute_careers
+from match_repository import MatchRepository
+from repository_benchmark import generated_matches, write_save_file
+from save_reader import iter_saved_matches
+
+
+def peak_rss():
+    """Returns the peak RSS of this process, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3  # Bytes on macOS, else KB
+
+
+def read_history(reader, save_file, database_file, stats_file):
+    """
+    Aggregates the careers of every match of the history with a reader.
+    Returns the number of matches, the duration in s, the peak RSS and its growth during the read.
+    """
+    start_rss = peak_rss()
+    start = time.perf_counter()
+    repository = None
+    if reader == 'json.load':
+        with open(save_file, 'r') as file:
+            matches = json.load(file)
+    elif reader == 'iter_saved_matches':
+        matches = iter_saved_matches(save_file)
+    else:
+        repository = MatchRepository(database_file, stats_file)
+        matches = repository.iter_matches()
+    careers = compute_careers(matches)
+    duration = time.perf_counter() - start
+    if repository is not None:
+        repository.close()
+    count = sum(values[0] for values in careers.values()) // 2  # Two players per match
+    return count, duration, peak_rss(), peak_rss() - start_rss
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        description='Compares the peak RSS and the throughput of json.load with the streaming '
+                    'reader of the save file.')
+    parser.add_argument('--matches', type=int, default=20000)
+    parser.add_argument('--repository', action='store_true',
+                        help='also reads the history with MatchRepository.iter_matches '
+                             '(the history is migrated into a database first)')
+    parser.add_argument('--seed', type=int, default=None)
+    arguments = parser.parse_args()
+    readers = ['json.load', 'iter_saved_matches']
+    with tempfile.TemporaryDirectory() as directory:
+        save_file = path.join(directory, 'statspoint_data.json')
+        write_save_file(save_file, generated_matches(arguments.matches, arguments.seed))
+        print('{} matches, save file of {:.1f} MB'.format(
+            arguments.matches, path.getsize(save_file) / 1e6))
+        database_file = path.join(directory, 'statspoint_data.db')
+        stats_file = path.join(directory, 'statspoint_stats.bin')
+        if arguments.repository:
+            repository = MatchRepository(database_file, stats_file)
+            repository.migrate_legacy_saves(save_file, path.join(directory, 'no_journal'))
+            repository.close()
+            readers.append('iter_matches')
+        for reader in readers:
+            # A new interpreter per reader ('spawn'), its peak RSS starts from scratch
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                count, duration, peak, growth = pool.submit(
+                    read_history, reader, save_file, database_file, stats_file).result()
+            print('{:<20} {:6} matches  {:7.0f} matches/s  peak RSS {:7.1f} MB '
+                  '(+{:.1f} MB during the read)'.format(
+                      reader, count, count / duration, peak, growth))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,8 +5,6 @@ Screen that manages all match saves.
 """
 
 
-import json
-
 from kivymd.app import MDApp
 from kivymd.uix.screen import MDScreen
 from kivymd.uix.list import OneLineAvatarIconListItem, IconRightWidget, IconLeftWidget
@@ -15,6 +13,7 @@ from kivymd.uix.button import MDFlatButton, MDRaisedButton
 
 from player import Player
 from match import Match
+from scoring import match_format_of
 
 
 class SaveScreen(MDScreen):
@@ -33,12 +32,6 @@ class SaveScreen(MDScreen):
     empty : bool
         Whether the save list is empty or not.
 
-    picked_game_data : dict
-        Data of the match picked by the user.
-
-    full_list : list
-        Contains all saves.
-
     Methods
     -------
     on_pre_enter():
@@ -47,27 +40,24 @@ class SaveScreen(MDScreen):
     saved_match_list():
         Creates a list with all saved games.
 
-    show_dialog_saves(data, full_list):
+    show_dialog_saves(header):
         Gives the choice to the user :
         Whether he continues the game, or he checks the stats of the game.
 
-    data_choice(data):
+    data_choice(header):
         Goes to the data screen depending on the user choice.
 
-    continue_game(data, full_list):
-        Continues the game.
+    continue_game(header):
+        Loads the full data of the match and continues the game.
     """
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.app = MDApp.get_running_app()
         self.save = None
         self.empty = True
-        self.picked_game_data = None
-        self.full_list = None
 
     def on_pre_enter(self, *args):
         """Is called just before the user sees the screen"""
-        self.app.root.ids.home_screen.check_json_save()
         self.app.root.ids.my_toolbar.right_action_items = [
             ["information-outline", lambda x: self.app.root.ids.my_toolbar.show_dialog_confirmation()]]
         self.app.root.ids.my_toolbar.title = 'Saves'
@@ -76,14 +66,13 @@ class SaveScreen(MDScreen):
     def saved_match_list(self):
         """Creates a list with all saved games"""
         self.ids.match_list.clear_widgets()  # To avoid duplication of widgets
-        with open('../statspoint_data.json', 'r') as file:
-            data = json.load(file)
-        for match_info in data:  # For every match saved in the JSON file
+        headers = self.app.repository.list_headers()  # Only names, no stats
+        for match_info in headers:  # For every saved match
             self.empty = False
             result = OneLineAvatarIconListItem(text='{} : {} vs {}'.format(
                 match_info['match_name'], match_info['player1_name'],
                 match_info['player2_name']))  # Add a OneListItem widget (UI)
-            result.bind(on_press=lambda a, i=match_info: self.show_dialog_saves(i, data))
+            result.bind(on_press=lambda a, i=match_info: self.show_dialog_saves(i))
             delete_save = DeleteSave(
                 theme_text_color='Custom',
                 text_color=(0.9, 0, 0, 1),
@@ -93,7 +82,7 @@ class SaveScreen(MDScreen):
                 icon='tennis',
                 theme_text_color='Custom',
                 text_color=(0.9, 0.36, 0, 1),
-                on_press=lambda a, i=match_info: self.show_dialog_saves(i, data))
+                on_press=lambda a, i=match_info: self.show_dialog_saves(i))
             result.add_widget(tennis_icon)
             # Adds a button to delete the match
             result.add_widget(delete_save)
@@ -105,13 +94,13 @@ class SaveScreen(MDScreen):
             self.ids.empty_text.text = ''
         self.empty = True
 
-    def show_dialog_saves(self, data, full_list):
+    def show_dialog_saves(self, header):
         """Gives the choice to the user :
         Whether he continues the game, or he checks the data of the game"""
         if not self.save:
             raised_button = MDRaisedButton(
                 text='Continue',
-                on_release=lambda x: self.continue_game(data, full_list),
+                on_release=lambda x: self.continue_game(header),
             )
             raised_button.text_color = (1, 1, 1, 1)
             self.save = MDDialog(
@@ -123,26 +112,25 @@ class SaveScreen(MDScreen):
                     MDFlatButton(
                         text='Stats',
                         text_color=self.app.theme_cls.primary_color,
-                        on_release=lambda x: self.data_choice(data))])
+                        on_release=lambda x: self.data_choice(header))])
 
-        if not data['match_ended']:
+        if not header['match_ended']:
             self.save.open()
         else:
-            self.data_choice(data)
+            self.data_choice(header)
 
-    def data_choice(self, data):
+    def data_choice(self, header):
         """Goes to the data_screen depending on the user's choice"""
         if self.save is not None:
-            self.app.root.ids.data_screen.data = data
+            self.app.root.ids.data_screen.match_id = header['match_id']  # Stats loaded there
             self.app.change_screen('data_screen')
             self.save.dismiss()
             self.save = None
 
-    def continue_game(self, data, full_list):
-        """Continues the game"""
+    def continue_game(self, header):
+        """Loads the full data of the match and continues the game"""
         if self.save is not None:
-            self.picked_game_data = data  # To get the information from another class
-            self.full_list = full_list
+            data = self.app.repository.load_match(header['match_id'])
             player1 = Player(data['player1_name'], data['player1_stats'])
             player2 = Player(data['player2_name'], data['player2_stats'])
             self.app.root.ids.game_screen.player1 = player1
@@ -150,11 +138,13 @@ class SaveScreen(MDScreen):
 
             if data['server'] == player1.name:
                 self.app.root.ids.game_screen.match = Match(
-                    player1, player2, data['match_name'], player1, player2, data['sets_winners'])
+                    player1, player2, data['match_name'], player1, player2, data['sets_winners'],
+                    data['match_id'], data['points_log'], match_format_of(data))
                 # Those repetitions will be removed
             else:
                 self.app.root.ids.game_screen.match = Match(
-                    player1, player2, data['match_name'], player2, player1, data['sets_winners'])
+                    player1, player2, data['match_name'], player2, player1, data['sets_winners'],
+                    data['match_id'], data['points_log'], match_format_of(data))
                 # Those repetitions will be removed
             self.app.root.ids.game_screen.check_server(self.app.root.ids.game_screen.match)
             self.app.change_screen('game_screen')
@@ -214,12 +204,6 @@ class DeleteSave(IconRightWidget):
     def delete_data(self, to_remove_data):
         """Deletes the selected game"""
         if self.delete_confirmation is not None:
-            with open('../statspoint_data.json', 'r') as js_file:
-                file = json.load(js_file)
-            for game in file:
-                if to_remove_data == game:  # Removes the right dictionary
-                    file.remove(to_remove_data)
-            with open('../statspoint_data.json', 'w') as js_file:  # Rewrites the file without the removed dict
-                json.dump(file, js_file, indent=4, sort_keys=True)
+            self.app.repository.delete_match(to_remove_data['match_id'])
             self.app.root.ids.save_screen.saved_match_list()  # Updates the screen
             self.cancel()
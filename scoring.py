@@ -0,0 +1,393 @@
+"""
+Scoring
+
+Rules of a tennis match : points, games, sets and tie-breaks.
+This module does not depend on Kivy, the end of a set or of the match is reported through callbacks.
+Nothing is logged here : the engine scores points in tight loops (simulations, batch processing).
+
+The rules of a match format are precomputed into a ScoringTable : every reachable score is
+numbered, and scoring a point is a single lookup in a list of transitions.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+
+from player import COUNTERS, COUNTER_INDEX
+
+
+MatchFormat = namedtuple('MatchFormat', [
+    'sets_to_win', 'games_per_set', 'tie_break_points', 'no_ad', 'super_tie_break',
+    'super_tie_break_points'], defaults=[2, 6, 7, False, False, 10])
+MatchFormat.__doc__ = """
+Rules of a match.
+
+sets_to_win : 2 for best-of-3, 3 for best-of-5.
+games_per_set : 6, or 4 for short sets. The tie-break is played at games_per_set all.
+tie_break_points : Points needed to win a tie-break (with 2 points ahead).
+no_ad : The point played at 40-40 wins the game.
+super_tie_break : The deciding set is replaced by a tie-break in super_tie_break_points.
+"""
+
+BEST_OF_3 = MatchFormat()
+BEST_OF_5 = MatchFormat(sets_to_win=3)
+NO_AD = MatchFormat(no_ad=True)
+SUPER_TIE_BREAK = MatchFormat(no_ad=True, super_tie_break=True)
+SHORT_SETS = MatchFormat(games_per_set=4)
+
+FORMATS = {'best_of_3': BEST_OF_3, 'best_of_5': BEST_OF_5, 'no_ad': NO_AD,
+           'super_tie_break': SUPER_TIE_BREAK, 'short_sets': SHORT_SETS}
+"""Match formats by name (command line options)."""
+
+POINTS = (0, 15, 30, 40, 'AD')
+TIE_BREAK_CAP = 50
+"""
+Highest tie-break points amount of a state : beyond it, both amounts of the state go down by 2
+(same lead, same server). The players keep their real amounts (see ScoringEngine).
+"""
+
+# Flags of a transition
+GAME_WON = 1
+"""A regular game is won (not a tie-break)."""
+TIE_BREAK_WON = 2
+SET_WON = 4
+MATCH_WON = 8
+CHANGE_SERVER = 16
+GAME_POINT = 32
+"""The winner of the point now has a game point (regular games only)."""
+TIE_BREAK_CAPPED = 64
+"""The tie-break points of the state went down by 2 (see TIE_BREAK_CAP)."""
+DECIDING_POINT = 128
+"""The next point is the deciding point of a no-ad game : a break point for the receiver,
+whoever won the point."""
+FLAG_BITS = 8
+FLAGS = (1 << FLAG_BITS) - 1
+"""All the flags : most points (15-0, 30-15...) have none of them."""
+MATCH_OVER = -1
+"""Transition of a score where the match is already over."""
+
+# Offsets of the counters updated by the score in a block of Player.counters
+TOTAL_POINTS = COUNTER_INDEX['total_points']
+TOTAL_GAMES = COUNTER_INDEX['total_games']
+BREAK_POINTS = COUNTER_INDEX['break_points']
+RETURN_GAME_WON = COUNTER_INDEX['return_game_won']
+BLOCK_SIZE = len(COUNTERS)
+"""Number of counters of a block (the totals, or a set) of Player.counters."""
+
+
+class ScoringTable:
+    """
+    Every reachable score of a match format, and the transitions between them.
+    ...
+    Attributes
+    ----------
+    match_format : object
+        Instance of MatchFormat.
+
+    scores : list
+        Score of each state : (points1, points2, games1, games2, sets1, sets2),
+        with the same values as the Player amounts (0, 15, 30, 40, 'AD' or tie-break points).
+
+    states : dict
+        Number of each score.
+
+    transitions : list
+        transitions[2 * state + slot] is the next state when the player 'slot' (0 or 1) wins
+        the point, shifted by FLAG_BITS, plus the flags of the point (MATCH_OVER at the end).
+
+    Methods
+    -------
+    state_of(player1, player2):
+        Returns the state of the current score of two players.
+
+    is_tie_break(state):
+        Returns True if the points of the state are tie-break points.
+    """
+
+    def __init__(self, match_format):
+        self.match_format = match_format
+        self.scores = []
+        self.states = {}
+        self.transitions = []
+        self._number((0, 0, 0, 0, 0, 0))
+        state = 0
+        while state < len(self.scores):  # Breadth-first numbering of the reachable scores
+            for slot in (0, 1):
+                self.transitions.append(self._transition(self.scores[state], slot))
+            state += 1
+
+    def state_of(self, player1, player2):
+        """Returns the state of the current score of two players"""
+        score = [player1.points_amount, player2.points_amount, player1.games_amount,
+                 player2.games_amount, player1.sets_amount, player2.sets_amount]
+        if self._tie_break_target(score) is not None:
+            while min(score[0], score[1]) > TIE_BREAK_CAP - 2:
+                score[0] -= 2
+                score[1] -= 2
+        try:
+            return self.states[tuple(score)]
+        except KeyError:
+            raise ValueError('Impossible score for {} : {}'.format(self.match_format, score))
+
+    def is_tie_break(self, state):
+        """Returns True if the points of the state are tie-break points"""
+        return self._tie_break_target(self.scores[state]) is not None
+
+    def _number(self, score):
+        """Returns the state of a score, numbers it if it is new"""
+        if score not in self.states:
+            self.states[score] = len(self.scores)
+            self.scores.append(score)
+        return self.states[score]
+
+    def _tie_break_target(self, score):
+        """Returns the points needed to win the tie-break being played, None if it's not one"""
+        match_format = self.match_format
+        last_set = score[4] == score[5] == match_format.sets_to_win - 1
+        if match_format.super_tie_break and last_set:
+            return match_format.super_tie_break_points
+        if score[2] == score[3] == match_format.games_per_set:
+            return match_format.tie_break_points
+        return None
+
+    def _transition(self, score, slot):
+        """Returns the transition of a score when the player 'slot' wins the point"""
+        match_format = self.match_format
+        if max(score[4], score[5]) == match_format.sets_to_win:
+            return MATCH_OVER
+        points, games, sets = list(score[0:2]), list(score[2:4]), list(score[4:6])
+        winner, opponent = slot, 1 - slot
+        flags = 0
+        target = self._tie_break_target(score)
+        if target is not None:
+            points[winner] += 1
+            if points[winner] >= target and points[winner] - points[opponent] >= 2:
+                flags |= TIE_BREAK_WON | CHANGE_SERVER
+            elif (points[winner] + points[opponent]) % 2 == 1:
+                flags |= CHANGE_SERVER
+            if points[winner] > TIE_BREAK_CAP and not flags & TIE_BREAK_WON:
+                points = [points[0] - 2, points[1] - 2]
+                flags |= TIE_BREAK_CAPPED
+        elif points[winner] == 'AD' or points[winner] == 40 and (
+                points[opponent] not in (40, 'AD') or match_format.no_ad):
+            flags |= GAME_WON | CHANGE_SERVER
+        elif points[winner] == 40 and points[opponent] == 40:
+            points[winner] = 'AD'
+        elif points[opponent] == 'AD':
+            points[opponent] = 40
+        else:
+            points[winner] = POINTS[POINTS.index(points[winner]) + 1]
+            if points[winner] == 40 and points[opponent] == 40 and match_format.no_ad:
+                flags |= DECIDING_POINT
+        if target is None and not flags & GAME_WON and (
+                points[winner] == 'AD' or points[winner] == 40 and points[opponent] != 40):
+            flags |= GAME_POINT
+        if flags & (GAME_WON | TIE_BREAK_WON):
+            points = [0, 0]
+            games[winner] += 1
+            lead = games[winner] - games[opponent]
+            if flags & TIE_BREAK_WON or games[winner] >= match_format.games_per_set and lead >= 2:
+                flags |= SET_WON
+                games = [0, 0]
+                sets[winner] += 1
+                if sets[winner] == match_format.sets_to_win:
+                    flags |= MATCH_WON
+        return self._number(tuple(points + games + sets)) << FLAG_BITS | flags
+
+
+@lru_cache(maxsize=None)
+def scoring_table(match_format):
+    """Returns the ScoringTable of a match format (it is built once)"""
+    return ScoringTable(match_format)
+
+
+def match_format_of(match_data):
+    """Returns the MatchFormat of a saved match (best-of-3 for the saves older than the formats)"""
+    if match_data.get('match_format') is None:
+        return BEST_OF_3
+    return MatchFormat(*match_data['match_format'])
+
+
+class ScoringEngine:
+    """
+    A class to represent a Tennis model and its rules.
+    ...
+    Attributes
+    ----------
+    player1 : object
+        Instance of the class Player. It is the player 1 of the match.
+
+    player2 : object
+        Instance of the class Player. It is the player 2 of the match.
+
+    server : object
+        Instance of the class Player. It is the player who serves.
+
+    receiver : object
+        Instance of the class Player. It is the player who receives.
+
+    match_format : object
+        Instance of MatchFormat. The rules of the match.
+
+    table : object
+        Instance of ScoringTable. The precomputed rules of the match format.
+
+    state : int
+        State of the current score in the table.
+
+    tie_break_offset : int
+        Points added to both tie-break amounts of the state to get the amounts of the players,
+        in a tie-break longer than TIE_BREAK_CAP (0 otherwise).
+
+    won_tie_break_offsets : list
+        tie_break_offset at the end of each tie-break won with this engine (to undo these points).
+
+    set_index : int
+        Number of played sets.
+
+    sets_winners : list
+        Winner of each set won (the list grows at the end of each set).
+
+    on_set_over : function
+        Called with the winner at the end of each set (None to disable).
+
+    on_match_over : function
+        Called with the winner at the end of the match (None to disable).
+
+    Methods
+    -------
+    points_win(winner, opponent):
+        Is called each time a player wins a point.
+        Updates the score and the statistics with one transition of the table.
+
+    is_over():
+        Returns True if the match is over.
+
+    change_server():
+        The server becomes the receiver, and the receiver becomes the server.
+
+    start_set():
+        Adds the counters of the current set to the players, if they don't have them.
+    """
+
+    def __init__(self, player1, player2, server=None, receiver=None, sets_winners=None,
+                 on_set_over=None, on_match_over=None, match_format=BEST_OF_3):
+        """
+        Parameters
+        ----------
+        player1 : object
+            Instance of the class Player. It is the player 1 of the match.
+        player2: object
+            Instance of the class Player. It is the player 2 of the match.
+        server : object
+            Instance of the class Player. The player who is serving.
+        receiver : object
+            Instance of the class Player. The player who is returning.
+        sets_winners : list
+            Winner of each set won.
+        on_set_over : function
+            Called with the winner at the end of each set.
+        on_match_over : function
+            Called with the winner at the end of the match.
+        match_format : object
+            Instance of MatchFormat. The rules of the match (best-of-3 by default).
+        """
+        if server is None:
+            server = player1
+        if receiver is None:
+            receiver = player2
+        if sets_winners is None:
+            sets_winners = []
+
+        self.player1 = player1
+        self.player2 = player2
+        self.server = server
+        self.receiver = receiver
+        self.match_format = match_format
+        self.table = scoring_table(match_format)
+        self.state = self.table.state_of(player1, player2)
+        self.tie_break_offset = 0
+        if self.table.is_tie_break(self.state):
+            self.tie_break_offset = player1.points_amount - self.table.scores[self.state][0]
+        self.won_tie_break_offsets = []
+        self.set_index = self.player1.sets_amount + self.player2.sets_amount
+        self.sets_winners = sets_winners
+        self.on_set_over = on_set_over
+        self.on_match_over = on_match_over
+        self.start_set()
+
+    def points_win(self, winner, opponent):
+        """
+        Is called each time a player wins a point.
+        Updates the score and the statistics that depend on it with one transition of the table
+        (the other statistics of a point are counted by point_log.apply_event).
+        """
+        table = self.table
+        transition = table.transitions[2 * self.state + (winner is self.player2)]
+        if transition == MATCH_OVER:
+            return
+        set_index = self.set_index
+        # The counters of the set, and the totals of the match (first block)
+        counters, offset = winner.counters, (set_index + 1) * BLOCK_SIZE
+        counters[TOTAL_POINTS] += 1
+        counters[offset + TOTAL_POINTS] += 1
+        self.state = state = transition >> FLAG_BITS
+        player1, player2 = self.player1, self.player2
+        (player1.points_amount, player2.points_amount, player1.games_amount, player2.games_amount,
+         player1.sets_amount, player2.sets_amount) = table.scores[state]
+        if not transition & FLAGS:  # Nothing else changes
+            if self.tie_break_offset:  # The real points of a long tie-break
+                player1.points_amount += self.tie_break_offset
+                player2.points_amount += self.tie_break_offset
+            return
+        if transition & GAME_POINT and winner is self.receiver or transition & DECIDING_POINT:
+            receiver_counters = self.receiver.counters  # Break point
+            receiver_counters[BREAK_POINTS] += 1
+            receiver_counters[offset + BREAK_POINTS] += 1
+        if transition & GAME_WON and winner is self.receiver:  # Return game won
+            counters[RETURN_GAME_WON] += 1
+            counters[offset + RETURN_GAME_WON] += 1
+        if transition & TIE_BREAK_CAPPED:
+            self.tie_break_offset += 2
+        elif transition & TIE_BREAK_WON:
+            self.won_tie_break_offsets.append(self.tie_break_offset)
+            self.tie_break_offset = 0
+        if self.tie_break_offset:  # The real points of a long tie-break
+            player1.points_amount += self.tie_break_offset
+            player2.points_amount += self.tie_break_offset
+        if transition & (GAME_WON | TIE_BREAK_WON):
+            counters[TOTAL_GAMES] += 1
+            counters[offset + TOTAL_GAMES] += 1
+        if transition & SET_WON:
+            if set_index < len(self.sets_winners):  # Older saves have one winner per possible set
+                self.sets_winners[set_index] = winner.name
+            else:
+                self.sets_winners.append(winner.name)
+            self.set_index = player1.sets_amount + player2.sets_amount
+            self.start_set()
+        if transition & CHANGE_SERVER:
+            self.change_server()
+        if transition & SET_WON and self.on_set_over is not None:
+            self.on_set_over(winner)
+        if transition & MATCH_WON and self.on_match_over is not None:
+            self.on_match_over(winner)
+
+    def is_over(self):
+        """Returns True if the match is over"""
+        return self.table.transitions[2 * self.state] == MATCH_OVER
+
+    def change_server(self):
+        """The server becomes the receiver, and the receiver becomes the server"""
+        if self.server == self.player1:
+            self.server = self.player2
+            self.receiver = self.player1
+        else:
+            self.server = self.player1
+            self.receiver = self.player2
+
+    def start_set(self):
+        """Adds the counters of the current set to the players, if they don't have them"""
+        if self.is_over():
+            return
+        for player in (self.player1, self.player2):
+            while player.sets_number <= self.set_index:
+                player.add_set()
@@ -0,0 +1,82 @@
+"""
+ScoringBenchmark
+
+Measures how many points per second the ScoringEngine scores, without Kivy :
+the score alone (ScoringEngine.points_win), and the replay of generated event logs
+(point_log.apply_event : the score and every counter of the point).
+The matches are played with random point winners, a new match starts when one is over.
+
+Usage : python scoring_benchmark.py [--points N] [--format NAME] [--repeat N] [--seed S]
+"""
+
+import argparse
+import random
+import time
+
+from player import Player
+from point_log import apply_event, encode_event, ACE, FORCED_ERROR, VOLLEY
+from scoring import scoring_table, FORMATS, ScoringEngine
+
+
+def generated_logs(points, match_format, seed=None):
+    """Returns event logs of random matches with 'points' points in all (the last match may not
+    be over). The server of each event is the server of the score."""
+    rng = random.Random(seed)
+    logs = []
+    while points > 0:
+        engine = ScoringEngine(Player('player1'), Player('player2'), match_format=match_format)
+        log = []
+        while not engine.is_over() and len(log) < points:
+            event = encode_event(1 if engine.server is engine.player1 else 2, rng.randint(1, 2),
+                                 rng.randint(1, 2), rng.randint(ACE, FORCED_ERROR),
+                                 rng.randint(0, VOLLEY))
+            apply_event(engine, event)
+            log.append(event)
+        logs.append(log)
+        points -= len(log)
+    return logs
+
+
+def score_points(logs, match_format):
+    """Scores the winners of the points of the logs with ScoringEngine.points_win only"""
+    for log in logs:
+        engine = ScoringEngine(Player('player1'), Player('player2'), match_format=match_format)
+        players = (engine.player1, engine.player2)
+        points_win = engine.points_win
+        for event in log:
+            points_win(players[event & 1], players[1 - (event & 1)])
+
+
+def replay_logs(logs, match_format):
+    """Replays the logs with point_log.apply_event (score and counters of every point)"""
+    for log in logs:
+        engine = ScoringEngine(Player('player1'), Player('player2'), match_format=match_format)
+        for event in log:
+            apply_event(engine, event)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        description='Measures the points per second of the ScoringEngine (no Kivy needed).')
+    parser.add_argument('--points', type=int, default=1000000)
+    parser.add_argument('--format', choices=sorted(FORMATS), default='best_of_3')
+    parser.add_argument('--repeat', type=int, default=3, help='the best run is reported')
+    parser.add_argument('--seed', type=int, default=None)
+    arguments = parser.parse_args()
+    match_format = FORMATS[arguments.format]
+    scoring_table(match_format)  # The table is built before the timing
+    logs = generated_logs(arguments.points, match_format, arguments.seed)
+    print('{} points in {} matches ({})'.format(arguments.points, len(logs), arguments.format))
+    for name, function in (('points_win (score only)', score_points),
+                           ('apply_event (full replay)', replay_logs)):
+        durations = []
+        for _ in range(arguments.repeat):
+            start = time.perf_counter()
+            function(logs, match_format)
+            durations.append(time.perf_counter() - start)
+        print('{:<26} {:9.0f} points/s'.format(name, arguments.points / min(durations)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+ShardsBenchmark
+
+Measures the shards of the matches (see match_shards) on generated histories of several sizes :
+the first export, an export where nothing changed, the write of one shard (what the
+MatchRepository does for each save), and the load of the whole history, serial then with
+a pool of threads and a pool of processes.
+
+Usage : python shards_benchmark.py [--matches N [N ...]] [--workers N] [--repeat N] [--seed S]
+"""
+
+import argparse
+import tempfile
+import time
+
+from match_shards import export_shards, load_shards, write_shard
+from repository_benchmark import generated_matches, report, timings
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        description='Measures the export, the write of one shard and the serial and pooled '
+                    'loads of the shards of generated histories.')
+    parser.add_argument('--matches', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--workers', type=int, default=None,
+                        help='size of the pools (default : the default of concurrent.futures)')
+    parser.add_argument('--repeat', type=int, default=3, help='number of runs of each load')
+    parser.add_argument('--seed', type=int, default=None)
+    arguments = parser.parse_args()
+    for count in arguments.matches:
+        matches = [dict(match_data, match_id=index + 1) for index, match_data
+                   in enumerate(generated_matches(count, arguments.seed))]
+        print('{} matches :'.format(count))
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ('export (all shards written)', 'export (nothing changed)'):
+                start = time.perf_counter()
+                export_shards(matches, directory)
+                report(name, [(time.perf_counter() - start) * 1000])
+            report('write_shard (one save)', timings(
+                lambda match_data: write_shard(match_data, directory), matches[-100:]))
+
+            for name, workers, processes in (
+                    ('load, serial', 1, False),
+                    ('load, thread pool', arguments.workers, False),
+                    ('load, process pool', arguments.workers, True)):
+                report(name, timings(
+                    lambda _: load_shards(directory, workers, processes), range(arguments.repeat)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Simulator
+
+Plays a large number of matches between two players with NumPy, all the matches at the same time.
+The matches follow the rules of the ScoringTable (the same rules as Match) : each step plays one
+point in every match which is not over, with a lookup in the transition table.
+
+Usage : python simulator.py (P1_SERVE P2_SERVE | --match-id ID) [--matches N] [--format NAME]
+                            [--processes N] [--benchmark]
+"""
+
+import argparse
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from scoring import scoring_table, BEST_OF_3, CHANGE_SERVER, FLAG_BITS, FORMATS, MATCH_OVER
+
+
+def serve_probability(stats):
+    """Returns the probability that a player wins a point on their serve, from their Player.stats"""
+    totals = stats['totals']
+    played = totals['service_points_played']
+    won = totals['first_service_won'] + totals['second_service_won']
+    return won / played if played else 0.5
+
+
+def return_probability(stats):
+    """Returns the probability that a player wins a point on their return, from their Player.stats"""
+    played = stats['totals']['return_points_played']
+    return stats['totals']['return_points_won'] / played if played else 0.5
+
+
+def point_probabilities(player1_stats, player2_stats):
+    """
+    Returns the probabilities that each player wins a point on their own serve.
+    The serve stats of a player and the return stats of the opponent are averaged.
+    """
+    player1_serve = (serve_probability(player1_stats) + 1 - return_probability(player2_stats)) / 2
+    player2_serve = (serve_probability(player2_stats) + 1 - return_probability(player1_stats)) / 2
+    return player1_serve, player2_serve
+
+
+def simulate(player1_serve, player2_serve, matches, match_format=BEST_OF_3, seed=None):
+    """
+    Plays matches and returns the number of matches won by the player 1 and the final sets scores.
+
+    Parameters
+    ----------
+    player1_serve : float
+        Probability that the player 1 wins a point on their serve.
+    player2_serve : float
+        Probability that the player 2 wins a point on their serve.
+    matches : int
+        Number of matches played. The player 1 serves first in every match.
+    match_format : object
+        Instance of MatchFormat.
+    seed : int
+        Seed of the random generator (None for a random seed).
+    """
+    table = scoring_table(match_format)
+    transitions = np.array(table.transitions, dtype=np.int64)
+    sets = np.array([score[4:6] for score in table.scores], dtype=np.int8)
+    random = np.random.default_rng(seed)
+    final_states = np.zeros(matches, dtype=np.int64)
+    # Only the matches which are not over are kept in these arrays
+    match_ids = np.arange(matches)
+    states = np.zeros(matches, dtype=np.int64)
+    player1_serves = np.ones(matches, dtype=bool)
+    while match_ids.size:
+        player2_wins = random.random(match_ids.size) >= np.where(
+            player1_serves, player1_serve, 1 - player2_serve)
+        transition = transitions[2 * states + player2_wins]
+        states = transition >> FLAG_BITS
+        player1_serves ^= (transition & CHANGE_SERVER) != 0
+        finished = transitions[2 * states] == MATCH_OVER
+        if finished.any():
+            final_states[match_ids[finished]] = states[finished]
+            playing = ~finished
+            match_ids, states, player1_serves = (
+                match_ids[playing], states[playing], player1_serves[playing])
+    final_sets = sets[final_states]
+    scores = Counter(zip(final_sets[:, 0].tolist(), final_sets[:, 1].tolist()))
+    wins = int(np.count_nonzero(final_sets[:, 0] == match_format.sets_to_win))
+    return wins, scores
+
+
+def simulate_pool(player1_serve, player2_serve, matches, match_format=BEST_OF_3, processes=None,
+                  seed=None):
+    """Same as simulate, with the matches shared between a pool of processes"""
+    workers = processes or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        seeds = np.random.SeedSequence(seed).spawn(workers)
+        sizes = [matches // workers + (index < matches % workers) for index in range(workers)]
+        results = executor.map(simulate, [player1_serve] * workers, [player2_serve] * workers,
+                               sizes, [match_format] * workers, seeds)
+        wins, scores = 0, Counter()
+        for worker_wins, worker_scores in results:
+            wins += worker_wins
+            scores.update(worker_scores)
+    return wins, scores
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Simulates matches between two players.')
+    parser.add_argument('player1_serve', type=float, nargs='?',
+                        help='probability that the player 1 wins a point on their serve')
+    parser.add_argument('player2_serve', type=float, nargs='?',
+                        help='probability that the player 2 wins a point on their serve')
+    parser.add_argument('--match-id', type=int, default=None,
+                        help='takes the probabilities from the stats of a saved match')
+    parser.add_argument('--matches', type=int, default=100000)
+    parser.add_argument('--format', choices=sorted(FORMATS), default='best_of_3')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='size of the process pool (1 plays all the matches in this process)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--benchmark', action='store_true',
+                        help='also reports the matches per second on one core and with the pool')
+    arguments = parser.parse_args()
+    if arguments.match_id is not None:
+        from match_repository import MatchRepository
+        repository = MatchRepository()
+        try:
+            match_data = repository.load_match(arguments.match_id)
+        finally:
+            repository.close()
+        if match_data is None:
+            parser.error('no saved match with the id {}'.format(arguments.match_id))
+        arguments.player1_serve, arguments.player2_serve = point_probabilities(
+            match_data['player1_stats'], match_data['player2_stats'])
+        print('{} serve : {:.3f}, {} serve : {:.3f}'.format(
+            match_data['player1_name'], arguments.player1_serve,
+            match_data['player2_name'], arguments.player2_serve))
+    elif arguments.player2_serve is None:
+        parser.error('the serve probabilities or --match-id are required')
+    match_format = FORMATS[arguments.format]
+    scoring_table(match_format)  # The table is built before the timing
+
+    start = time.perf_counter()
+    if arguments.processes == 1:
+        wins, scores = simulate(arguments.player1_serve, arguments.player2_serve,
+                                arguments.matches, match_format, arguments.seed)
+    else:
+        wins, scores = simulate_pool(arguments.player1_serve, arguments.player2_serve,
+                                     arguments.matches, match_format, arguments.processes,
+                                     arguments.seed)
+    duration = time.perf_counter() - start
+    print('Player 1 wins {:.2%} of {} matches'.format(wins / arguments.matches, arguments.matches))
+    for (player1_sets, player2_sets), count in sorted(scores.items(), key=lambda item: -item[1]):
+        print('  {}-{} : {:.2%}'.format(player1_sets, player2_sets, count / arguments.matches))
+    print('{:.2f} s, {:.0f} matches/s'.format(duration, arguments.matches / duration))
+
+    if arguments.benchmark:
+        for processes in (1, None):
+            start = time.perf_counter()
+            if processes == 1:
+                simulate(arguments.player1_serve, arguments.player2_serve, arguments.matches,
+                         match_format, arguments.seed)
+            else:
+                simulate_pool(arguments.player1_serve, arguments.player2_serve, arguments.matches,
+                              match_format, processes, arguments.seed)
+            print('{} : {:.0f} matches/s'.format(
+                'one core' if processes == 1 else 'process pool',
+                arguments.matches / (time.perf_counter() - start)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+StatsCodec
+
+Packs the statistics of a player (Player.stats) into a compact binary record, and back.
+The record has a fixed layout : a small header followed by every counter of every set.
+"""
+
+import struct
+import sys
+from array import array
+
+from player import STATS_KEYS, SERVICE_STATS_KEYS, COUNTERS
+
+
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct('<BBhBB')
+"""Format version, number of sets, points, games and sets amounts."""
+
+ADVANTAGE = -1
+"""Code of the 'AD' points amount."""
+
+
+def encode_stats(stats):
+    """
+    Returns the binary record of a player's stats.
+
+    Layout (little-endian) : the header, then one signed 16 bits integer per counter and per set,
+    set after set (the counter i of the set s is at the position s * len(COUNTERS) + i).
+    """
+    sets_number = len(stats['total_points'])
+    points = ADVANTAGE if stats['points'] == 'AD' else stats['points']
+    counters = array('h')
+    for set_index in range(sets_number):
+        counters.extend(stats[key][set_index] for key in STATS_KEYS)
+        counters.extend(stats['service_stats'][key][set_index] for key in SERVICE_STATS_KEYS)
+    if sys.byteorder == 'big':
+        counters.byteswap()
+    return HEADER.pack(FORMAT_VERSION, sets_number, points,
+                       stats['games'], stats['sets']) + counters.tobytes()
+
+
+def decode_stats(record):
+    """Returns the stats dict (same format as Player.stats, with the 'totals') of a binary record.
+    The record may be followed by padding bytes (see StatsFile)."""
+    version, sets_number, points, games, sets = HEADER.unpack_from(record)
+    if version != FORMAT_VERSION:
+        raise ValueError('Unknown stats record version : {}'.format(version))
+    counters = array('h')
+    counters.frombytes(record[HEADER.size:HEADER.size + sets_number * len(COUNTERS) * 2])
+    if sys.byteorder == 'big':
+        counters.byteswap()
+    stats = {'points': 'AD' if points == ADVANTAGE else points, 'games': games, 'sets': sets}
+    width = len(COUNTERS)
+    for index, key in enumerate(STATS_KEYS):
+        stats[key] = counters[index::width].tolist()
+    stats['service_stats'] = {
+        key: counters[len(STATS_KEYS) + index::width].tolist()
+        for index, key in enumerate(SERVICE_STATS_KEYS)}
+    # Totals of the match, added once here so that the screens don't sum the sets again
+    stats['totals'] = {key: sum(counters[index::width]) for index, key in enumerate(COUNTERS)}
+    return stats
@@ -2,15 +2,68 @@
 StatsDisplay
 
 Displays the statistics of a match for both players set by set (and total).
+The metrics of one match are computed in pure Python from the counters of the players
+(StatsKernel computes the same metrics with NumPy, for many saved matches at once).
 """
 
+from leverage import get_leverage_table, pressure_points
+from player import COUNTERS, played_set_indexes
+from scoring import match_format_of
 
-def safe_div(num1, num2):
-    """Returns an integer division.
-    Avoids error if division by zero."""
-    if num2 <= 0:
+COPIED = {
+    'total_points': 'total_points', 'aces': 'ace', 'double_faults': 'double_faults',
+    'winners': 'winners', 'forehand_winners': 'forehand_winners',
+    'backhand_winners': 'backhand_winners', 'net_points': 'net_points',
+    'net_winners': 'net_winners', 'net_unforced_errors': 'net_unforced_errors',
+    'unforced_errors': 'unforced_errors', 'forehand_unforced_errors': 'forehand_unforced_errors',
+    'backhand_unforced_errors': 'backhand_unforced_errors'}
+"""Metrics which are a counter of the player (metric: counter)."""
+
+
+def played_sets(data):
+    """Returns the number of sets shown for a saved match : up to the last one played, at least 1"""
+    played = played_set_indexes(data['player1_stats'], data['player2_stats'])
+    return played[-1] + 1 if played else 1
+
+
+def percent(part, whole):
+    """Returns the integer percentage of part in whole, 0 if whole is 0"""
+    return part * 100 // whole if whole > 0 else 0
+
+
+def set_metrics(counters, pressure=None):
+    """
+    Returns the metrics of a player for a set or a match, by name, from their counters
+    (a dict with every key of COUNTERS). The serve metrics are percentages, break_points,
+    pressure_points and return_points are ratios (won, played). pressure is (won, played),
+    None if the pressure points are not known.
+    """
+    metrics = {metric: counters[key] for metric, key in COPIED.items()}
+    first_service_in = counters['service_points_played'] - counters['second_service']
+    metrics['first_serve_in'] = percent(first_service_in, counters['service_points_played'])
+    metrics['first_serve_won'] = percent(counters['first_service_won'], first_service_in)
+    metrics['second_serve_won'] = percent(counters['second_service_won'],
+                                          counters['second_service_in'])
+    metrics['break_points'] = (counters['return_game_won'], counters['break_points'])
+    metrics['return_points'] = (counters['return_points_won'], counters['return_points_played'])
+    metrics['pressure_points'] = pressure
+    return metrics
+
+
+def best_player(value1, value2, highlight):
+    """
+    Returns which player has the best value of a metric (1 or 2, 0 for a tie).
+    highlight is 'max', 'min' or 'ratio' (the greatest won / played, 0 if nothing was played).
+    """
+    if value1 is None or value2 is None:  # Not known : no highlight
         return 0
-    return num1 / num2
+    if highlight == 'ratio':  # Compares won1 / played1 and won2 / played2 without division
+        (won1, played1), (won2, played2) = value1, value2
+        won1, won2 = won1 if played1 > 0 else 0, won2 if played2 > 0 else 0
+        value1, value2 = won1 * max(played2, 1), won2 * max(played1, 1)
+    elif highlight == 'min':
+        value1, value2 = -value1, -value2
+    return 1 if value1 > value2 else 2 if value2 > value1 else 0
 
 
 class StatsDisplay:
@@ -26,7 +79,7 @@ class StatsDisplay:
         Index of players.
 
     settings: dict
-        Configuration of the data display.
+        Configuration of the data display : the metric of each caption and its highlight.
 
     caption: list
         Captions of all statistics.
@@ -34,8 +87,30 @@ class StatsDisplay:
     highlights: list
         Highlighting systems for each stat.
 
+    pressure_points: tuple
+        Pressure points won by each player and played, set by set (see Leverage).
+        None while the LeverageTable is loading, or if the event log of the match is not complete.
+
+    pressure_pending: bool
+        True while the LeverageTable of the match format is loading (the pressure points are
+        shown as '...', then '-' if they can't be computed).
+
+    rows: list
+        Metrics of both players by name (see set_metrics) : one row per set, then the total
+        of the match.
+
+    winners: list
+        For each set, then the total, the player with the best value of each stat (in the order
+        of the captions) : 1 or 2, 0 for a tie or a row without highlight.
+
     Methods
     -------
+    player_rows(slot):
+        Returns the metrics of a player for every set, then for the match.
+
+    format_row(player, row):
+        Returns the texts of the stats of a row, in the order of the captions.
+
     get_stats_sets(manche, player):
         Get the stats of the match for each set.
 
@@ -48,99 +123,79 @@ class StatsDisplay:
     write_captions(leaderboard):
         Write all the captions on the screen.
     """
-    def __init__(self, data):
+    def __init__(self, data, on_leverage_ready=None):
         self.data = data
         self.players = ['player1', 'player2']
         self.settings = {
-            'VS': 'name',
-            'Total points won': 'max',
-            'Aces': 'max',
-            'Double Faults': 'min',
-            '1st Serve in (%)': 'max',
-            '1st Serve Pts Won (%)': 'max',
-            '2nd Serve Pts Won (%)': 'max',
-            'Break points converted': 'ratio',
-            'Winners': 'max',
-            'Forehand winners': 'max',
-            'Backhand winners': 'max',
-            'Net points': 'max',
-            'Net winners': 'max',
-            'Net unforced errors': 'min',
-            'Return points won': 'ratio',
-            'Unforced errors': 'min',
-            'Forehand unf. errors': 'min',
-            'Backhand unf. errors': 'min',
-            'Blank': 'max',
+            'VS': (None, 'name'),
+            'Total points won': ('total_points', 'max'),
+            'Aces': ('aces', 'max'),
+            'Double Faults': ('double_faults', 'min'),
+            '1st Serve in (%)': ('first_serve_in', 'max'),
+            '1st Serve Pts Won (%)': ('first_serve_won', 'max'),
+            '2nd Serve Pts Won (%)': ('second_serve_won', 'max'),
+            'Break points converted': ('break_points', 'ratio'),
+            'Pressure points won': ('pressure_points', 'ratio'),
+            'Winners': ('winners', 'max'),
+            'Forehand winners': ('forehand_winners', 'max'),
+            'Backhand winners': ('backhand_winners', 'max'),
+            'Net points': ('net_points', 'max'),
+            'Net winners': ('net_winners', 'max'),
+            'Net unforced errors': ('net_unforced_errors', 'min'),
+            'Return points won': ('return_points', 'ratio'),
+            'Unforced errors': ('unforced_errors', 'min'),
+            'Forehand unf. errors': ('forehand_unforced_errors', 'min'),
+            'Backhand unf. errors': ('backhand_unforced_errors', 'min'),
+            'Blank': (None, 'max'),
         }
         self.caption = list(self.settings.keys())[::-1]
-        self.highlights = list(self.settings.values())[::-1]
+        self.highlights = [highlight for _, highlight in self.settings.values()][::-1]
+        # The table is loaded in the background : on_leverage_ready is called once it's there
+        leverage_table = get_leverage_table(match_format_of(data), on_leverage_ready)
+        self.pressure_pending = leverage_table is None
+        self.pressure_points = None if leverage_table is None else pressure_points(
+            data, leverage_table)
+        self.rows = [self.player_rows(slot) for slot in range(2)]
+        self.winners = [
+            [best_player(row1.get(metric), row2.get(metric), highlight)
+             for metric, highlight in self.settings.values()][::-1]
+            for row1, row2 in zip(*self.rows)]
+
+    def player_rows(self, slot):
+        """Returns the metrics of a player (slot 0 or 1) for every set, then for the match"""
+        stats = self.data['player{}_stats'.format(slot + 1)]
+        sets_number = len(stats['total_points'])
+        pressure = [None] * (sets_number + 1)
+        if self.pressure_points is not None:
+            won, played = self.pressure_points[slot], self.pressure_points[2]
+            pressure = [(won[index], played[index]) if index < len(played) else (0, 0)
+                        for index in range(sets_number)] + [(sum(won), sum(played))]
+        counters = dict(stats, **stats['service_stats'])
+        rows = [set_metrics({key: counters[key][index] for key in COUNTERS}, pressure[index])
+                for index in range(sets_number)]
+        rows.append(set_metrics(stats['totals'], pressure[-1]))
+        return rows
+
+    def format_row(self, player, row):
+        """Returns the texts of the stats of a row of player_rows, in the order of the captions"""
+        texts = [self.data[str(player + '_name')]]
+        for metric, _ in list(self.settings.values())[1:-1]:
+            value = row[metric]
+            if value is None:  # Pressure points
+                texts.append('...' if self.pressure_pending else '-')
+            elif isinstance(value, tuple):
+                texts.append('{}/{}'.format(*value))
+            else:
+                texts.append(value)
+        return (texts + [1])[::-1]
 
     def get_stats_sets(self, manche, player):
         """Get the stats of the match for each set"""
-        name = self.data[str(player + '_name')]
-        full_stats = self.data[str(player + '_stats')]
-        serving_stats = full_stats['service_stats']
-        double_faults = serving_stats['double_faults'][manche]
-        aces = serving_stats['ace'][manche]
-        service_pts_played = serving_stats['service_points_played'][manche]
-        nbr_first_service_in = service_pts_played - serving_stats['second_service'][manche]
-        ratio_first_service_in = int(safe_div(nbr_first_service_in * 100,
-                                              service_pts_played))
-        ratio_first_service_won = int(safe_div(
-            serving_stats['first_service_won'][manche] * 100, nbr_first_service_in))
-        ratio_second_service_won = int(safe_div(
-            serving_stats['second_service_won'][manche] * 100,
-            serving_stats['second_service_in'][manche]))
-        break_points = full_stats['break_points'][manche]
-        break_points_ratio = '{}/{}'.format(
-            full_stats['return_game_won'][manche], break_points)
-
-        return_ratio = '{}/{}'.format(full_stats['return_points_won'][manche],
-                                      full_stats['return_points_played'][manche])
-
-        stats = [
-            name, full_stats['total_points'][manche], aces, double_faults, ratio_first_service_in,
-            ratio_first_service_won,
-            ratio_second_service_won, break_points_ratio, full_stats['winners'][manche],
-            full_stats['forehand_winners'][manche], full_stats['backhand_winners'][manche],
-            full_stats['net_points'][manche], full_stats['net_winners'][manche],
-            full_stats['net_unforced_errors'][manche], return_ratio,
-            full_stats['unforced_errors'][manche], full_stats['forehand_unforced_errors'][manche],
-            full_stats['backhand_unforced_errors'][manche], 1][::-1]
-        return stats
+        return self.format_row(player, self.rows[self.players.index(player)][manche])
 
     def get_match_stats(self, player):
         """Get the stats of the entire match"""
-        name = self.data[str(player + '_name')]
-        full_stats = self.data[str(player + '_stats')]
-        serving_stats = full_stats['service_stats']
-        double_faults = sum(serving_stats['double_faults'])
-        aces = sum(serving_stats['ace'])
-        service_pts_played = sum(serving_stats['service_points_played'])
-        nbr_first_service_in = service_pts_played - sum(serving_stats['second_service'])
-        ratio_first_service_in = int(safe_div(nbr_first_service_in * 100,
-                                              service_pts_played))
-        ratio_first_service_won = int(safe_div(
-            sum(serving_stats['first_service_won']) * 100, nbr_first_service_in))
-        ratio_second_service_won = int(safe_div(
-            sum(serving_stats['second_service_won']) * 100,
-            sum(serving_stats['second_service_in'])))
-        break_points = sum(full_stats['break_points'])
-        break_points_ratio = '{}/{}'.format(
-            sum(full_stats['return_game_won']), break_points)
-
-        return_ratio = '{}/{}'.format(sum(full_stats['return_points_won']),
-                                      sum(full_stats['return_points_played']))
-
-        stats = [name, sum(full_stats['total_points']), aces, double_faults, ratio_first_service_in,
-                 ratio_first_service_won,
-                 ratio_second_service_won, break_points_ratio, sum(full_stats['winners']),
-                 sum(full_stats['forehand_winners']), sum(full_stats['backhand_winners']),
-                 sum(full_stats['net_points']), sum(full_stats['net_winners']),
-                 sum(full_stats['net_unforced_errors']), return_ratio,
-                 sum(full_stats['unforced_errors']), sum(full_stats['forehand_unforced_errors']),
-                 sum(full_stats['backhand_unforced_errors']), 1][::-1]
-        return stats
+        return self.format_row(player, self.rows[self.players.index(player)][-1])
 
     def display_stats(self, stats, leaderboard, player):
         """Displays the statistics on the screen"""
@@ -0,0 +1,203 @@
+"""
+StatsFile
+
+Memory-mapped file of fixed-size slots, one slot per saved match.
+A slot holds the binary stats records (see StatsCodec) of both players of a match,
+so the stats of the match in the slot i are always at the same offset of the file.
+A slot is large enough for a best-of-5 match, a record only holds the sets played.
+"""
+
+import heapq
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from os import path
+
+from stats_codec import HEADER, COUNTERS
+
+
+STATS_FILE = '../statspoint_stats.bin'
+
+FILE_HEADER = struct.Struct('<4sHH')
+"""Magic bytes, file version and slot size."""
+
+MAGIC = b'SPST'
+FILE_VERSION = 2
+MAX_SETS = 5
+RECORD_SIZE = HEADER.size + MAX_SETS * len(COUNTERS) * 2
+"""Size of the stats record of one player (padded with zeros)."""
+
+OLD_RECORD_SIZES = {1: HEADER.size + 3 * len(COUNTERS) * 2}
+"""Size of the records of the older file versions (version 1 : best-of-3 only)."""
+
+SLOT_SIZE = 2 * RECORD_SIZE
+GROWTH = 256
+"""Number of slots added each time the file is full."""
+
+
+class StatsFile:
+    """
+    Gives access to the slots of the stats file.
+    ...
+    Attributes
+    ----------
+    file_path : str
+        Path of the stats file.
+
+    file : object
+        The stats file opened in binary mode.
+
+    map : object
+        Instance of mmap.mmap. The whole file mapped in memory.
+
+    capacity : int
+        Number of slots in the file.
+
+    free_slots : list
+        Heap of the slots that are not used (the lowest slot is given first).
+
+    lock : object
+        Instance of threading.Lock. The file may be grown by the persistence thread.
+
+    Methods
+    -------
+    load_free_slots(used_slots):
+        Rebuilds the free list from the slots used by the saved matches.
+
+    allocate():
+        Returns a free slot, grows the file if there is none.
+
+    write(slot, records):
+        Writes the records of both players in a slot.
+
+    free(slot):
+        Gives back the slot of a deleted match.
+
+    view(slot):
+        Context manager giving a memoryview of a slot (no copy).
+
+    read(slots):
+        Returns a copy of several slots, one after the other.
+
+    flush(slot=None):
+        Writes the modified pages on disk (only the pages of a slot if one is given).
+
+    close():
+        Closes the file.
+    """
+
+    def __init__(self, file_path=STATS_FILE):
+        self.file_path = file_path
+        if not path.exists(file_path):
+            with open(file_path, 'wb') as stats_file:
+                stats_file.write(FILE_HEADER.pack(MAGIC, FILE_VERSION, SLOT_SIZE))
+                stats_file.write(bytes(GROWTH * SLOT_SIZE))
+        upgrade_file(file_path)
+        self.file = open(file_path, 'r+b')
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        magic, version, slot_size = FILE_HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != FILE_VERSION or slot_size != SLOT_SIZE:
+            raise ValueError('Unknown stats file format : {}'.format(file_path))
+        self.capacity = (len(self.map) - FILE_HEADER.size) // SLOT_SIZE
+        self.free_slots = list(range(self.capacity))
+        self.lock = threading.Lock()
+
+    def load_free_slots(self, used_slots):
+        """Rebuilds the free list from the slots used by the saved matches"""
+        used_slots = set(used_slots)
+        with self.lock:
+            self.free_slots = [slot for slot in range(self.capacity) if slot not in used_slots]
+            heapq.heapify(self.free_slots)
+
+    def allocate(self):
+        """Returns a free slot, grows the file if there is none"""
+        with self.lock:
+            if not self.free_slots:
+                self._grow()
+            return heapq.heappop(self.free_slots)
+
+    def write(self, slot, records):
+        """Writes the records of both players in a slot"""
+        data = b''.join(record.ljust(RECORD_SIZE, b'\0') for record in records)
+        if len(data) != SLOT_SIZE:
+            raise ValueError('Stats records too long for a slot')
+        with self.lock:
+            offset = slot_offset(slot)
+            self.map[offset:offset + SLOT_SIZE] = data
+
+    def free(self, slot):
+        """Gives back the slot of a deleted match"""
+        with self.lock:
+            offset = slot_offset(slot)
+            self.map[offset:offset + SLOT_SIZE] = bytes(SLOT_SIZE)
+            heapq.heappush(self.free_slots, slot)
+
+    @contextmanager
+    def view(self, slot):
+        """Context manager giving a memoryview of a slot (no copy).
+        The view must not be used after the end of the 'with' block."""
+        with self.lock:
+            offset = slot_offset(slot)
+            with memoryview(self.map)[offset:offset + SLOT_SIZE] as slot_view:
+                yield slot_view
+
+    def read(self, slots):
+        """Returns a copy of several slots, one after the other (bytes)"""
+        with self.lock:
+            return b''.join(self.map[slot_offset(slot):slot_offset(slot) + SLOT_SIZE]
+                            for slot in slots)
+
+    def flush(self, slot=None):
+        """Writes the modified pages on disk (only the pages of a slot if one is given)"""
+        with self.lock:
+            if slot is None:
+                self.map.flush()
+            else:
+                start = slot_offset(slot) // mmap.PAGESIZE * mmap.PAGESIZE
+                self.map.flush(start, slot_offset(slot) + SLOT_SIZE - start)
+
+    def close(self):
+        """Closes the file"""
+        with self.lock:
+            self.map.close()
+            self.file.close()
+
+    def _grow(self):
+        """Adds empty slots at the end of the file (the lock must be held)"""
+        self.map.close()
+        self.file.truncate(slot_offset(self.capacity + GROWTH))
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        for slot in range(self.capacity, self.capacity + GROWTH):
+            heapq.heappush(self.free_slots, slot)
+        self.capacity += GROWTH
+
+
+def slot_offset(slot):
+    """Returns the position of a slot in the file"""
+    return FILE_HEADER.size + slot * SLOT_SIZE
+
+
+def upgrade_file(file_path):
+    """Converts a stats file of an older version (the records are moved to larger slots)"""
+    with open(file_path, 'rb') as stats_file:
+        magic, version, slot_size = FILE_HEADER.unpack(stats_file.read(FILE_HEADER.size))
+        if magic != MAGIC or version not in OLD_RECORD_SIZES:
+            return
+        old_record_size = OLD_RECORD_SIZES[version]
+        if slot_size != 2 * old_record_size:
+            return
+        slots = []
+        while True:
+            old_slot = stats_file.read(slot_size)
+            if len(old_slot) < slot_size:
+                break
+            slots.append(old_slot[:old_record_size].ljust(RECORD_SIZE, b'\0')
+                         + old_slot[old_record_size:].ljust(RECORD_SIZE, b'\0'))
+    with open(file_path + '.upgrade', 'wb') as new_file:  # The old file stays until the end
+        new_file.write(FILE_HEADER.pack(MAGIC, FILE_VERSION, SLOT_SIZE))
+        new_file.write(b''.join(slots))
+        new_file.flush()
+        os.fsync(new_file.fileno())
+    os.replace(file_path + '.upgrade', file_path)
@@ -0,0 +1,81 @@
+"""
+StatsFileBenchmark
+
+Measures the latency of opening one match of a large history : the whole load_match of the
+MatchRepository (row, players and stats slot, with a cold cache), and the decoding of the stats
+slot alone, straight from the memory-mapped StatsFile. Then checks that the slots freed by
+deleted matches are reused by the next saves (the file doesn't grow).
+
+Usage : python stats_file_benchmark.py [--matches N] [--queries N] [--seed S]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from os import path
+
+from match_repository import MatchRepository, insert_match
+from repository_benchmark import generated_matches, report, timings
+from stats_codec import decode_stats
+from stats_file import RECORD_SIZE
+
+
+def decode_slot(stats_file, stats_slot):
+    """Decodes the stats of both players of a slot, the way load_match does"""
+    with stats_file.view(stats_slot) as slot_view:
+        return [decode_stats(slot_view[(slot - 1) * RECORD_SIZE:slot * RECORD_SIZE])
+                for slot in (1, 2)]
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        description='Measures the latency of opening a match of a large history, and the reuse '
+                    'of the freed slots of the stats file.')
+    parser.add_argument('--matches', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=1000,
+                        help='number of matches opened (and of matches deleted then saved)')
+    parser.add_argument('--seed', type=int, default=None)
+    arguments = parser.parse_args()
+    rng = random.Random(arguments.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        database_file = path.join(directory, 'statspoint_data.db')
+        stats_file = path.join(directory, 'statspoint_stats.bin')
+        repository = MatchRepository(database_file, stats_file)
+        start = time.perf_counter()
+        with repository.connection:
+            for match_data in generated_matches(arguments.matches - 1, arguments.seed):
+                insert_match(repository.connection, repository.stats_file, match_data)
+        repository.stats_file.flush()
+        repository.close()
+        print('{} matches written in {:.1f} s, stats file of {:.1f} MB'.format(
+            arguments.matches, time.perf_counter() - start, path.getsize(stats_file) / 1e6))
+
+        start = time.perf_counter()
+        repository = MatchRepository(database_file, stats_file)
+        report('open the repository', [(time.perf_counter() - start) * 1000])
+        try:
+            match_ids = rng.sample(range(1, arguments.matches + 1), arguments.queries)
+            report('load_match (cold cache)', timings(repository.load_match, match_ids))
+            stats_slots = [row['stats_slot'] for row in repository.connection.execute(
+                'SELECT stats_slot FROM matches')]
+            report('decode a stats slot', timings(
+                lambda stats_slot: decode_slot(repository.stats_file, stats_slot),
+                rng.sample(stats_slots, arguments.queries)))
+
+            size = path.getsize(stats_file)
+            for match_id in match_ids:
+                repository.delete_match(match_id)
+            repository.flush()
+            for match_data in generated_matches(arguments.queries, arguments.seed):
+                repository.save_match(repository.new_match_id(), match_data)
+            repository.flush()
+            print('{} matches deleted then {} saved : stats file {:.1f} MB -> {:.1f} MB'.format(
+                arguments.queries, arguments.queries, size / 1e6, path.getsize(stats_file) / 1e6))
+        finally:
+            repository.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+StatsKernel
+
+Computes the statistics shown by StatsDisplay with NumPy, for thousands of saved matches at once
+(batch processing and command lines : the app computes the metrics of one match in pure Python).
+The counters are gathered in one array (matches x players x sets x counters) : each metric is
+then computed for all of them with a few operations on the columns of this array.
+
+Usage : python stats_kernel.py   (stats of every saved match, checked against StatsDisplay)
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from player import STATS_KEYS, COUNTERS, COUNTER_INDEX
+from stats_display import COPIED, set_metrics
+from stats_file import MAX_SETS
+
+METRICS = np.dtype([
+    ('total_points', 'i4'), ('aces', 'i4'), ('double_faults', 'i4'),
+    ('first_serve_in', 'i4'), ('first_serve_won', 'i4'), ('second_serve_won', 'i4'),
+    ('break_points', 'i4', (2,)), ('pressure_points', 'i4', (2,)),
+    ('winners', 'i4'), ('forehand_winners', 'i4'), ('backhand_winners', 'i4'),
+    ('net_points', 'i4'), ('net_winners', 'i4'), ('net_unforced_errors', 'i4'),
+    ('return_points', 'i4', (2,)), ('unforced_errors', 'i4'), ('forehand_unforced_errors', 'i4'),
+    ('backhand_unforced_errors', 'i4')])
+"""
+One row of the stats table, in the order of the rows of the LeaderBoard.
+The serve metrics are percentages, the metrics of shape (2,) are ratios (won, played).
+"""
+
+RECORD = np.dtype([
+    ('version', 'u1'), ('sets_number', 'u1'), ('points', '<i2'), ('games', 'u1'), ('sets', 'u1'),
+    ('counters', '<i2', (MAX_SETS, len(COUNTERS)))])
+"""A stats record padded in a slot of the StatsFile (header and counters, see StatsCodec)."""
+
+
+def match_counters(match_data):
+    """Returns the counters of a match (both players have the same number of sets) as an array
+    (players x sets x counters)"""
+    values = [[stats[key] if key in STATS_KEYS else stats['service_stats'][key] for key in COUNTERS]
+              for stats in (match_data['player1_stats'], match_data['player2_stats'])]
+    return np.array(values, dtype=np.int64).swapaxes(1, 2)
+
+
+def record_counters(slots):
+    """
+    Returns the counters of the matches stored in slots of the StatsFile (bytes of whole slots,
+    one after the other) as an array (matches x players x MAX_SETS x counters), without decoding
+    the records one by one.
+    """
+    records = np.frombuffer(slots, dtype=RECORD).reshape(-1, 2)
+    counters = records['counters'].astype(np.int64)
+    # The bytes after the sets of a record are padding
+    counters[np.arange(MAX_SETS) >= records['sets_number'][..., None]] = 0
+    return counters
+
+
+def stat_winners(table, highlights):
+    """
+    Returns which player has the best value of each metric (1 or 2, 0 for a tie) for every set of
+    a stats table (... x players x sets), as an array (... x sets x metrics), the metrics in the
+    order of METRICS.names.
+    highlights gives the rule of the metrics by name : 'max', 'min' or 'ratio' (the greatest
+    won / played, 0 if nothing was played). The metrics without a rule have no winner (0).
+    """
+    player1, player2 = table[..., 0, :], table[..., 1, :]
+    winners = np.zeros(player1.shape + (len(METRICS.names),), dtype=np.int8)
+    for column, metric in enumerate(METRICS.names):
+        highlight = highlights.get(metric)
+        if highlight is None:
+            continue
+        value1, value2 = player1[metric].astype(np.int64), player2[metric].astype(np.int64)
+        if highlight == 'ratio':  # Compares won1 / played1 and won2 / played2 without division
+            won1, played1 = np.where(value1[..., 1] > 0, value1[..., 0], 0), value1[..., 1]
+            won2, played2 = np.where(value2[..., 1] > 0, value2[..., 0], 0), value2[..., 1]
+            value1, value2 = won1 * np.maximum(played2, 1), won2 * np.maximum(played1, 1)
+        elif highlight == 'min':
+            value1, value2 = -value1, -value2
+        winners[..., column] = np.where(value1 > value2, 1, np.where(value2 > value1, 2, 0))
+    return winners
+
+
+def saved_stats_table(repository):
+    """Returns the ids of every saved match and their stats table (matches x players x sets),
+    without the pressure points (they need the event logs)"""
+    match_ids, slots = repository.read_stats_slots()
+    return match_ids, stats_table(record_counters(slots))
+
+
+def percent(part, whole):
+    """Returns the integer percentages of part in whole, 0 where whole is 0"""
+    return np.where(whole > 0, part * 100 // np.maximum(whole, 1), 0)
+
+
+def stats_table(counters, pressure=None):
+    """
+    Returns the stats table (METRICS) of an array of counters (... x sets x counters), with one
+    more row after the sets for the total of the match.
+
+    Parameters
+    ----------
+    counters : array
+        Counters of the players, from match_counters or record_counters.
+    pressure : array
+        Pressure points won and played (... x sets x 2), see Leverage. Zeros if it's None.
+    """
+    counters = np.concatenate([counters, counters.sum(axis=-2, keepdims=True)], axis=-2)
+    table = np.zeros(counters.shape[:-1], dtype=METRICS)
+
+    def column(key):
+        """Returns the values of a counter for every set"""
+        return counters[..., COUNTER_INDEX[key]]
+
+    for metric, key in COPIED.items():
+        table[metric] = column(key)
+    first_service_in = column('service_points_played') - column('second_service')
+    table['first_serve_in'] = percent(first_service_in, column('service_points_played'))
+    table['first_serve_won'] = percent(column('first_service_won'), first_service_in)
+    table['second_serve_won'] = percent(column('second_service_won'),
+                                        column('second_service_in'))
+    table['break_points'] = np.stack([column('return_game_won'), column('break_points')], -1)
+    table['return_points'] = np.stack(
+        [column('return_points_won'), column('return_points_played')], -1)
+    if pressure is not None:
+        table['pressure_points'] = np.concatenate(
+            [pressure, pressure.sum(axis=-2, keepdims=True)], axis=-2)
+    return table
+
+
+def table_metrics(table_row):
+    """Returns the metrics of one row of the stats table by name (same format as set_metrics)"""
+    return {metric: tuple(table_row[metric].tolist()) if table_row[metric].shape
+            else int(table_row[metric]) for metric in METRICS.names}
+
+
+def table_rows(player_table, sets_number):
+    """Returns the metrics of the first sets of a player in the stats table, then of the match"""
+    return ([table_metrics(row) for row in player_table[:sets_number]]
+            + [table_metrics(player_table[-1])])
+
+
+def main():
+    """Command line entry point"""
+    argparse.ArgumentParser(
+        description='Computes the stats of every saved match with NumPy, and checks them against '
+                    'the metrics of StatsDisplay (computed match by match).').parse_args()
+    from match_repository import MatchRepository
+    repository = MatchRepository()
+    try:
+        start = time.perf_counter()
+        match_ids, table = saved_stats_table(repository)
+        numpy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        python_rows = []
+        for match_data in repository.iter_matches():
+            players = []
+            for slot in (1, 2):
+                stats = match_data['player{}_stats'.format(slot)]
+                counters = dict(stats, **stats['service_stats'])
+                players.append(
+                    [set_metrics({key: counters[key][index] for key in COUNTERS}, (0, 0))
+                     for index in range(len(stats['total_points']))]
+                    + [set_metrics(stats['totals'], (0, 0))])
+            python_rows.append(players)
+        python_time = time.perf_counter() - start
+    finally:
+        repository.close()
+    different = [match_id for match_id, players, match_table in zip(match_ids, python_rows, table)
+                 if any(rows != table_rows(match_table[slot], len(rows) - 1)
+                        for slot, rows in enumerate(players))]
+    print('{} matches : NumPy {:.1f} ms, match by match {:.1f} ms, {} different'.format(
+        len(match_ids), numpy_time * 1000, python_time * 1000, len(different)))
+
+
+if __name__ == '__main__':
+    main()
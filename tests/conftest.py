@@ -0,0 +1,21 @@
+"""
+Fixtures shared by the tests.
+
+The tests run from the root of the app, like the app itself (it opens 'json_files/...'),
+and only import the modules which don't need Kivy.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def app_directory(monkeypatch):
+    """Runs a test from the root of the app"""
+    monkeypatch.chdir(ROOT)
+    return ROOT
@@ -0,0 +1,167 @@
+"""Tests of the MatchRepository writes, done by its PersistenceWorker."""
+
+import os
+import random
+
+from career import compute_careers, read_careers
+from match_repository import MatchRepository
+from match_shards import load_shards, shard_name
+from point_log import encode_event, replay, ACE, FORCED_ERROR
+
+NAMES = ('Federer', 'Nadal', 'Djokovic', 'Murray')
+
+
+def random_match(rng, points=None, names=NAMES):
+    """Returns the data of a match between two random players, with random points played
+    (or a given number of points)"""
+    player1_name, player2_name = rng.sample(names, 2)
+    points_log = [encode_event(rng.randint(1, 2), rng.randint(1, 2), rng.randint(1, 2),
+                               rng.randint(ACE, FORCED_ERROR), rng.randint(0, 3))
+                  for _ in range(points or rng.randrange(1, 200))]
+    engine = replay(points_log, player1_name, player2_name)
+    return {'match_name': 'match {}'.format(rng.randrange(1000)),
+            'player1_name': player1_name, 'player2_name': player2_name,
+            'player1_stats': engine.player1.stats.to_dict(),
+            'player2_stats': engine.player2.stats.to_dict(),
+            'server': player1_name, 'receiver': player2_name,
+            'sets_winners': list(engine.sets_winners), 'match_ended': engine.is_over(),
+            'points_log': points_log, 'match_format': None}
+
+
+def test_rapid_writes_are_all_on_disk(app_directory, tmp_path):
+    """The last save or delete of every match is on disk after many writes without waiting"""
+    rng = random.Random(6)
+    database_file, stats_file = str(tmp_path / 'data.db'), str(tmp_path / 'stats.bin')
+    repository = MatchRepository(database_file, stats_file)
+    expected = {match_data['match_id']: match_data for match_data in repository.iter_matches()}
+    for _ in range(1500):
+        if expected and rng.random() < 0.6:  # Overwrites or deletes a known match
+            match_id = rng.choice(sorted(expected))
+        else:
+            match_id = repository.new_match_id()
+        if rng.random() < 0.2:
+            repository.delete_match(match_id)
+            expected[match_id] = None
+        else:
+            match_data = random_match(rng)
+            repository.save_match(match_id, match_data)
+            expected[match_id] = dict(match_data, match_id=match_id)
+    repository.close()
+    assert repository.write_connection is None  # Closed by the worker thread
+
+    repository = MatchRepository(database_file, stats_file)
+    try:
+        saved = {match_id: match_data for match_id, match_data in expected.items()
+                 if match_data is not None}
+        assert {match_data['match_id']: match_data for match_data in repository.iter_matches()} \
+            == saved
+        slots = [row[0] for row in repository.connection.execute('SELECT stats_slot FROM matches')]
+        assert len(set(slots)) == len(slots) == len(saved)  # No slot shared by two matches
+        assert read_careers(repository.connection) == compute_careers(saved.values())
+    finally:
+        repository.close()
+
+
+def test_average_set_stats_without_ended_set(app_directory, tmp_path):
+    """The average of a window without any ended set is None (the drills are picked randomly)"""
+    rng = random.Random(7)
+    repository = MatchRepository(str(tmp_path / 'data.db'), str(tmp_path / 'stats.bin'))
+    try:
+        match_id = repository.new_match_id()
+        repository.save_match(match_id, random_match(rng, 10, ('Borg', 'McEnroe')))
+        assert repository.average_set_stats(match_id, 1, 5) is None
+        ended_id = repository.new_match_id()
+        repository.save_match(ended_id, random_match(rng, 150, ('Borg', 'McEnroe')))
+        averages = repository.average_set_stats(ended_id, 1, 5)
+        assert averages is not None and averages['winners'] >= 0
+    finally:
+        repository.close()
+
+
+def test_form_trend_is_anchored_at_the_match(app_directory, tmp_path):
+    """The trend of a player stops at the analysed match, like the average of the drills"""
+    rng = random.Random(8)
+    repository = MatchRepository(str(tmp_path / 'data.db'), str(tmp_path / 'stats.bin'))
+    try:
+        match_ids = []
+        for _ in range(4):
+            match_ids.append(repository.new_match_id())
+            repository.save_match(match_ids[-1], random_match(rng, 150, ('Borg', 'McEnroe')))
+        name = repository.load_match(match_ids[1])['player1_name']
+        slot = 1 if repository.load_match(match_ids[0])['player1_name'] == name else 2
+        trend = repository.get_form_trend(name, match_ids[1], 1, 5, 10)
+        assert len(trend) == 2  # Not the matches saved after it
+        assert trend[:1] == repository.get_form_trend(name, match_ids[0], slot, 5, 10)
+        assert len(repository.get_form_trend(name, match_ids[-1], 2, 5, 10)) == 4
+    finally:
+        repository.close()
+
+
+def test_cache_watches_the_stats_file(app_directory, tmp_path):
+    """A change of the stats file alone empties the cache of the loaded matches"""
+    rng = random.Random(9)
+    stats_file = str(tmp_path / 'stats.bin')
+    repository = MatchRepository(str(tmp_path / 'data.db'), stats_file)
+    try:
+        match_id = repository.new_match_id()
+        repository.save_match(match_id, random_match(rng))
+        repository.flush()
+        repository.load_match(match_id)
+        assert repository.cache.get_match(match_id) is not None
+        os.utime(stats_file, ns=(0, 0))  # Written by someone else
+        assert repository.cache.get_match(match_id) is None
+    finally:
+        repository.close()
+
+
+def test_writes_update_only_the_shard_of_the_match(app_directory, tmp_path):
+    """A save or a delete writes only the shard of its match, the shards stay the whole history"""
+    rng = random.Random(10)
+    shards_directory = str(tmp_path / 'shards')
+    repository = MatchRepository(str(tmp_path / 'data.db'), str(tmp_path / 'stats.bin'),
+                                 shards_directory=shards_directory)
+    try:
+        for _ in range(3):
+            repository.save_match(repository.new_match_id(), random_match(rng))
+        repository.flush()
+        match_ids = [match_data['match_id'] for match_data in repository.iter_matches()]
+        shard_paths = {match_id: os.path.join(shards_directory, shard_name(match_id))
+                       for match_id in match_ids}
+        for shard_path in shard_paths.values():
+            os.utime(shard_path, ns=(0, 0))
+        repository.save_match(match_ids[-1], random_match(rng))
+        repository.delete_match(match_ids[0])
+        repository.flush()
+        assert not os.path.exists(shard_paths[match_ids[0]])
+        assert os.stat(shard_paths[match_ids[-1]]).st_mtime_ns != 0
+        assert all(os.stat(shard_paths[match_id]).st_mtime_ns == 0
+                   for match_id in match_ids[1:-1])
+        assert load_shards(shards_directory, workers=1) == list(repository.iter_matches())
+    finally:
+        repository.close()
+
+
+def test_writes_are_appended_to_the_journal(app_directory, tmp_path):
+    """A save appends to the journal without rewriting the database, merged when it closes"""
+    rng = random.Random(11)
+    database_file = str(tmp_path / 'data.db')
+    repository = MatchRepository(database_file, str(tmp_path / 'stats.bin'))
+    try:
+        repository.save_match(repository.new_match_id(), random_match(rng))
+        repository.flush()
+        os.utime(database_file, ns=(0, 0))
+        journal_size = os.path.getsize(database_file + '-wal')
+        match_id = repository.new_match_id()
+        repository.save_match(match_id, random_match(rng))
+        repository.flush()
+        assert os.stat(database_file).st_mtime_ns == 0
+        assert os.path.getsize(database_file + '-wal') >= journal_size
+    finally:
+        repository.close()
+    assert not os.path.exists(database_file + '-wal') \
+        or os.path.getsize(database_file + '-wal') == 0
+    repository = MatchRepository(database_file, str(tmp_path / 'stats.bin'))
+    try:
+        assert repository.load_match(match_id)['match_id'] == match_id
+    finally:
+        repository.close()
@@ -0,0 +1,57 @@
+"""Tests of the UndoHistory of a match : undo and redo of the points, and its memory."""
+
+import random
+import sys
+
+from player import Player
+from point_log import UndoHistory, encode_event, replay, ACE, FORCED_ERROR
+from scoring import ScoringEngine, BEST_OF_5
+
+
+def random_event(rng, engine):
+    """Returns the event of a random point, served by the server of the engine"""
+    return encode_event(1 if engine.server is engine.player1 else 2, rng.randint(1, 2),
+                        rng.randint(1, 2), rng.randint(ACE, FORCED_ERROR), rng.randint(0, 3))
+
+
+def engine_state(engine):
+    """Returns everything the points change in a ScoringEngine"""
+    return (engine.player1.counters, engine.player2.counters, engine.state,
+            engine.sets_winners, engine.server is engine.player1,
+            engine.player1.points_amount, engine.player2.points_amount)
+
+
+def test_undo_and_redo_give_the_replay_of_the_log():
+    """Random points, undos and redos end in the same match as the replay of the final log"""
+    rng = random.Random(14)
+    for _ in range(200):
+        engine = ScoringEngine(Player('player1'), Player('player2'), match_format=BEST_OF_5)
+        history = UndoHistory(engine, bytearray())
+        for _ in range(rng.randrange(1, 400)):
+            action = rng.random()
+            if action < 0.15:
+                history.undo()
+            elif action < 0.25:
+                history.redo()
+            else:
+                history.play(random_event(rng, engine))
+        replayed = replay(history.points_log, 'player1', 'player2', BEST_OF_5)
+        assert engine_state(engine) == engine_state(replayed)
+        while history.undo():
+            pass
+        assert engine_state(engine) == engine_state(
+            ScoringEngine(Player('player1'), Player('player2'), match_format=BEST_OF_5))
+
+
+def test_undo_history_of_a_300_points_match_is_2_bytes_per_point():
+    """The history of a 300 points match holds one state of 2 bytes per point, and nothing else"""
+    rng = random.Random(15)
+    engine = ScoringEngine(Player('player1'), Player('player2'), match_format=BEST_OF_5)
+    history = UndoHistory(engine, bytearray())
+    while len(history.points_log) < 300:
+        if not history.play(random_event(rng, engine)):  # Match over : a new one
+            engine = ScoringEngine(Player('player1'), Player('player2'), match_format=BEST_OF_5)
+            history = UndoHistory(engine, bytearray())
+    assert len(history.states) == 300 and history.states.itemsize == 2
+    empty = UndoHistory(engine, bytearray())
+    assert sys.getsizeof(history.states) - sys.getsizeof(empty.states) <= 2 * 300 * 1.25
@@ -0,0 +1,171 @@
+"""Tests of the ScoringTable against the rules scored one by one, as before the table."""
+
+import copy
+import random
+
+import pytest
+
+from player import Player
+from point_log import apply_event, encode_event, revert_event, WINNER
+from scoring import ScoringEngine, BEST_OF_3, BEST_OF_5, NO_AD, TIE_BREAK_CAP
+
+
+class ReferenceRules:
+    """
+    Score of a match kept with the rules of the ScoringEngine before the ScoringTable
+    (6 games sets, tie-break in 7 points at 6 all, no cap on the tie-break points).
+    """
+
+    next_points = {0: 15, 15: 30, 30: 40}
+
+    def __init__(self, sets_to_win):
+        self.sets_to_win = sets_to_win
+        self.points = [0, 0]
+        self.games = [0, 0]
+        self.sets = [0, 0]
+        self.server = 0
+        self.sets_winners = []
+        self.break_points = [0, 0]
+        self.return_games_won = [0, 0]
+
+    def is_over(self):
+        """Returns True if the match is over"""
+        return max(self.sets) == self.sets_to_win
+
+    def is_tie_break(self):
+        """Returns True if a tie-break is being played"""
+        return self.games == [6, 6]
+
+    def point(self, winner):
+        """Scores a point won by the player 'winner' (0 or 1)"""
+        opponent = 1 - winner
+        points = self.points
+        if self.is_tie_break():
+            points[winner] += 1
+            if points[winner] >= 7 and points[winner] - points[opponent] >= 2:
+                self.game(winner)
+            elif sum(points) % 2 == 1:
+                self.server = 1 - self.server
+        elif points[winner] == 'AD' or points[winner] == 40 and points[opponent] not in (40, 'AD'):
+            if winner != self.server:
+                self.return_games_won[winner] += 1
+            self.game(winner)
+        else:
+            if points[winner] == 40 and points[opponent] == 40:
+                points[winner] = 'AD'
+            elif points[opponent] == 'AD':
+                points[opponent] = 40
+            else:
+                points[winner] = self.next_points[points[winner]]
+            if winner != self.server and (
+                    points[winner] == 'AD' or points[winner] == 40 and points[opponent] != 40):
+                self.break_points[winner] += 1
+
+    def game(self, winner):
+        """Ends the game (or the tie-break) won by the player 'winner'"""
+        self.points = [0, 0]
+        self.server = 1 - self.server
+        self.games[winner] += 1
+        if self.games[winner] == 7 or self.games[winner] == 6 and self.games[1 - winner] < 5:
+            self.games = [0, 0]
+            self.sets[winner] += 1
+            self.sets_winners.append(winner)
+
+
+def engine_score(engine):
+    """Returns the score of a ScoringEngine in the format of ReferenceRules"""
+    players = (engine.player1, engine.player2)
+    return {
+        'points': [player.points_amount for player in players],
+        'games': [player.games_amount for player in players],
+        'sets': [player.sets_amount for player in players],
+        'server': players.index(engine.server),
+        'sets_winners': [('player1', 'player2').index(name) for name in engine.sets_winners],
+        'break_points': [player.total('break_points') for player in players],
+        'return_games_won': [player.total('return_game_won') for player in players]}
+
+
+def reference_score(rules):
+    """Returns the score of ReferenceRules"""
+    return {key: copy.copy(getattr(rules, key)) for key in (
+        'points', 'games', 'sets', 'server', 'sets_winners', 'break_points', 'return_games_won')}
+
+
+def play_winner(rng, rules):
+    """Returns a random winner of the next point. Tie-breaks are kept tight, to make them long"""
+    if rules.is_tie_break() and rng.random() < 0.97:
+        if rules.points[0] != rules.points[1]:
+            return rules.points.index(min(rules.points))
+    return rng.randint(0, 1)
+
+
+@pytest.mark.parametrize('match_format', [BEST_OF_3, BEST_OF_5])
+def test_table_matches_reference_rules(match_format):
+    """Random points and undos give the same score as the rules scored one by one"""
+    rng = random.Random(12)
+    longest_tie_break = 0
+    for _ in range(200):
+        engine = ScoringEngine(Player('player1'), Player('player2'), match_format=match_format)
+        rules = ReferenceRules(match_format.sets_to_win)
+        undo = []  # (delta of the engine, copy of the rules) of every point
+        while not rules.is_over() or undo and rng.random() < 0.5:
+            if undo and (rules.is_over() or rng.random() < 0.2):
+                delta, rules = undo.pop()
+                revert_event(engine, delta)
+            else:
+                winner = play_winner(rng, rules)
+                event = encode_event(engine_score(engine)['server'] + 1, winner + 1, 1, WINNER)
+                undo.append((apply_event(engine, event), copy.deepcopy(rules)))
+                rules.point(winner)
+            assert engine_score(engine) == reference_score(rules)
+            if rules.is_tie_break():
+                longest_tie_break = max(longest_tie_break, min(rules.points))
+    assert longest_tie_break > TIE_BREAK_CAP  # The tie-breaks went beyond the cap of the table
+
+
+def test_resumed_long_tie_break_keeps_its_score():
+    """A match saved in a tie-break beyond the cap resumes with the real points amounts"""
+    rng = random.Random(13)
+    engine = ScoringEngine(Player('player1'), Player('player2'))
+    rules = ReferenceRules(BEST_OF_3.sets_to_win)
+    while not (rules.is_tie_break() and min(rules.points) > TIE_BREAK_CAP + 10):
+        winner = play_winner(rng, rules) if rules.is_tie_break() else rng.randint(0, 1)
+        apply_event(engine, encode_event(engine_score(engine)['server'] + 1, winner + 1, 1, WINNER))
+        rules.point(winner)
+        if rules.is_over():  # The tie-break was lost in the random points : new match
+            engine = ScoringEngine(Player('player1'), Player('player2'))
+            rules = ReferenceRules(BEST_OF_3.sets_to_win)
+    players = [Player(player.name, player.stats.to_dict()) for player in (engine.player1,
+                                                                           engine.player2)]
+    resumed = ScoringEngine(*players, server=players[engine_score(engine)['server']],
+                            receiver=players[1 - engine_score(engine)['server']],
+                            sets_winners=list(engine.sets_winners))
+    for _ in range(20):
+        winner = play_winner(rng, rules)
+        event = encode_event(engine_score(resumed)['server'] + 1, winner + 1, 1, WINNER)
+        apply_event(resumed, event)
+        rules.point(winner)
+        assert engine_score(resumed) == reference_score(rules)
+
+
+@pytest.mark.parametrize('points, break_points', [
+    ('RRRSSS', 2),  # 0-40, then the deciding point reached by the server
+    ('SSSRRR', 1),  # The deciding point reached by the receiver
+    ('RRSSRS', 2),  # 30-40, then the deciding point
+    ('RRR', 1)])
+def test_no_ad_deciding_point_is_a_break_point(points, break_points):
+    """In a no-ad game, the point played at 40-40 is a break point whoever won the point before,
+    and the undo takes it back"""
+    engine = ScoringEngine(Player('player1'), Player('player2'), match_format=NO_AD)
+    server, receiver = engine.server, engine.receiver
+    deltas = []
+    for point in points:
+        winner = receiver if point == 'R' else server
+        event = encode_event(1 if server is engine.player1 else 2,
+                             1 if winner is engine.player1 else 2, 1, WINNER)
+        deltas.append(apply_event(engine, event))
+    assert receiver.total('break_points') == break_points
+    assert server.total('break_points') == 0
+    for delta in reversed(deltas):
+        revert_event(engine, delta)
+    assert receiver.total('break_points') == server.total('break_points') == 0
@@ -0,0 +1,199 @@
+"""
+WinProbability
+
+Probability that the player 1 wins the match from the current score, with a Markov model :
+point -> game -> tie-break -> set -> match.
+Each player wins the points on their serve with a fixed probability, rounded to a bucket, and the
+probabilities of the games, tie-breaks, sets and match are memoized per (score, buckets).
+After the first points of a match, a live update is a few cache lookups.
+
+The server changes follow the ScoringTable : after every game, and during a tie-break
+after every point that makes the total of points odd.
+"""
+
+from functools import lru_cache
+
+from scoring import POINTS, TIE_BREAK_CAP
+
+BUCKETS = 100
+"""Number of buckets of the serve probabilities (steps of 1 %)."""
+
+CACHE_SIZE = 4096
+PRIOR_POINTS = 20
+PRIOR_SERVE = 0.6
+"""The serve estimates start at PRIOR_SERVE, as if PRIOR_POINTS points had been played."""
+
+
+def serve_bucket(totals):
+    """Returns the bucket of the probability that a player wins a point on their serve, from the
+    totals of their stats (Player.stats['totals'])"""
+    played = totals['service_points_played']
+    won = totals['first_service_won'] + totals['second_service_won']
+    probability = (won + PRIOR_SERVE * PRIOR_POINTS) / (played + PRIOR_POINTS)
+    return min(BUCKETS - 1, max(1, round(probability * BUCKETS)))
+
+
+def match_win_probability(match):
+    """Returns the probability that the player 1 of a Match (or ScoringEngine) wins the match"""
+    player1, player2 = match.player1, match.player2
+    bucket1 = serve_bucket(player1.stats['totals'])
+    bucket2 = serve_bucket(player2.stats['totals'])
+    if match.is_over():
+        return 1.0 if player1.sets_amount > player2.sets_amount else 0.0
+    score = match.table.scores[match.state]
+    return live_probability(score, match.server is player1, bucket1, bucket2, match.match_format)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def live_probability(score, player1_serving, bucket1, bucket2, match_format):
+    """Returns the probability that the player 1 wins the match from a score of the ScoringTable"""
+    points1, points2, games1, games2, sets1, sets2 = score
+    target = tie_break_target(games1, games2, sets1, sets2, match_format)
+    if target is not None:
+        outcomes = tie_break_outcomes(points1, points2, player1_serving, bucket1, bucket2, target)
+        return after_set(outcomes, sets1, sets2, bucket1, bucket2, match_format)
+    if player1_serving:
+        player1_game = hold_probability(points1, points2, bucket1, match_format.no_ad)
+    else:
+        player1_game = 1 - hold_probability(points2, points1, bucket2, match_format.no_ad)
+    return (player1_game * after_game(games1 + 1, games2, not player1_serving, sets1, sets2,
+                                      bucket1, bucket2, match_format)
+            + (1 - player1_game) * after_game(games1, games2 + 1, not player1_serving, sets1,
+                                              sets2, bucket1, bucket2, match_format))
+
+
+def tie_break_target(games1, games2, sets1, sets2, match_format):
+    """Returns the points needed to win the tie-break being played, None if it's not one"""
+    if match_format.super_tie_break and sets1 == sets2 == match_format.sets_to_win - 1:
+        return match_format.super_tie_break_points
+    if games1 == games2 == match_format.games_per_set:
+        return match_format.tie_break_points
+    return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def hold_probability(server_points, receiver_points, bucket, no_ad):
+    """Returns the probability that the server wins the game from a points score (0, 15, 30, 40, AD)"""
+    serve = bucket / BUCKETS
+    if server_points == 'AD':
+        return serve + (1 - serve) * hold_probability(40, 40, bucket, no_ad)
+    if receiver_points == 'AD':
+        return serve * hold_probability(40, 40, bucket, no_ad)
+    if server_points == 40 and receiver_points == 40:
+        if no_ad:
+            return serve
+        return serve ** 2 / (serve ** 2 + (1 - serve) ** 2)  # Deuce
+    if server_points == 40:
+        won = 1.0
+    else:
+        won = hold_probability(POINTS[POINTS.index(server_points) + 1], receiver_points,
+                               bucket, no_ad)
+    if receiver_points == 40:
+        lost = 0.0
+    else:
+        lost = hold_probability(server_points, POINTS[POINTS.index(receiver_points) + 1],
+                                bucket, no_ad)
+    return serve * won + (1 - serve) * lost
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def tie_break_outcomes(points1, points2, player1_serving, bucket1, bucket2, target):
+    """
+    Returns the probabilities of the ends of a tie-break, from a points score :
+    (player 1 wins and serves next, player 1 wins and receives next, player 2 wins and player 1
+    serves next). The last end (player 2 wins and serves next) is the rest.
+    """
+    serve = bucket1 / BUCKETS if player1_serving else 1 - bucket2 / BUCKETS
+    if points1 == points2 and points1 >= TIE_BREAK_CAP - 2:
+        # Beyond the cap, the tie-break is cut short : each player serves one of the next 2 points
+        player1_pair = bucket1 / BUCKETS * (1 - bucket2 / BUCKETS)
+        player2_pair = (1 - bucket1 / BUCKETS) * bucket2 / BUCKETS
+        player1_wins = player1_pair / (player1_pair + player2_pair)
+        return player1_wins / 2, player1_wins / 2, (1 - player1_wins) / 2
+    outcomes = [0.0, 0.0, 0.0]
+    for player1_won, probability in ((True, serve), (False, 1 - serve)):
+        new_points1, new_points2 = points1 + player1_won, points2 + (not player1_won)
+        winner_points = max(new_points1, new_points2)
+        if winner_points >= target and abs(new_points1 - new_points2) >= 2:
+            next_serving = not player1_serving  # The server changes at the end of the tie-break
+            index = (0 if next_serving else 1) if player1_won else (2 if next_serving else None)
+            if index is not None:
+                outcomes[index] += probability
+            continue
+        next_serving = player1_serving ^ ((new_points1 + new_points2) % 2 == 1)
+        next_outcomes = tie_break_outcomes(new_points1, new_points2, next_serving,
+                                           bucket1, bucket2, target)
+        for index in range(3):
+            outcomes[index] += probability * next_outcomes[index]
+    return tuple(outcomes)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def set_outcomes(games1, games2, player1_serving, bucket1, bucket2, sets1, sets2, match_format):
+    """
+    Returns the probabilities of the ends of a set, from the start of a game (same order as
+    tie_break_outcomes). The sets score tells if the set is played as a super tie-break.
+    """
+    target = tie_break_target(games1, games2, sets1, sets2, match_format)
+    if target is not None:
+        return tie_break_outcomes(0, 0, player1_serving, bucket1, bucket2, target)
+    if player1_serving:
+        player1_game = hold_probability(0, 0, bucket1, match_format.no_ad)
+    else:
+        player1_game = 1 - hold_probability(0, 0, bucket2, match_format.no_ad)
+    outcomes = [0.0, 0.0, 0.0]
+    next_serving = not player1_serving
+    for player1_won, probability in ((True, player1_game), (False, 1 - player1_game)):
+        new_games1, new_games2 = games1 + player1_won, games2 + (not player1_won)
+        if set_winner(new_games1, new_games2, match_format) is None:
+            next_outcomes = set_outcomes(new_games1, new_games2, next_serving, bucket1, bucket2,
+                                         sets1, sets2, match_format)
+            for index in range(3):
+                outcomes[index] += probability * next_outcomes[index]
+        elif player1_won:
+            outcomes[0 if next_serving else 1] += probability
+        elif next_serving:
+            outcomes[2] += probability
+    return tuple(outcomes)
+
+
+def set_winner(games1, games2, match_format):
+    """Returns 1 or 2 if a regular game has just ended the set, None otherwise"""
+    for winner, games, opponent_games in ((1, games1, games2), (2, games2, games1)):
+        if games >= match_format.games_per_set and games - opponent_games >= 2:
+            return winner
+    return None
+
+
+def after_game(games1, games2, player1_serving, sets1, sets2, bucket1, bucket2, match_format):
+    """Returns the probability that the player 1 wins the match after a regular game"""
+    winner = set_winner(games1, games2, match_format)
+    if winner is None:
+        outcomes = set_outcomes(games1, games2, player1_serving, bucket1, bucket2, sets1, sets2,
+                                match_format)
+        return after_set(outcomes, sets1, sets2, bucket1, bucket2, match_format)
+    if winner == 1:
+        return set_start(sets1 + 1, sets2, player1_serving, bucket1, bucket2, match_format)
+    return set_start(sets1, sets2 + 1, player1_serving, bucket1, bucket2, match_format)
+
+
+def after_set(outcomes, sets1, sets2, bucket1, bucket2, match_format):
+    """Returns the probability that the player 1 wins the match, from the ends of the current set"""
+    player1_serves, player1_receives, player2_wins_player1_serves = outcomes
+    return (player1_serves * set_start(sets1 + 1, sets2, True, bucket1, bucket2, match_format)
+            + player1_receives * set_start(sets1 + 1, sets2, False, bucket1, bucket2, match_format)
+            + player2_wins_player1_serves * set_start(sets1, sets2 + 1, True, bucket1, bucket2,
+                                                      match_format)
+            + (1 - sum(outcomes)) * set_start(sets1, sets2 + 1, False, bucket1, bucket2,
+                                              match_format))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def set_start(sets1, sets2, player1_serving, bucket1, bucket2, match_format):
+    """Returns the probability that the player 1 wins the match from the start of a set"""
+    if sets1 == match_format.sets_to_win:
+        return 1.0
+    if sets2 == match_format.sets_to_win:
+        return 0.0
+    outcomes = set_outcomes(0, 0, player1_serving, bucket1, bucket2, sets1, sets2, match_format)
+    return after_set(outcomes, sets1, sets2, bucket1, bucket2, match_format)